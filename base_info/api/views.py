@@ -1,10 +1,9 @@
-from django.db.models import Avg
+import time
+
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from user_auth.models import Profile
-from reviews.models import Review
-from offers.models import Offer
 from rest_framework.permissions import AllowAny
+from base_info.snapshot import get_fresh_for, get_snapshot, get_stale_for
 
 
 class BaseInfoView(APIView):
@@ -19,19 +18,21 @@ class BaseInfoView(APIView):
         - business_profile_count: The total number of business profiles.
         - review_count: The total number of reviews.
         - offer_count: The total number of offers.
-        """
 
-        review_count = Review.objects.count()
-        rating_aggregation = Review.objects.aggregate(avg_rating =Avg('rating'))
-        average_rating = rating_aggregation.get('avg_rating')
-        average_rating = round(average_rating, 1) if average_rating is not None else 0
-        business_profile_count = Profile.objects.filter(type='business').count()
-        offer_count = Offer.objects.count()
+        The statistics are served from a snapshot that is computed with a single query and
+        cached for `BASE_INFO_FRESH_FOR` seconds; expired snapshots are recomputed by one
+        request while the others keep serving the previous one (see base_info/snapshot.py).
+        For monitoring, `X-Cache` reports HIT, STALE, REFRESH or MISS, `Age` the seconds
+        since the snapshot was computed and `X-Snapshot-Compute-Time` how long that took in ms.
+        """
+        entry, state = get_snapshot()
+        age = max(0, int(time.time() - entry['computed_at']))
 
-        data = {
-            "average_rating": average_rating,
-            "business_profile_count": business_profile_count,
-            "review_count": review_count,            
-            "offer_count": offer_count,
-        }
-        return Response(data)
\ No newline at end of file
+        response = Response(entry['data'])
+        response['X-Cache'] = state
+        response['Age'] = str(age)
+        response['X-Snapshot-Compute-Time'] = f"{entry['compute_time'] * 1000:.2f}"
+        response['Cache-Control'] = (
+            f'public, max-age={max(0, get_fresh_for() - age)}, stale-while-revalidate={get_stale_for()}'
+        )
+        return response
@@ -0,0 +1,104 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F, Func
+from offers.models import Offer
+from reviews.models import BusinessRating
+from user_auth.models import Profile
+
+
+SNAPSHOT_KEY = 'base_info:snapshot'
+LOCK_KEY = 'base_info:snapshot:lock'
+
+
+def get_cache():
+    return caches[getattr(settings, 'BASE_INFO_CACHE_ALIAS', 'default')]
+
+
+def get_fresh_for():
+    return getattr(settings, 'BASE_INFO_FRESH_FOR', 30)
+
+
+def get_stale_for():
+    return getattr(settings, 'BASE_INFO_STALE_FOR', 300)
+
+
+def scalar_subquery(queryset, function, field='pk'):
+    """
+    Returns the SQL and parameters of a subquery that applies an SQL aggregate function,
+    e.g. COUNT or SUM, to all rows of the queryset and selects the single result.
+    """
+    queryset = queryset.order_by().annotate(value=Func(F(field), function=function)).values('value')
+    return queryset.query.sql_with_params()
+
+
+def compute_snapshot():
+    """
+    Computes the landing page statistics with one query of four scalar subqueries:
+    the review count and rating sum from the business rating aggregates, the number
+    of business profiles and the number of offers.
+    """
+    subqueries = [
+        scalar_subquery(BusinessRating.objects.all(), 'SUM', 'count'),
+        scalar_subquery(BusinessRating.objects.all(), 'SUM', 'total'),
+        scalar_subquery(Profile.objects.filter(type='business'), 'COUNT'),
+        scalar_subquery(Offer.objects.all(), 'COUNT'),
+    ]
+    sql = 'SELECT ' + ', '.join(f'({subquery})' for subquery, _ in subqueries)
+    params = [param for _, subquery_params in subqueries for param in subquery_params]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        review_count, rating_total, business_profile_count, offer_count = cursor.fetchone()
+    review_count = review_count or 0
+    return {
+        "average_rating": round(rating_total / review_count, 1) if review_count else 0,
+        "business_profile_count": business_profile_count,
+        "review_count": review_count,
+        "offer_count": offer_count,
+    }
+
+
+def refresh_snapshot():
+    """
+    Computes the snapshot and stores it for `BASE_INFO_FRESH_FOR` seconds plus the
+    `BASE_INFO_STALE_FOR` seconds in which it is still served while being recomputed.
+
+    :return: The stored cache entry.
+    """
+    started = time.perf_counter()
+    data = compute_snapshot()
+    entry = {
+        'data': data,
+        'computed_at': time.time(),
+        'compute_time': time.perf_counter() - started,
+    }
+    get_cache().set(SNAPSHOT_KEY, entry, timeout=get_fresh_for() + get_stale_for())
+    return entry
+
+
+def get_snapshot():
+    """
+    Returns the cached snapshot entry and how it was served: HIT, STALE, REFRESH or MISS.
+
+    A fresh entry is returned as is. Once it is older than `BASE_INFO_FRESH_FOR`, the
+    first request that takes the recompute lock recomputes it, while concurrent requests
+    keep getting the stale entry, so an expiry never sends all workers to the database
+    at once. Only without any entry, e.g. after a restart, is the snapshot computed
+    by every request that finds none.
+
+    :return: A tuple of the entry with `data`, `computed_at` and `compute_time`, and the state.
+    """
+    cache = get_cache()
+    entry = cache.get(SNAPSHOT_KEY)
+    if entry is None:
+        return refresh_snapshot(), 'MISS'
+    if time.time() - entry['computed_at'] < get_fresh_for():
+        return entry, 'HIT'
+    if not cache.add(LOCK_KEY, True, timeout=max(1, get_fresh_for())):
+        return entry, 'STALE'
+    try:
+        return refresh_snapshot(), 'REFRESH'
+    finally:
+        cache.delete(LOCK_KEY)
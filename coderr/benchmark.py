@@ -0,0 +1,112 @@
+import asyncio
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs the enclosed block in a transaction that is always rolled back,
+    so benchmark data never stays in the database.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+@contextmanager
+def connections_kept_open():
+    """
+    Keeps the database connections open at the start and end of requests sent through
+    `asgi_request`, like Django's test client does, so requests run inside
+    `rolled_back()` see its data and do not end its transaction.
+    """
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+def measure(func, repeat=20):
+    """
+    Calls the given function `repeat` times and returns timing statistics in milliseconds.
+
+    :param func: A callable without arguments.
+    :param repeat: How many times the callable is run.
+    :return: A dictionary with the median, p95, min and max duration.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        'median': statistics.median(durations),
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'min': durations[0],
+        'max': durations[-1],
+    }
+
+
+def format_stats(label, stats):
+    """
+    Formats timing statistics returned by `measure` as a single line.
+    """
+    return (
+        f"{label:<28} median {stats['median']:9.2f} ms   p95 {stats['p95']:9.2f} ms   "
+        f"min {stats['min']:9.2f} ms   max {stats['max']:9.2f} ms"
+    )
+
+
+async def asgi_request(application, method, path, body=b'', headers=(), on_body=None):
+    """
+    Sends one HTTP request to an ASGI application in memory, without sockets.
+
+    :param headers: Pairs of header names and values as strings.
+    :param on_body: Called with every part of the response body as it is sent. The parts
+        are then not collected, so large streamed responses are not held in memory.
+    :return: A tuple of the status code and the response body, which is empty with `on_body`.
+    """
+    path, _, query = path.partition('?')
+    headers = [('Host', 'localhost'), ('Content-Length', str(len(body))), *headers]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '', 'server': ('localhost', 80), 'client': ('127.0.0.1', 10000),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    request_sent = False
+    response = {'status': None, 'body': b''}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif on_body is not None:
+            on_body(message.get('body', b''))
+        else:
+            response['body'] += message.get('body', b'')
+
+    await application(scope, receive, send)
+    return response['status'], response['body']
@@ -0,0 +1,37 @@
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def make_etag(*version):
+    """
+    Builds a strong ETag from the values identifying a version of a resource.
+    """
+    return '"{}"'.format(hashlib.sha256(repr(version).encode()).hexdigest()[:32])
+
+
+def conditional_get(validator):
+    """
+    Decorates the `get` method of an APIView with ETag and Last-Modified handling.
+
+    `validator(request, *args, **kwargs)` returns a tuple of the version values and the
+    last modification time of the requested resource, or None if it does not exist. It
+    is called once per request, before the view method. If the client's `If-None-Match`
+    or `If-Modified-Since` header matches, a 304 response is returned without running
+    the view, otherwise both headers are added to the response.
+    """
+    def get_validator(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_validator'):
+            request._conditional_validator = validator(request, *args, **kwargs)
+        return request._conditional_validator
+
+    def etag_func(request, *args, **kwargs):
+        result = get_validator(request, *args, **kwargs)
+        return make_etag(*result[0]) if result else None
+
+    def last_modified_func(request, *args, **kwargs):
+        result = get_validator(request, *args, **kwargs)
+        return result[1] if result else None
+
+    return method_decorator(condition(etag_func=etag_func, last_modified_func=last_modified_func))
@@ -0,0 +1,71 @@
+import csv
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+
+
+class Echo:
+    """
+    A file-like object that returns what is written instead of storing it,
+    so `csv.writer` hands out each formatted line.
+    """
+
+    def write(self, value):
+        return value
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def format_value(value):
+    """
+    Formats a cell value. Strings that a spreadsheet would evaluate as a formula are
+    prefixed with an apostrophe, so an exported title like `=HYPERLINK(...)` stays text.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def stream_csv(header, rows, lines_per_chunk=500):
+    """
+    Yields the CSV lines of the header and the rows, joined into chunks of
+    `lines_per_chunk` lines, so a StreamingHttpResponse sends a few kilobytes
+    per write instead of one line. Only the current chunk is held in memory.
+
+    :param header: The column names.
+    :param rows: An iterable of row tuples, e.g. `values_list(...).iterator()`.
+    :param lines_per_chunk: The number of lines per yielded string.
+    """
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(header)]
+    for row in rows:
+        chunk.append(writer.writerow([format_value(value) for value in row]))
+        if len(chunk) >= lines_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+async def iterate_in_thread(chunks):
+    """
+    Yields the items of a synchronous iterator, e.g. `stream_csv`, to an ASGI server.
+
+    Given a synchronous iterator, Django's ASGI handler reads it completely into memory
+    before sending the first byte. Here every item is fetched on its own through
+    `sync_to_async`, in the thread of the request, which holds its database connection,
+    so the response starts after the first chunk and memory use stays flat.
+
+    :param chunks: A synchronous iterator. It is closed when the client disconnects.
+    """
+    fetch = sync_to_async(next)
+    done = object()
+    try:
+        while (chunk := await fetch(chunks, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
@@ -0,0 +1,88 @@
+import copy
+
+from django.db import models
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin:
+    """
+    Remembers the field values a model instance was loaded with, so saving an existing
+    instance compares them in memory and writes only the changed columns with
+    `update_fields`, instead of rewriting every column or reading the row again.
+
+    Fields in `save_excluded_fields` are never written by a save of an existing instance,
+    e.g. columns maintained by background workers. `auto_now` fields are written along
+    with any change. A save without changes runs no query. Instances that were not
+    loaded from the database, and saves with explicit `update_fields`, behave as usual.
+    """
+    save_excluded_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.snapshot_fields(fields)
+
+    def tracked_fields(self):
+        return [field for field in self._meta.concrete_fields if not field.primary_key]
+
+    def comparable_value(self, field):
+        value = self.__dict__[field.attname]
+        if isinstance(field, models.FileField):
+            return (value.name if isinstance(value, FieldFile) else value) or None
+        return value
+
+    def snapshot_fields(self, names=None):
+        """
+        Remembers the current values of the loaded fields as their saved state.
+        Deferred fields are not part of the snapshot.
+
+        :param names: The names of the fields that were written or read, or None for all.
+        """
+        saved = getattr(self, '_saved_values', {}) if names is not None else {}
+        for field in self.tracked_fields():
+            if field.attname in self.__dict__ and (names is None or field.name in names or field.attname in names):
+                saved[field.attname] = copy.deepcopy(self.comparable_value(field))
+        self._saved_values = saved
+
+    def is_tracked(self):
+        return hasattr(self, '_saved_values')
+
+    def get_dirty_fields(self):
+        """
+        Returns the names of the loaded fields whose values differ from the saved state.
+        Fields that were deferred and then assigned count as changed.
+        """
+        saved = getattr(self, '_saved_values', {})
+        return [
+            field.name for field in self.tracked_fields()
+            if field.attname in self.__dict__
+            and (field.attname not in saved or saved[field.attname] != self.comparable_value(field))
+        ]
+
+    def get_update_fields(self):
+        """
+        Returns the fields a save of this instance has to write: the changed fields and,
+        if there are any, the `auto_now` fields; None for instances that are not tracked.
+        """
+        if not self.is_tracked():
+            return None
+        dirty = [name for name in self.get_dirty_fields() if name not in self.save_excluded_fields]
+        if dirty:
+            dirty += [
+                field.name for field in self.tracked_fields()
+                if getattr(field, 'auto_now', False) and field.name not in dirty
+            ]
+        return dirty
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and kwargs.get('update_fields') is None and self.is_tracked():
+            kwargs['update_fields'] = self.get_update_fields()
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self.snapshot_fields(None if adding or update_fields is None else set(update_fields))
@@ -0,0 +1,125 @@
+import contextvars
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.decorators import sync_and_async_middleware
+
+
+_current = contextvars.ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    """
+    The users and profiles loaded during one request, keyed by the user id, so each
+    row is loaded at most once and every lookup of it returns the same instance.
+    `saved` counts the lookups that were served from the map instead of the database.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.profiles = {}
+        self.saved = 0
+
+
+def current_map():
+    return _current.get()
+
+
+def _profile_model():
+    from user_auth.models import Profile
+    return Profile
+
+
+def _attach(user, profile):
+    """
+    Links a user and its profile (or None) like select_related does, so accessing
+    `user.profile` or `profile.user` runs no query.
+    """
+    User.profile.related.set_cached_value(user, profile)
+    if profile is not None:
+        _profile_model().user.field.set_cached_value(profile, user)
+
+
+def remember(user):
+    """
+    Registers an already loaded user and, if loaded with it, its profile in the
+    identity map of the current request, e.g. the authenticated user.
+
+    :return: The instance registered for the user, which may be an earlier one.
+    """
+    identity_map = current_map()
+    if identity_map is None or not getattr(user, 'pk', None):
+        return user
+    user = identity_map.users.setdefault(user.pk, user)
+    if user.pk not in identity_map.profiles and User.profile.is_cached(user):
+        identity_map.profiles[user.pk] = getattr(user, 'profile', None)
+    return user
+
+
+def get_user(pk):
+    """
+    Returns the user with the given id, loaded at most once per request.
+
+    :raises User.DoesNotExist: If the user does not exist.
+    """
+    identity_map = current_map()
+    if identity_map is not None and pk in identity_map.users:
+        identity_map.saved += 1
+        return identity_map.users[pk]
+    return remember(User.objects.get(pk=pk))
+
+
+def get_profile(user):
+    """
+    Returns the profile of a user, loaded at most once per request, or None for
+    anonymous users and users without a profile. The profile is attached to the
+    given user instance, so later `user.profile` accesses run no query either.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return None
+    identity_map = current_map()
+    if User.profile.is_cached(user):
+        profile = getattr(user, 'profile', None)
+        if identity_map is not None:
+            identity_map.profiles.setdefault(user.pk, profile)
+        return profile
+    if identity_map is not None and user.pk in identity_map.profiles:
+        identity_map.saved += 1
+        profile = identity_map.profiles[user.pk]
+    else:
+        profile = _profile_model().objects.filter(user_id=user.pk).first()
+        if identity_map is not None:
+            identity_map.profiles[user.pk] = profile
+    _attach(user, profile)
+    return profile
+
+
+@sync_and_async_middleware
+def identity_map_middleware(get_response):
+    """
+    Gives every request its own identity map. With `IDENTITY_MAP_DEBUG_HEADER` the
+    response reports the number of lookups served from it in `X-Identity-Map-Saved`.
+    """
+    def finish(identity_map, response):
+        if getattr(settings, 'IDENTITY_MAP_DEBUG_HEADER', False):
+            response['X-Identity-Map-Saved'] = str(identity_map.saved)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            identity_map = IdentityMap()
+            token = _current.set(identity_map)
+            try:
+                return finish(identity_map, await get_response(request))
+            finally:
+                _current.reset(token)
+    else:
+        def middleware(request):
+            identity_map = IdentityMap()
+            token = _current.set(identity_map)
+            try:
+                return finish(identity_map, get_response(request))
+            finally:
+                _current.reset(token)
+    return middleware
@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from rest_framework import serializers
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pillow_available():
+    """
+    Returns True if Pillow is installed. Without it no variants are generated and
+    clients get the original file for every variant.
+    """
+    return Image is not None
+
+
+def variant_name(name, variant, extension):
+    """
+    Returns the storage name of a variant, stored next to the original,
+    e.g. `uploads/offer.card.jpg` for `uploads/offer.jpg`.
+    """
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}{extension}'
+
+
+def render_variants(file, sizes):
+    """
+    Renders the fixed-size variants of an uploaded image and saves them to the storage
+    of the file. Existing variants with the same name are replaced.
+
+    :param file: The FieldFile of the original upload.
+    :param sizes: A dictionary mapping variant names to (width, height) tuples. Images
+        are scaled and cropped to fill the size exactly.
+    :return: A dictionary with the original name under `source` and the storage name of
+        every variant. Files Pillow cannot read get no variants, so they are not retried.
+    """
+    variants = {'source': file.name}
+    try:
+        with file.storage.open(file.name, 'rb') as source:
+            image = Image.open(source)
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("No image variants for %s: the file is not a readable image.", file.name)
+        return variants
+
+    if image.format == 'JPEG':
+        image_format, extension, mode = 'JPEG', '.jpg', 'RGB'
+    else:
+        image_format, extension, mode = 'PNG', '.png', 'RGBA'
+    image = ImageOps.exif_transpose(image).convert(mode)
+
+    for variant, size in sizes.items():
+        buffer = BytesIO()
+        ImageOps.fit(image, size, Image.Resampling.LANCZOS).save(buffer, format=image_format, optimize=True)
+        name = variant_name(file.name, variant, extension)
+        if file.storage.exists(name):
+            file.storage.delete(name)
+        variants[variant] = file.storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(storage, variants, keep=None):
+    """
+    Deletes the stored variant files of an upload, e.g. after it was replaced.
+
+    :param storage: The storage of the files.
+    :param variants: The variant names as returned by `render_variants`. The original
+        file under `source` is never deleted.
+    :param keep: Variant names still in use, e.g. those of the new upload, which are kept.
+    """
+    kept = set((keep or {}).values())
+    for variant, name in (variants or {}).items():
+        if variant != 'source' and name not in kept:
+            storage.delete(name)
+
+
+def variant_urls(file, variants, sizes, request=None):
+    """
+    Returns the URL of every variant of an uploaded file.
+
+    Variants that are not generated yet, or were generated for a previous upload, fall
+    back to the URL of the original file, so clients can always render an image.
+
+    :param file: The FieldFile of the original upload.
+    :param variants: The stored variant names as returned by `render_variants`.
+    :param sizes: The variant sizes of the field, used for the variant names.
+    :param request: The current request, used to build absolute URLs.
+    :return: A dictionary mapping variant names to URLs, or None if there is no file.
+    """
+    if not file:
+        return None
+    ready = variants if variants and variants.get('source') == file.name else {}
+    urls = {}
+    for variant in sizes:
+        url = file.storage.url(ready[variant]) if variant in ready else file.url
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def get_executor():
+    """
+    Returns the thread pool generating image variants, created on first use with
+    `IMAGE_VARIANT_WORKERS` threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                thread_name_prefix='image-variants',
+            )
+    return _executor
+
+
+def refresh_variants(model, pk, method_name):
+    """
+    Loads an instance and calls its variant method in a worker thread. Errors are
+    logged instead of raised, and the thread's database connections are closed.
+    """
+    try:
+        instance = model._default_manager.filter(pk=pk).first()
+        if instance is not None:
+            getattr(instance, method_name)()
+    except Exception:
+        logger.exception("Generating image variants for %s %s failed.", model.__name__, pk)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(instance, method_name):
+    """
+    Runs `instance.<method_name>()` in the background worker pool once the current
+    transaction is committed, so the request never waits for an image to be resized.
+    The worker loads a fresh copy of the instance. Nothing is scheduled without Pillow.
+    """
+    if not pillow_available():
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: get_executor().submit(refresh_variants, model, pk, method_name))
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only serializer field with the variant URLs of an uploaded file.
+    The variant names are read from the `<file_field>_variants` model field.
+    """
+
+    def __init__(self, file_field, sizes, **kwargs):
+        self.file_field = file_field
+        self.sizes = sizes
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return variant_urls(
+            getattr(instance, self.file_field),
+            getattr(instance, f'{self.file_field}_variants'),
+            self.sizes,
+            self.context.get('request'),
+        )
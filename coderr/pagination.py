@@ -0,0 +1,229 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor based pagination that seeks to the next page with a WHERE clause on the
+    ordering field and the id instead of counting and skipping rows, so every page
+    costs the same no matter how deep it is.
+
+    The mode is opt-in: it is used when the request contains `pagination=cursor`
+    or a `cursor` parameter. The ordering is taken from the queryset if it starts
+    with one of `ordering_fields`, otherwise `default_ordering` is used. Ties are
+    broken by the id in the same direction. NULL values sort first in ascending
+    and last in descending order.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    ordering_fields = ('created_at',)
+    default_ordering = '-created_at'
+    invalid_cursor_message = {"detail": ["Ungültiger Cursor."]}
+
+    @classmethod
+    def is_requested(cls, request):
+        """
+        Returns True if the client asked for cursor pagination.
+        """
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get(cls.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the requested page.
+
+        Fetches one row more than the page size to find out whether another page
+        follows, so no COUNT query is needed.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+        self.model_field = queryset.model._meta.get_field(self.field)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self.get_ordering_expressions(descending))
+        if self.cursor:
+            queryset = queryset.filter(self.get_seek_filter(descending, self.cursor['value'], self.cursor['id']))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Returns the ordering field and direction used for the keyset.
+
+        :param queryset: The queryset to paginate.
+        :return: A tuple of the field name and whether it is sorted descending.
+        """
+        for ordering in queryset.query.order_by:
+            if isinstance(ordering, str) and ordering.lstrip('-') in self.ordering_fields:
+                return ordering.lstrip('-'), ordering.startswith('-')
+        return self.default_ordering.lstrip('-'), self.default_ordering.startswith('-')
+
+    def get_ordering_expressions(self, descending):
+        if descending:
+            return [F(self.field).desc(nulls_last=True), F('id').desc()]
+        return [F(self.field).asc(nulls_first=True), F('id').asc()]
+
+    def get_seek_filter(self, descending, value, pk):
+        """
+        Builds the condition selecting all rows after the given position.
+
+        :param descending: Whether the rows are traversed in descending order.
+        :param value: The ordering value of the last row on the previous page.
+        :param pk: The id of the last row on the previous page.
+        :return: A Q object.
+        """
+        lookup = 'lt' if descending else 'gt'
+        after_id = Q(**{f'id__{lookup}': pk})
+        if value is None:
+            after = Q(**{f'{self.field}__isnull': True}) & after_id
+            if not descending:
+                after |= Q(**{f'{self.field}__isnull': False})
+            return after
+        after = Q(**{f'{self.field}__{lookup}': value}) | (Q(**{self.field: value}) & after_id)
+        if descending and self.model_field.null:
+            after |= Q(**{f'{self.field}__isnull': True})
+        return after
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field)
+        payload = {
+            'ordering': f"{'-' if self.descending else ''}{self.field}",
+            'value': self.model_field.value_to_string(obj) if value is not None else None,
+            'id': obj.pk,
+            'reverse': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """
+        Decodes the cursor parameter of the request.
+
+        :return: A dictionary with the ordering value, id and direction, or None on the first page.
+        :raises NotFound: If the cursor is malformed or belongs to another ordering.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            expected_ordering = f"{'-' if self.descending else ''}{self.field}"
+            if payload['ordering'] != expected_ordering:
+                raise ValueError(payload['ordering'])
+            value = payload['value']
+            return {
+                'value': self.model_field.to_python(value) if value is not None else None,
+                'id': int(payload['id']),
+                'reverse': bool(payload['reverse']),
+            }
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        if not self.page or (not reverse and not self.has_more):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        if not self.page or not self.cursor or (reverse and not self.has_more):
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class KeysetPaginationMixin:
+    """
+    Switches a generic view to `keyset_pagination_class` when the client requests
+    cursor pagination and keeps `pagination_class` (or no pagination) otherwise.
+    """
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if self.keyset_pagination_class and self.keyset_pagination_class.is_requested(self.request):
+                pagination_class = self.keyset_pagination_class
+            self._paginator = pagination_class() if pagination_class is not None else None
+        return self._paginator
+
+
+class OptInPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that is only applied when the request contains a `page` or
+    `page_size` parameter, so clients expecting a plain list keep getting one.
+
+    The plain list is deprecated: it contains at most `UNPAGINATED_LIST_LIMIT` rows,
+    carries a `Deprecation: true` header and, if rows were left out, an
+    `X-Result-Truncated: true` header and a `Link` to the first page. Clients should
+    switch to the paginated response.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the requested page, or the rows of the plain list limited to
+        `UNPAGINATED_LIST_LIMIT`, fetching one row more to find out whether it is truncated.
+        """
+        params = request.query_params
+        self.unpaginated = self.page_query_param not in params and self.page_size_query_param not in params
+        if not self.unpaginated:
+            return super().paginate_queryset(queryset, request, view=view)
+        self.request = request
+        limit = getattr(settings, 'UNPAGINATED_LIST_LIMIT', 1000)
+        if limit is None:
+            self.truncated = False
+            return list(queryset)
+        rows = list(queryset[:limit + 1])
+        self.truncated = len(rows) > limit
+        return rows[:limit]
+
+    def get_paginated_response(self, data):
+        if not self.unpaginated:
+            return super().get_paginated_response(data)
+        headers = {'Deprecation': 'true'}
+        if self.truncated:
+            first_page = replace_query_param(self.request.build_absolute_uri(), self.page_query_param, 1)
+            headers.update({'X-Result-Truncated': 'true', 'Link': f'<{first_page}>; rel="first"'})
+        return Response(data, headers=headers)
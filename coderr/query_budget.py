@@ -0,0 +1,73 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+_unbudgeted = ContextVar('unbudgeted', default=False)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Counts every query executed on the connection and passes it on unchanged.
+        Queries run inside `unbudgeted()` are not counted.
+        """
+        if not _unbudgeted.get():
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Excludes queries of infrastructure code, e.g. a database cache backend, from
+    the query budget of the current request.
+    """
+    token = _unbudgeted.set(True)
+    try:
+        yield
+    finally:
+        _unbudgeted.reset(token)
+
+
+class QueryBudgetMixin:
+    """
+    Declares the maximum number of database queries a view may run per request method.
+
+    Views list their budget in `query_budget`, e.g. `{'GET': 4}`. The budget covers the
+    whole request including authentication. When a request exceeds it, a
+    QueryBudgetExceeded exception is raised if `QUERY_BUDGET_ENFORCE` is enabled,
+    which the settings do only for the test suite, otherwise a warning is logged.
+    """
+    query_budget = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.query_budget.get(request.method)
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > budget:
+            message = (
+                f"{self.__class__.__name__} ran {counter.count} queries for "
+                f"{request.method} {request.path}, budget is {budget}."
+            )
+            if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
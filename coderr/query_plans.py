@@ -0,0 +1,74 @@
+from django.db import connections
+from django.db.models import F
+
+
+def explain_query_plan(queryset):
+    """
+    Returns the SQLite query plan of a queryset as a list of plan steps,
+    e.g. `SEARCH orders_order USING INDEX order_business_status_idx (business_user_id=? AND status=?)`.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_table_scans(plan):
+    """
+    Returns the steps of a query plan that read a whole table instead of using an index.
+    """
+    return [step for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+
+
+def hot_queries(business_user, customer_user):
+    """
+    Returns the queries behind the most frequent order and review requests, keyed by a label.
+
+    The querysets are built like in the views: the order list of a user, filtered by
+    role and status, the order counts of a business user, and the review lists filtered
+    by business user or reviewer, in their default and their cursor pagination ordering,
+    pages of the profile directories in their orderings, and the uniqueness check of
+    the registration.
+
+    :param business_user: A business user receiving orders and reviews.
+    :param customer_user: A customer user placing orders and writing reviews.
+    :return: A dictionary mapping labels to querysets.
+    """
+    from django.contrib.auth.models import User
+    from django.db.models import Q
+    from orders.api.views import OrderListAPIView
+    from orders.models import Order
+    from reviews.models import Review
+    from user_auth.api.ordering import OrderingHelperProfiles
+    from user_auth.api.views import ProfileListBusiness, ProfileListCustomers
+
+    def keyset(queryset, field):
+        return queryset.order_by(F(field).desc(nulls_last=True), F('id').desc())[:20]
+
+    def directory(view, ordering):
+        queryset = view().get_queryset()
+        return OrderingHelperProfiles.apply_ordering(queryset, ordering, business=view.profile_type == 'business')[:20]
+
+    orders = OrderListAPIView().get_user_orders(business_user)
+    return {
+        'order list': orders[:20],
+        'order list, cursor': keyset(orders, 'created_at'),
+        'order list as seller': keyset(orders.filter(business_user=business_user), 'created_at'),
+        'order list as buyer': keyset(orders.filter(customer_user=customer_user), 'created_at'),
+        'order list as seller by status': keyset(
+            orders.filter(business_user=business_user, status='in_progress'), 'created_at'),
+        'open order count': Order.objects.filter(business_user=business_user, status='in_progress').values('pk'),
+        'completed order count': Order.objects.filter(business_user=business_user, status='completed').values('pk'),
+        'reviews of business': Review.objects.filter(business_user_id=business_user.pk).order_by('-updated_at')[:20],
+        'reviews of business, cursor': keyset(Review.objects.filter(business_user_id=business_user.pk), 'updated_at'),
+        'reviews of business by rating': keyset(Review.objects.filter(business_user_id=business_user.pk), 'rating'),
+        'reviews of reviewer': keyset(Review.objects.filter(reviewer_id=customer_user.pk), 'updated_at'),
+        'duplicate review check': Review.objects.filter(reviewer=customer_user, business_user=business_user).values('pk')[:1],
+        'business directory by name': directory(ProfileListBusiness, 'name'),
+        'business directory by location': directory(ProfileListBusiness, '-location'),
+        'business directory by rating': directory(ProfileListBusiness, '-rating'),
+        'business directory by completed orders': directory(ProfileListBusiness, '-completed_orders'),
+        'customer directory by name': directory(ProfileListCustomers, 'name'),
+        'registration uniqueness check': User.objects.filter(
+            Q(username=customer_user.username) | Q(email=customer_user.email)).values('pk')[:1],
+    }
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -72,6 +73,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'coderr.identity_map.identity_map_middleware',
 ]
 
 ROOT_URLCONF = 'coderr.urls'
@@ -106,6 +108,29 @@ DATABASES = {
 }
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+# PASSWORD_HASH_ITERATIONS sets the hash cost of new passwords; stored hashes are
+# rehashed with it on the next login. Login and registration hash in a pool of
+# PASSWORD_HASHING_WORKERS threads per process (see user_auth/hashers.py), by default
+# half of the CPU cores, so the other requests keep the rest. When
+# PASSWORD_HASHING_QUEUE more jobs are waiting, further requests get a 503 response
+# asking the client to retry after PASSWORD_HASHING_RETRY_AFTER seconds.
+
+PASSWORD_HASHERS = [
+    'user_auth.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = 870000
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASHING_QUEUE = 16
+PASSWORD_HASHING_RETRY_AFTER = 1
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -149,10 +174,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user_auth.authentication.CachedTokenAuthentication',
     ],
     
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The offer list cache works with any backend. For several worker processes use a
+# shared one, e.g. 'django.core.cache.backends.filebased.FileBasedCache' or
+# 'django.core.cache.backends.db.DatabaseCache' (after `manage.py createcachetable`).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+OFFER_LIST_CACHE_ALIAS = 'default'
+OFFER_LIST_CACHE_TIMEOUT = 300
+
+# The base-info snapshot is recomputed after BASE_INFO_FRESH_FOR seconds. For another
+# BASE_INFO_STALE_FOR seconds the previous snapshot is served while one request recomputes it.
+BASE_INFO_CACHE_ALIAS = 'default'
+BASE_INFO_FRESH_FOR = 30
+BASE_INFO_STALE_FOR = 300
+
+
+# Authenticated tokens are cached per process (see user_auth/authentication.py). Changes
+# made in one process reach the caches of the others after at most TOKEN_AUTH_CACHE_TTL
+# seconds, e.g. a deleted token stays valid there until then.
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+
+
+# Users and profiles are loaded at most once per request (see coderr/identity_map.py).
+# The header X-Identity-Map-Saved reports how many lookups the identity map saved.
+IDENTITY_MAP_DEBUG_HEADER = DEBUG
+
+
+# The order list and the profile directories answer requests without `page` or `page_size`
+# with a plain list (see coderr/pagination.py). It is deprecated and limited to this many
+# rows; None lifts the limit.
+UNPAGINATED_LIST_LIMIT = 1000
+
+
+# Views using coderr.query_budget.QueryBudgetMixin raise an exception instead of
+# logging a warning when a request runs more queries than declared. Enabled for the
+# test suite or with the environment variable QUERY_BUDGET_ENFORCE=1; in development,
+# DEBUG included, and in production an exceeded budget is only logged.
+QUERY_BUDGET_ENFORCE = sys.argv[1:2] == ['test'] or os.environ.get('QUERY_BUDGET_ENFORCE') == '1'
+
+
+# Offer images and profile files get resized variants, generated after the upload by a
+# pool of background threads (see coderr/images.py). Requires Pillow; without it the
+# variant URLs point to the original files.
+IMAGE_VARIANT_WORKERS = 2
+
+
+# Order events are streamed to clients by orders.api.streams, which requires an ASGI
+# server (coderr/asgi.py). The broker delivers them to the clients of this process; replace it
+# with an implementation of the same interface to fan out across worker processes.
+# Streams end after ORDER_EVENTS_MAX_LIFETIME seconds and the clients reconnect.
+ORDER_EVENTS_BROKER = 'orders.events.InProcessBroker'
+ORDER_EVENTS_HEARTBEAT = 15
+ORDER_EVENTS_MAX_LIFETIME = 300
@@ -0,0 +1,49 @@
+import re
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from coderr.query_plans import explain_query_plan, full_table_scans
+
+
+class DirtyFieldsAssertionsMixin:
+    """
+    TestCase mixin asserting which queries saving a model instance runs.
+    """
+
+    def assertSaveRunsNoQuery(self, instance):
+        with self.assertNumQueries(0, using=instance._state.db):
+            instance.save()
+
+    def assertSaveUpdatesOnly(self, instance, columns):
+        """
+        Asserts that saving the instance runs exactly one UPDATE of its table, and that
+        it sets exactly the given columns.
+
+        :return: The captured queries, e.g. to check further statements.
+        """
+        with CaptureQueriesContext(connections[instance._state.db]) as queries:
+            instance.save()
+        table = instance._meta.db_table
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 1, updates)
+        assignments = re.search(r' SET (.*) WHERE ', updates[0]).group(1)
+        self.assertEqual(set(re.findall(r'"(\w+)" = ', assignments)), set(columns), updates[0])
+        return queries.captured_queries
+
+
+class QueryPlanAssertionsMixin:
+    """
+    TestCase mixin asserting how SQLite answers a query. Other databases skip the test.
+    """
+
+    def assertUsesIndex(self, queryset, index, allow_scans=False):
+        """
+        Asserts that the plan of the queryset reads through the given index and, unless
+        `allow_scans` is set, reads no table without an index.
+        """
+        if connections[queryset.db].vendor != 'sqlite':
+            self.skipTest("EXPLAIN QUERY PLAN is only checked on SQLite.")
+        plan = explain_query_plan(queryset)
+        self.assertTrue(any(f' INDEX {index} ' in f'{step} ' for step in plan), f"{index} not used: {plan}")
+        if not allow_scans:
+            self.assertEqual(full_table_scans(plan), [], plan)
@@ -0,0 +1,24 @@
+from django.db import connections
+from rest_framework.filters import SearchFilter
+from offers.search import fts5_supported, search_offers
+
+
+class OfferSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        """
+        Answers the `search` query parameter through the offer full-text index.
+
+        Results are ranked by relevance unless an explicit `ordering` is requested.
+        On databases without FTS5 support it falls back to the `icontains` lookups
+        of the SearchFilter on the view's `search_fields`.
+
+        :param request: The incoming request.
+        :param queryset: A QuerySet of offers.
+        :param view: The view handling the request.
+        :return: The filtered QuerySet.
+        """
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not fts5_supported(connections[queryset.db]):
+            return super().filter_queryset(request, queryset, view)
+        ranked = 'ordering' not in request.query_params
+        return search_offers(queryset, search_terms, ranked=ranked)
@@ -1,10 +1,35 @@
+from collections import Counter
+from functools import lru_cache
 from rest_framework import serializers
-from django.urls import reverse
+from django.db import transaction
+from django.utils.timezone import now
+from django.urls import reverse, get_script_prefix
 from offers.models import Offer, OfferDetail
-from django.db import models
+from coderr.images import ImageVariantsField
+from coderr.identity_map import get_profile
 from django.shortcuts import get_object_or_404
 
 
+@lru_cache(maxsize=None)
+def _offer_detail_url_prefix(script_prefix):
+    """
+    Resolves the offer detail URL pattern once per script prefix and returns
+    everything in front of the detail id.
+    """
+    return reverse('offerdetails', args=[0]).removesuffix('0/')
+
+
+def build_offer_detail_url(detail_id):
+    """
+    Builds the URL to the detail view of an offer detail without running the
+    URL resolver for every serialized row.
+
+    :param detail_id: The id of the offer detail.
+    :return: A URL to the detail view of the offer detail.
+    """
+    return f"{_offer_detail_url_prefix(get_script_prefix())}{detail_id}/"
+
+
 class OfferUrlSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
 
@@ -19,11 +44,12 @@ class OfferUrlSerializer(serializers.ModelSerializer):
         :param obj: The offer to generate the URL for.
         :return: A URL to the detail view of the offer.
         """
-        return reverse('offerdetails', args=[obj.id])
+        return build_offer_detail_url(obj.id)
 
 
 class OfferSerializer(serializers.ModelSerializer):
     details = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image', Offer.IMAGE_VARIANTS)
     min_price = serializers.SerializerMethodField()
     min_delivery_time = serializers.SerializerMethodField()
     user_details = serializers.SerializerMethodField()
@@ -31,7 +57,7 @@ class OfferSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
         fields = [
-            'id', 'user', 'title', 'image', 'description', 'created_at',
+            'id', 'user', 'title', 'image', 'image_variants', 'description', 'created_at',
             'updated_at', 'details', 'min_price', 'min_delivery_time', 'user_details'
         ]
         extra_kwargs = {'user': {'read_only': True}}
@@ -103,25 +129,27 @@ class OfferSerializer(serializers.ModelSerializer):
         """
         Returns the minimum price of the offer details associated with the offer.
 
-        This method returns the minimum price of the offer details associated with the offer.
-        If there are no offer details associated with the offer, it returns `None`.
+        The value is read from the denormalized `min_price` column of the offer, which is
+        kept up to date whenever offer details are written. If there are no offer details
+        associated with the offer, it returns `None`.
 
         :param obj: The offer instance being serialized.
         :return: The minimum price of the offer details associated with the offer.
         """
-        return obj.details.aggregate(models.Min('price'))['price__min']
+        return obj.min_price
 
     def get_min_delivery_time(self, obj):
         """
         Returns the minimum delivery time in days of the offer details associated with the offer.
 
-        This method returns the minimum delivery time in days of the offer details associated with the offer.
-        If there are no offer details associated with the offer, it returns `None`.
+        The value is read from the denormalized `min_delivery_time` column of the offer, which
+        is kept up to date whenever offer details are written. If there are no offer details
+        associated with the offer, it returns `None`.
 
         :param obj: The offer instance being serialized.
         :return: The minimum delivery time in days of the offer details associated with the offer.
         """
-        return obj.details.aggregate(models.Min('delivery_time_in_days'))['delivery_time_in_days__min']
+        return obj.min_delivery_time
 
     def get_user_details(self, obj):
         """
@@ -129,12 +157,13 @@ class OfferSerializer(serializers.ModelSerializer):
 
         This method fetches the profile of the user related to the provided offer
         instance and constructs a dictionary containing the user's first name, 
-        last name, and username.
+        last name, and username. The profile is looked up through the request's
+        identity map, so offers of the same seller share one profile instance.
 
         :param obj: The offer instance containing the user information.
         :return: A dictionary with the user's first name, last name, and username.
         """
-        profile = obj.user.profile
+        profile = get_profile(obj.user)
         return {"first_name": profile.first_name, "last_name": profile.last_name, "username": profile.username}
 
     def create(self, validated_data):
@@ -151,6 +180,7 @@ class OfferSerializer(serializers.ModelSerializer):
         validated_details = validated_data.pop('validated_details')
         offer = Offer.objects.create(**validated_data)
         OfferDetail.objects.bulk_create([OfferDetail(offer=offer, **detail) for detail in validated_details])
+        offer.refresh_min_values()
         return offer
 
 
@@ -233,7 +263,8 @@ class OfferSingleDetailsSerializer(serializers.ModelSerializer):
 
 
 class AllOfferDetailsSerializer(serializers.ModelSerializer):
-    details = OfferSingleDetailsSerializer(many=True)
+    details = OfferSingleDetailsSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField('image', Offer.IMAGE_VARIANTS)
     min_price = serializers.SerializerMethodField()
     min_delivery_time = serializers.SerializerMethodField()
     user_details = serializers.SerializerMethodField()
@@ -241,7 +272,7 @@ class AllOfferDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
         fields = [
-            'id', 'user', 'user_details', 'image', 'title', 'description', 
+            'id', 'user', 'user_details', 'image', 'image_variants', 'title', 'description', 
             'details', 'min_price', 'min_delivery_time', 'created_at', 'updated_at'
         ]
 
@@ -252,7 +283,7 @@ class AllOfferDetailsSerializer(serializers.ModelSerializer):
         :param obj: The given offer.
         :return: The minimum price of the offer details.
         """
-        return obj.details.aggregate(min_price=models.Min('price'))['min_price']
+        return obj.min_price
 
     def get_min_delivery_time(self, obj):
         """
@@ -261,7 +292,7 @@ class AllOfferDetailsSerializer(serializers.ModelSerializer):
         :param obj: The given offer.
         :return: The minimum delivery time in days of the offer details.
         """
-        return obj.details.aggregate(min_delivery=models.Min('delivery_time_in_days'))['min_delivery']
+        return obj.min_delivery_time
 
     def get_user_details(self, obj):
         """
@@ -271,7 +302,7 @@ class AllOfferDetailsSerializer(serializers.ModelSerializer):
         :return: A dictionary containing the user details of the given offer.
         """
         user = obj.user
-        profile = user.profile
+        profile = get_profile(user)
         return {
             "first_name": profile.first_name,
             "last_name": profile.last_name,
@@ -283,80 +314,117 @@ class AllOfferDetailsSerializer(serializers.ModelSerializer):
         Validates the given data and returns a dictionary with the validated details.
 
         This method checks that the given data contains valid offer details. It loops
-        through the given details and validates each one using the OfferDetailSerializer.
+        once through the given details and validates each one using the OfferDetailSerializer.
         If any detail is invalid, it appends the errors to the errors list. If the list
         of errors is not empty after validation, it raises a serializers.ValidationError
         with the list of errors.
 
         If all details are valid, it sets the validated_details key in the attrs dictionary
-        to a list of validated details and returns the attrs dictionary.
+        to a list of (detail id, validated detail data) tuples and returns the attrs dictionary.
 
         :param attrs: The given data.
         :return: A dictionary with the validated details.
         """
-        details_data = self.initial_data.get('details', [])
+        details_data = self.initial_data.get('details') or []
         errors = []
+        validated_details = []
         for detail in details_data:
             detail_serializer = OfferDetailSerializer(data=detail)
-            if not detail_serializer.is_valid():
+            if detail_serializer.is_valid():
+                validated_details.append((detail.get('id'), detail_serializer.validated_data))
+            else:
                 errors.append(detail_serializer.errors)
 
         if errors:
             raise serializers.ValidationError({"detail": [errors]})
 
-        attrs['validated_details'] = [
-            detail_serializer.validated_data 
-            for detail_serializer in (OfferDetailSerializer(data=d) for d in details_data) 
-            if detail_serializer.is_valid()
-        ]
+        attrs['validated_details'] = validated_details
         return attrs
 
     def update(self, instance, validated_data):
         """
         Updates an offer and its related offer details.
 
-        This method loops through the validated data and updates the corresponding
-        fields of the offer instance. If the validated data contains a 'details' key,
-        it calls the `_update_details` method to update the related offer details.
+        The changes are applied by `save_offer_updates` in a single transaction,
+        with one bulk update for all changed offer details.
 
         :param instance: The offer instance to update.
         :param validated_data: The validated data to update the offer with.
         :return: The updated offer instance.
         """
-        details_data = validated_data.pop('details', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        if details_data:
-            self._update_details(instance, details_data)
-        instance.save()
+        save_offer_updates([(instance, validated_data)])
         return instance
 
-    def _update_details(self, instance, details_data):
 
-        existing_details = {detail.id: detail for detail in instance.details.all()}
+class OfferBatchListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        """
+        Validates the entries of a batch update and rejects offers listed more than once,
+        which would otherwise be changed twice. The errors are reported per entry.
+        """
+        validated = super().to_internal_value(data)
+        counts = Counter(item['id'] for item in validated)
+        if any(count > 1 for count in counts.values()):
+            raise serializers.ValidationError([
+                {'id': ["Dieses Angebot ist mehrfach enthalten."]} if counts[item['id']] > 1 else {}
+                for item in validated
+            ])
+        return validated
+
+
+class OfferBatchItemSerializer(serializers.Serializer):
+    """
+    Validates the `id` of one entry of a batch update. The other fields are validated
+    by AllOfferDetailsSerializer once the offer is loaded.
+    """
+    default_error_messages = {'invalid': "Jedes Angebot muss als Objekt übergeben werden."}
+    id = serializers.IntegerField(min_value=1, error_messages={
+        'invalid': "Die ID muss eine ganze Zahl sein.",
+        'max_string_length': "Die ID muss eine ganze Zahl sein.",
+        'min_value': "Die ID muss eine positive Zahl sein.",
+        'required': "Dieses Feld darf nicht leer sein.",
+        'null': "Dieses Feld darf nicht leer sein.",
+    })
 
-        for detail_data in details_data:
-            detail_id = detail_data.get('id')
+    class Meta:
+        list_serializer_class = OfferBatchListSerializer
 
-            if detail_id:
-                if detail_id in existing_details:
-                    self._update_detail_instance(existing_details.pop(detail_id), detail_data)
-                else:
-                    continue
 
-    def _update_detail_instance(self, detail_instance, detail_data):
-        """
-        Updates the given offer detail instance with the provided data.
+def save_offer_updates(updates):
+    """
+    Applies validated changes to one or more offers and their offer details.
 
-        This method iterates through the given `detail_data` and sets the
-        corresponding attribute on the `detail_instance` using the provided value.
-        Finally, it saves the updated offer detail instance.
+    All offer details of all offers are written with one `bulk_update`, every offer is
+    saved once, which also touches its `updated_at`, and the minimum values of all
+    offers are refreshed with one statement. Everything runs in one transaction.
+    Details whose id does not belong to the offer are ignored.
 
-        :param detail_instance: The offer detail instance being updated.
-        :param detail_data: A dictionary containing the data to update the
-                            offer detail instance with.
-        """
-        for attr, value in detail_data.items():
-            setattr(detail_instance, attr, value)
-        detail_instance.save()
\ No newline at end of file
+    :param updates: A list of (offer, validated data) tuples. The offers should have
+                    their details prefetched.
+    """
+    changed_details = []
+    detail_fields = set()
+    for offer, validated_data in updates:
+        details_data = validated_data.pop('validated_details', [])
+        for attr, value in validated_data.items():
+            setattr(offer, attr, value)
+
+        existing_details = {detail.id: detail for detail in offer.details.all()}
+        for detail_id, detail_data in details_data:
+            detail = existing_details.get(detail_id)
+            if detail is None:
+                continue
+            for attr, value in detail_data.items():
+                setattr(detail, attr, value)
+            detail.round_price()
+            detail.updated_at = now()
+            detail_fields.update(detail_data, ['updated_at'])
+            changed_details.append(detail)
+
+    with transaction.atomic():
+        if changed_details:
+            OfferDetail.objects.bulk_update(changed_details, sorted(detail_fields))
+        for offer, _ in updates:
+            offer.save()
+        if changed_details:
+            Offer.objects.filter(pk__in=[offer.pk for offer, _ in updates]).refresh_min_values()
@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('offers/', views.OfferListAPIView.as_view(), name='offers'),
+    path('offers/batch/', views.OfferBatchUpdateAPIView.as_view(), name='offers-batch'),
+    path('offers/facets/', views.OfferFacetsAPIView.as_view(), name='offers-facets'),
+    path('offers/cache-stats/', views.OfferListCacheStatsAPIView.as_view(), name='offers-cache-stats'),
     path('offers/<int:pk>/', views.OfferDetailsAPIView.as_view()),
     path('offerdetails/<int:pk>/', views.OfferDetailAPIView.as_view(), name='offerdetails'),
 ]
\ No newline at end of file
@@ -5,19 +5,27 @@ from offers.models import Offer
 from offers.api.serializers import OfferSerializer  
 from rest_framework.permissions import IsAuthenticatedOrReadOnly  
 from django_filters.rest_framework import DjangoFilterBackend 
-from rest_framework.filters import SearchFilter, OrderingFilter   
+from rest_framework.filters import OrderingFilter   
+from offers.api.filters import OfferSearchFilter  
 from offers.api.ordering import OrderingHelperOffers  
-from django.db.models import Min 
 from offers.api.permissions import IsOwnerOrAdmin  
-from offers.api.serializers import OfferSingleDetailsSerializer, AllOfferDetailsSerializer, OfferDetailSerializer
+from offers.api.serializers import OfferSingleDetailsSerializer, AllOfferDetailsSerializer, OfferDetailSerializer, OfferBatchItemSerializer, save_offer_updates
 from django.shortcuts import get_object_or_404  
 from rest_framework.exceptions import PermissionDenied  
 from rest_framework.response import Response  
 from rest_framework import status  
 from rest_framework.views import APIView 
 from offers.models import OfferDetail  
-from django.utils.timezone import now  
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from offers import cache as offer_list_cache
+from offers.facets import offer_facets
+from coderr.query_budget import QueryBudgetMixin
+from coderr.pagination import KeysetPagination, KeysetPaginationMixin
+from coderr.conditional import conditional_get, make_etag
+from coderr.images import variant_urls
+from coderr.identity_map import get_profile
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
 
 
 
@@ -27,20 +35,29 @@ class OfferPagination(PageNumberPagination):
     page_size_query_param = 'page_size' 
 
 
+class OfferKeysetPagination(KeysetPagination):  
+    max_page_size = 6  
+    page_size = 6  
+    ordering_fields = ('updated_at', 'created_at', 'min_price')  
+    default_ordering = '-updated_at'  
+
+
 class BusinessProfileRequired(APIException):  
     status_code = 403  
     default_code = "business_profile_required"  
     default_detail = {"detail": ["Nur Geschäftskunden ist die Erstellung von Angeboten erlaubt."]}  
 
 
-class OfferListAPIView(ListCreateAPIView):  
-    queryset = Offer.objects.annotate(min_price=Min('details__price'))  
+class OfferListAPIView(QueryBudgetMixin, KeysetPaginationMixin, ListCreateAPIView):  
+    queryset = Offer.objects.select_related('user__profile').prefetch_related('details')  
     serializer_class = OfferSerializer 
     permission_classes = [IsAuthenticated] 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]  
+    filter_backends = [DjangoFilterBackend, OfferSearchFilter, OrderingFilter]  
     pagination_class = OfferPagination  
+    keyset_pagination_class = OfferKeysetPagination  
     filterset_fields = ['user'] 
     search_fields = ['title', 'description']  
+    query_budget = {'GET': 4}  
 
 
     def get_permissions(self):
@@ -56,6 +73,45 @@ class OfferListAPIView(ListCreateAPIView):
         if self.request.method == 'GET': 
             return [AllowAny()]
         return super().get_permissions()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns a page of offers, served from the offer list cache when possible.
+
+        The cache key is built from the normalized filter, search, ordering and pagination
+        parameters and the current cache generation, which is bumped on every write to
+        offers and offer details and on name changes of their owners (see offers/signals.py).
+        Requests with other query parameters bypass the cache.
+        The `X-Cache` header reports HIT, MISS or BYPASS.
+
+        The cache key doubles as ETag, so clients polling with `If-None-Match` get a
+        304 response without any query as long as no offer changed.
+        """
+        cache_key = offer_list_cache.get_cache_key(request)
+        if cache_key is None:
+            offer_list_cache.record('bypassed')
+            response = super().list(request, *args, **kwargs)
+            response['X-Cache'] = 'BYPASS'
+            return response
+
+        etag = make_etag(cache_key)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            offer_list_cache.record('hits')
+            return not_modified
+
+        data = offer_list_cache.get_response_data(cache_key)
+        if data is not None:
+            offer_list_cache.record('hits')
+            response = Response(data, status=status.HTTP_200_OK)
+            response['X-Cache'] = 'HIT'
+        else:
+            offer_list_cache.record('misses')
+            response = super().list(request, *args, **kwargs)
+            offer_list_cache.set_response_data(cache_key, response.data)
+            response['X-Cache'] = 'MISS'
+        response['ETag'] = etag
+        return response
     
     def get_queryset(self):  
         """
@@ -66,13 +122,20 @@ class OfferListAPIView(ListCreateAPIView):
         - `min_price`: the minimum price of the offer
         - `max_delivery_time`: the maximum delivery time of the offer
 
+        The price and delivery time filters read the precomputed `min_price` and
+        `min_delivery_time` columns: an offer has a detail deliverable within
+        `max_delivery_time` days exactly if its minimum delivery time is within it.
+        Filters on other detail fields should use `Offer.objects.with_detail(...)`.
+
         The queryset is ordered by the `ordering` query parameter, which defaults to `updated_at`.
+        The user and profile are joined and the details are prefetched, so a page of offers
+        is serialized with a fixed number of queries.
         """
-        queryset = Offer.objects.annotate(min_price=Min('details__price'))  
+        queryset = Offer.objects.select_related('user__profile').prefetch_related('details')  
         filters = {  
             'user_id': self.request.query_params.get('creator_id'),  
             'min_price__gte': self.request.query_params.get('min_price'),  
-            'details__delivery_time_in_days__lte': self.request.query_params.get('max_delivery_time')  
+            'min_delivery_time__lte': self.request.query_params.get('max_delivery_time')  
         }
         for field, value in filters.items():  
             if value:
@@ -107,23 +170,162 @@ class OfferListAPIView(ListCreateAPIView):
         :param user: The user to check.
         :return: True if the user is a business user, False otherwise.
         """
-        profile = getattr(user, 'profile', None)  
+        profile = get_profile(user)  
         return profile and profile.type == 'business'  
 
 
+def offer_update_data(offer):  
+    """
+    Returns the representation of an offer after an update.
+
+    :param offer: The updated offer with its details prefetched.
+    :return: A dictionary with the offer's id, title, description, details, image URL
+             and image variant URLs.
+    """
+    return {
+        'id': offer.id,
+        'title': offer.title,
+        'description': offer.description,
+        'details': OfferDetailSerializer(offer.details.all(), many=True).data,
+        'image': offer.image.url if offer.image else None,
+        'image_variants': variant_urls(offer.image, offer.image_variants, Offer.IMAGE_VARIANTS)
+    }
+
+
+class OfferBatchUpdateAPIView(APIView):  
+    permission_classes = [IsAuthenticated]  
+
+    def patch(self, request, format=None):  
+        """
+        Updates several offers and their offer details in one request.
+
+        The request body is a list of offers (or an object with an `offers` list), each with
+        its `id` and the fields to change, e.g. new `details` prices. All offers are loaded
+        with one query and validated first. If any id is not an integer or listed twice, or
+        any offer is unknown, not owned by the user or invalid, nothing is written and the
+        errors are returned per offer. Otherwise all changes are written in one transaction
+        with one bulk update for all offer details.
+
+        :param request: The incoming request.
+        :return: The updated offers with a 200 status code, or the errors with a 400 status code.
+        """
+        items = request.data.get('offers') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": ["Es muss eine Liste von Angeboten übergeben werden."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = OfferBatchItemSerializer(data=items, many=True)
+        if not ids.is_valid():
+            return Response({"detail": ids.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        offer_ids = [entry['id'] for entry in ids.validated_data]
+        offers = Offer.objects.prefetch_related('details').in_bulk(offer_ids)
+        updates, errors = [], []
+        for offer_id, item in zip(offer_ids, items):
+            offer = offers.get(offer_id)
+            if offer is None:
+                errors.append({"id": offer_id, "detail": ["Angebot nicht gefunden."]})
+            elif offer.user_id != request.user.id and not request.user.is_staff:
+                errors.append({"id": offer.id, "detail": ["Nur der Ersteller oder ein Admin kann dieses Angebot bearbeiten."]})
+            elif not (serializer := AllOfferDetailsSerializer(offer, data=item, partial=True)).is_valid():
+                errors.append({"id": offer.id, **serializer.errors})
+            else:
+                updates.append((offer, serializer.validated_data))
+
+        if errors:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+        save_offer_updates(updates)
+        return Response([offer_update_data(offer) for offer, _ in updates], status=status.HTTP_200_OK)
+
+
+class OfferListCacheStatsAPIView(APIView):  
+    permission_classes = [IsAdminUser]  
+
+    def get(self, request, format=None):  
+        """
+        Returns the hit, miss and bypass counters of the offer list cache,
+        the hit ratio and the current cache generation.
+        """
+        return Response(offer_list_cache.get_stats(), status=status.HTTP_200_OK)  
+
+
+class OfferFacetsAPIView(OfferListAPIView):  
+    http_method_names = ['get', 'head', 'options']  
+    query_budget = {'GET': 2}  
+
+    def get(self, request, *args, **kwargs):  
+        """
+        Returns the number of offers per price bucket, delivery time bucket and offer type.
+
+        The offers are filtered exactly like in the offer list, including search, so the
+        counts describe the current result set. All counts come from one aggregate query
+        and are cached under the offer list cache generation, so they are dropped together
+        with the cached list pages whenever an offer changes. The `X-Cache` header reports
+        HIT, MISS or BYPASS.
+        """
+        cache_key = offer_list_cache.get_cache_key(request, namespace='facets')  
+        data = offer_list_cache.get_response_data(cache_key) if cache_key else None  
+        if data is not None:  
+            response = Response(data, status=status.HTTP_200_OK)  
+            response['X-Cache'] = 'HIT'  
+            return response  
+
+        data = offer_facets(self.filter_queryset(self.get_queryset()))  
+        if cache_key is None:  
+            response = Response(data, status=status.HTTP_200_OK)  
+            response['X-Cache'] = 'BYPASS'  
+            return response  
+        offer_list_cache.set_response_data(cache_key, data)  
+        response = Response(data, status=status.HTTP_200_OK)  
+        response['X-Cache'] = 'MISS'  
+        return response  
+
+
+def offer_version(request, pk, *args, **kwargs):  
+    """
+    Returns the version of an offer for conditional requests.
+
+    The version consists of the offer's `updated_at`, the latest `updated_at` of its
+    details, the number of details and the stored image variants. Deleting a detail and
+    storing new image variants also move the offer's `updated_at`, so the last modification
+    time changes with every version. All values are fetched with one aggregate query.
+
+    :return: A tuple of the version values and the last modification time, or None
+             if the offer does not exist.
+    """
+    version = Offer.objects.filter(pk=pk).annotate(
+        details_updated_at=Max('details__updated_at'), detail_count=Count('details')
+    ).values_list('updated_at', 'details_updated_at', 'detail_count', 'image_variants').first()
+    if version is None:
+        return None
+    updated_at, details_updated_at, *_ = version
+    return (pk, *version), max(filter(None, [updated_at, details_updated_at]))
+
+
+def offer_detail_version(request, pk, *args, **kwargs):  
+    """
+    Returns the version of a single offer detail for conditional requests.
+    """
+    updated_at = OfferDetail.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return (pk, updated_at), updated_at
+
+
 class OfferDetailAPIView(APIView):  
     permission_classes = [IsAuthenticated]  
 
+    @conditional_get(offer_detail_version)  
     def get(self, request, pk, format=None):  
         offer = get_object_or_404(OfferDetail, id=pk)  
         serializer = OfferSingleDetailsSerializer(offer) 
         return Response(serializer.data, status=status.HTTP_200_OK)  
 
 
-class OfferDetailsAPIView(RetrieveUpdateDestroyAPIView): 
-    queryset = Offer.objects.prefetch_related('details') 
+class OfferDetailsAPIView(QueryBudgetMixin, RetrieveUpdateDestroyAPIView): 
+    queryset = Offer.objects.select_related('user__profile').prefetch_related('details') 
     serializer_class = AllOfferDetailsSerializer 
     permission_classes = [IsAuthenticated] 
+    query_budget = {'GET': 4} 
 
     def get_permissions(self): 
         """
@@ -139,8 +341,9 @@ class OfferDetailsAPIView(RetrieveUpdateDestroyAPIView):
             return [IsOwnerOrAdmin()]  
         return super().get_permissions() 
     
+    @conditional_get(offer_version)
     def get(self, request, pk, format=None):
-        offer = get_object_or_404(Offer, id=pk)
+        offer = get_object_or_404(self.get_queryset(), id=pk)
         serializer = OfferSerializer(offer)
         data = dict(serializer.data)
         user_details = data.pop("user_details", None)
@@ -150,29 +353,21 @@ class OfferDetailsAPIView(RetrieveUpdateDestroyAPIView):
         
 
     def update(self, request, pk, format=None, *args, **kwargs):
+        """
+        Partially updates the offer and its offer details.
+
+        All details are validated once by the serializer and written with a single
+        bulk update in one transaction together with the offer.
+
+        :param request: The incoming request.
+        :param pk: The primary key of the offer to update.
+        :return: The updated offer with its details.
+        """
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=kwargs.get('partial', True))
         serializer.is_valid(raise_exception=True)
-    
-        details_data = request.data.get('details')
-        for detail_data in details_data:
-            detail_id = detail_data.get('id')
-            if detail_id:
-                OfferDetail.objects.filter(id=detail_id, offer=instance).update(**detail_data)
         serializer.save()
-
-        instance.updated_at = now()
-        
-
-        updated_data = {
-            'id': instance.id,
-            'title': serializer.validated_data.get('title', instance.title),
-            'description': serializer.validated_data.get('description', instance.description),
-            'details': OfferDetailSerializer(instance.details.all(), many=True).data,
-            'image': instance.image.url if instance.image else None
-        }
-
-        return Response(updated_data, status=status.HTTP_200_OK)
+        return Response(offer_update_data(instance), status=status.HTTP_200_OK)
         
 
     def delete(self, request, pk, *args, **kwargs):  
@@ -208,4 +403,4 @@ class OfferDetailsAPIView(RetrieveUpdateDestroyAPIView):
         :param offer: The offer to check.
         :return: True if the user has permission to delete the offer, False otherwise.
         """
-        return user == offer.user or user.is_staff and (user.profile.type == 'business' or user.is_staff)  
\ No newline at end of file
+        return user == offer.user or user.is_staff and (getattr(get_profile(user), 'type', None) == 'business' or user.is_staff)  
\ No newline at end of file
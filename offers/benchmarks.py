@@ -0,0 +1,74 @@
+import random
+
+from django.contrib.auth.models import User
+from offers.models import Offer, OfferDetail
+from user_auth.models import Profile
+
+
+WORDS = [
+    'logo', 'design', 'webseite', 'website', 'shop', 'app', 'entwicklung', 'branding',
+    'seo', 'marketing', 'text', 'übersetzung', 'video', 'schnitt', 'fotografie', 'illustration',
+    'backend', 'frontend', 'django', 'python', 'wordpress', 'beratung', 'social', 'media',
+    'podcast', 'animation', 'print', 'flyer', 'visitenkarte', 'newsletter', 'daten', 'analyse',
+]
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ter', 'ban', 'rix', 'sol', 'vek', 'nu', 'das', 'pra', 'go', 'lin', 'tor', 'fe', 'zu']
+
+VOCABULARY = WORDS + [first + second + third for first in SYLLABLES for second in SYLLABLES for third in SYLLABLES]
+
+OFFER_TYPES = [('basic', 1, 7), ('standard', 2, 4), ('premium', 3, 2)]
+
+
+def _sentence(rng, length, vocabulary=WORDS):
+    return ' '.join(rng.choice(vocabulary) for _ in range(length))
+
+
+def create_business_user(username='benchmark_business'):
+    """
+    Creates a business user with profile that owns the seeded offers.
+    """
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='benchmark')
+    Profile.objects.create(user=user, email=f'{username}@example.com', type='business')
+    return user
+
+
+def seed_offers(count, users=None, batch_size=2000, seed=0):
+    """
+    Bulk creates `count` offers with a basic, standard and premium detail each.
+
+    Prices and delivery times are random. Titles use a small set of common German/English
+    terms while descriptions mix in a few thousand generated words, so search terms
+    range from very common to selective.
+
+    :param count: The number of offers to create.
+    :param users: The users owning the offers. A single business user is created if omitted.
+    :param batch_size: The number of offers written per bulk_create call.
+    :param seed: Seed for the random generator, so runs are reproducible.
+    :return: The list of users owning the offers.
+    """
+    rng = random.Random(seed)
+    users = users or [create_business_user()]
+    for start in range(0, count, batch_size):
+        offers = Offer.objects.bulk_create([
+            Offer(
+                user=rng.choice(users),
+                title=_sentence(rng, 3).capitalize(),
+                description=f'{_sentence(rng, 4)} {_sentence(rng, 16, VOCABULARY)}',
+            )
+            for _ in range(min(batch_size, count - start))
+        ])
+        OfferDetail.objects.bulk_create([
+            OfferDetail(
+                offer=offer,
+                title=f'{offer_type.capitalize()} {rng.choice(WORDS)}',
+                price=round(rng.uniform(20, 500) * factor, 2),
+                delivery_time_in_days=rng.randint(1, max_days * 3),
+                features=[rng.choice(WORDS)],
+                offer_type=offer_type,
+                revisions=factor,
+            )
+            for offer in offers
+            for offer_type, factor, max_days in OFFER_TYPES
+        ])
+    Offer.objects.all().refresh_min_values()
+    return users
@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from coderr.query_budget import unbudgeted
+
+
+GENERATION_KEY = 'offers:list:generation'
+STATS_KEYS = {
+    'hits': 'offers:list:hits',
+    'misses': 'offers:list:misses',
+    'bypassed': 'offers:list:bypassed',
+}
+
+CACHED_QUERY_PARAMS = (
+    'creator_id', 'min_price', 'max_delivery_time', 'ordering', 'search',
+    'page', 'page_size', 'pagination', 'cursor', 'user',
+)
+
+
+def get_cache():
+    return caches[getattr(settings, 'OFFER_LIST_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'OFFER_LIST_CACHE_TIMEOUT', 300)
+
+
+def get_generation():
+    """
+    Returns the current generation of the offer list cache.
+
+    A missing counter is initialized with the current time in milliseconds instead of 1,
+    so entries written before the counter was evicted or the cache was restarted can
+    never be mistaken for the current generation.
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    cache = get_cache()
+    with unbudgeted():
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.add(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def invalidate_offer_list_cache():
+    """
+    Invalidates all cached offer list responses by bumping the generation counter.
+
+    Inside a transaction the counter is bumped immediately and again after the commit.
+    The second bump drops responses that concurrent requests cached from the old data
+    between the first bump and the commit.
+    """
+    bump_generation()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump_generation)
+
+
+def get_cache_key(request, namespace='list'):
+    """
+    Builds the cache key for an offer list request from its normalized query parameters.
+
+    :param request: The incoming request.
+    :param namespace: Separates responses of different endpoints sharing the generation,
+        e.g. 'list' or 'facets'.
+    :return: The cache key, or None if the request contains parameters that are not
+        part of the key and the response must not be cached.
+    """
+    params = {key: value.strip() for key, value in request.query_params.items() if value.strip()}
+    if any(key not in CACHED_QUERY_PARAMS for key in params):
+        return None
+    normalized = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+    digest = hashlib.sha256(f'{request.get_host()}?{normalized}'.encode()).hexdigest()
+    with unbudgeted():
+        return f'offers:{namespace}:{get_generation()}:{digest}'
+
+
+def get_response_data(cache_key):
+    with unbudgeted():
+        return get_cache().get(cache_key)
+
+
+def set_response_data(cache_key, data):
+    with unbudgeted():
+        get_cache().set(cache_key, data, timeout=get_timeout())
+
+
+def record(stat):
+    """
+    Increments one of the hit, miss or bypass counters.
+    """
+    cache = get_cache()
+    with unbudgeted():
+        try:
+            cache.incr(STATS_KEYS[stat])
+        except ValueError:
+            if not cache.add(STATS_KEYS[stat], 1, timeout=None):
+                cache.incr(STATS_KEYS[stat])
+
+
+def get_stats():
+    """
+    Returns the hit, miss and bypass counters together with the hit ratio
+    and the current generation.
+    """
+    with unbudgeted():
+        values = get_cache().get_many(STATS_KEYS.values())
+        stats = {stat: values.get(key, 0) for stat, key in STATS_KEYS.items()}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['generation'] = get_generation()
+    return stats
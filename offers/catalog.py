@@ -0,0 +1,130 @@
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from offers.api.serializers import OfferSerializer
+from offers.models import Offer, OfferDetail
+
+
+DETAIL_FIELDS = ['title', 'revisions', 'delivery_time_in_days', 'price', 'features', 'offer_type']
+
+
+def export_offers(chunk_size=2000):
+    """
+    Yields the whole offer catalog as NDJSON lines, one offer with its details per line.
+
+    Offers are read with `iterator(chunk_size=...)` and the details are prefetched per
+    chunk, so memory use does not grow with the size of the catalog.
+
+    :param chunk_size: The number of offers fetched per database round trip.
+    :return: A generator of JSON lines ending with a newline.
+    """
+    offers = Offer.objects.order_by('id').prefetch_related('details')
+    for offer in offers.iterator(chunk_size=chunk_size):
+        yield json.dumps({
+            'id': offer.id,
+            'user': offer.user_id,
+            'title': offer.title,
+            'description': offer.description,
+            'image': offer.image.name or None,
+            'created_at': offer.created_at.isoformat(),
+            'updated_at': offer.updated_at.isoformat(),
+            'details': [
+                {field: getattr(detail, field) for field in DETAIL_FIELDS}
+                for detail in offer.details.all()
+            ],
+        }, ensure_ascii=False) + '\n'
+
+
+class OfferImporter:
+    """
+    Imports offers with nested details from NDJSON lines in a single pass.
+
+    Every line is validated with the OfferSerializer as soon as it is read. The `image`
+    of an exported offer is the name of a stored file rather than an upload, so it is
+    checked separately and stored as the file name as it is. Valid lines
+    are buffered and written every `batch_size` offers with one bulk_create for the
+    offers and one for their details in a transaction. Invalid lines are reported in
+    `errors` with their line number and never stop the import.
+    """
+
+    def __init__(self, default_user=None, batch_size=1000):
+        self.default_user = default_user
+        self.batch_size = batch_size
+        self.imported = 0
+        self.errors = []
+        self._batch = []
+        self._known_users = {}
+
+    def run(self, lines):
+        """
+        Imports all lines and returns the number of imported offers.
+
+        :param lines: An iterable of NDJSON lines, e.g. an open file.
+        """
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            self.add(line_number, line)
+        self.flush()
+        return self.imported
+
+    def add(self, line_number, line):
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as error:
+            self.errors.append((line_number, {"detail": [f"Ungültiges JSON: {error.msg}."]}))
+            return
+        if not isinstance(payload, dict):
+            self.errors.append((line_number, {"detail": ["Jede Zeile muss ein Angebot enthalten."]}))
+            return
+
+        user_id = payload.get('user', self.default_user.id if self.default_user else None)
+        if not self.user_exists(user_id):
+            self.errors.append((line_number, {"user": ["Der angegebene Nutzer existiert nicht."]}))
+            return
+
+        image = payload.pop('image', None)
+        if image is not None and not isinstance(image, str):
+            self.errors.append((line_number, {"image": ["Das Bild muss als Dateiname angegeben werden."]}))
+            return
+
+        serializer = OfferSerializer(data=payload)
+        if not serializer.is_valid():
+            self.errors.append((line_number, serializer.errors))
+            return
+
+        validated_data = dict(serializer.validated_data)
+        validated_data['image'] = image or None
+        details = validated_data.pop('validated_details')
+        self._batch.append((user_id, validated_data, details))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def user_exists(self, user_id):
+        if not isinstance(user_id, int):
+            return False
+        if user_id not in self._known_users:
+            self._known_users[user_id] = User.objects.filter(pk=user_id).exists()
+        return self._known_users[user_id]
+
+    def flush(self):
+        """
+        Writes the buffered offers and their details.
+        """
+        if not self._batch:
+            return
+        with transaction.atomic():
+            offers = Offer.objects.bulk_create([
+                Offer(user_id=user_id, **validated_data) for user_id, validated_data, _ in self._batch
+            ])
+            details = []
+            for offer, (_, _, offer_details) in zip(offers, self._batch):
+                for detail_data in offer_details:
+                    detail = OfferDetail(offer=offer, **detail_data)
+                    detail.round_price()
+                    details.append(detail)
+            OfferDetail.objects.bulk_create(details, batch_size=self.batch_size)
+            Offer.objects.filter(pk__in=[offer.pk for offer in offers]).refresh_min_values()
+        self.imported += len(offers)
+        self._batch = []
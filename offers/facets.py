@@ -0,0 +1,60 @@
+from django.db.models import Count, Exists, OuterRef, Q
+from offers.models import OfferDetail
+
+
+PRICE_BUCKETS = [(0, 50), (50, 100), (100, 250), (250, 500), (500, 1000), (1000, None)]
+
+DELIVERY_TIME_BUCKETS = [1, 3, 7, 14, 30]
+
+
+def price_bucket_condition(lower, upper):
+    condition = Q(min_price__gte=lower)
+    if upper is not None:
+        condition &= Q(min_price__lt=upper)
+    return condition
+
+
+def facet_aggregates():
+    """
+    Returns the conditional counts making up the offer facets, keyed by alias.
+
+    Price buckets count offers by their cheapest detail, delivery time buckets count
+    offers deliverable within the given number of days, like the `min_price` and
+    `max_delivery_time` filters of the offer list. Offer types are counted through an
+    EXISTS subquery per type, so offers are never joined with their details.
+    """
+    aggregates = {'total': Count('pk')}
+    for index, (lower, upper) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{index}'] = Count('pk', filter=price_bucket_condition(lower, upper))
+    for days in DELIVERY_TIME_BUCKETS:
+        aggregates[f'delivery_{days}'] = Count('pk', filter=Q(min_delivery_time__lte=days))
+    for offer_type, _ in OfferDetail.OFFER_TYPES:
+        has_type = Exists(OfferDetail.objects.filter(offer=OuterRef('pk'), offer_type=offer_type))
+        aggregates[f'type_{offer_type}'] = Count('pk', filter=Q(has_type))
+    return aggregates
+
+
+def offer_facets(queryset):
+    """
+    Counts the offers of a queryset per price bucket, delivery time bucket and offer type.
+
+    All counts are computed by a single aggregate query over the filtered offers.
+
+    :param queryset: A filtered QuerySet of offers.
+    :return: A dictionary with the total and the counts per facet.
+    """
+    counts = queryset.order_by().aggregate(**facet_aggregates())
+    return {
+        'total': counts['total'],
+        'price': [
+            {'min_price': lower, 'max_price': upper, 'count': counts[f'price_{index}']}
+            for index, (lower, upper) in enumerate(PRICE_BUCKETS)
+        ],
+        'delivery_time': [
+            {'max_delivery_time': days, 'count': counts[f'delivery_{days}']}
+            for days in DELIVERY_TIME_BUCKETS
+        ],
+        'offer_type': {
+            offer_type: counts[f'type_{offer_type}'] for offer_type, _ in OfferDetail.OFFER_TYPES
+        },
+    }
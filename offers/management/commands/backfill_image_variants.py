@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from coderr.images import pillow_available, refresh_variants
+from offers.models import Offer
+from user_auth.models import Profile
+
+
+TARGETS = [
+    (Offer, 'image', 'refresh_image_variants'),
+    (Profile, 'file', 'refresh_file_variants'),
+]
+
+
+class Command(BaseCommand):
+    help = "Generates the missing image variants of offer images and profile files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist.")
+        parser.add_argument('--workers', type=int, default=4, help="Number of parallel worker threads.")
+
+    def handle(self, *args, **options):
+        """
+        Collects all offers and profiles with an upload whose variants are missing or
+        belong to a previous upload and renders them with a pool of worker threads.
+        """
+        if not pillow_available():
+            raise CommandError("Pillow is not installed, image variants cannot be generated.")
+
+        jobs = []
+        for model, field, method_name in TARGETS:
+            rows = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            for pk, name, variants in rows.values_list('pk', field, f'{field}_variants').iterator():
+                if options['force'] or variants.get('source') != name:
+                    jobs.append((model, pk, method_name))
+            self.stdout.write(f"{model.__name__}: {sum(job[0] is model for job in jobs)} uploads without current variants.")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for done, _ in enumerate(pool.map(lambda job: refresh_variants(*job), jobs), start=1):
+                if done % 100 == 0:
+                    self.stdout.write(f"{done}/{len(jobs)} uploads processed.")
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {len(jobs)} uploads."))
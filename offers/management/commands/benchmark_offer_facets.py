@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from coderr.benchmark import format_stats, measure, rolled_back
+from offers.benchmarks import seed_offers
+from offers.facets import DELIVERY_TIME_BUCKETS, PRICE_BUCKETS, offer_facets, price_bucket_condition
+from offers.models import Offer, OfferDetail
+from offers.search import fts5_supported, search_offers
+
+
+def naive_offer_facets(queryset):
+    """
+    Computes the same facets as `offer_facets` with one COUNT query per bucket and type,
+    the way a client paging through the offer list would have to.
+    """
+    return {
+        'total': queryset.count(),
+        'price': [
+            {'min_price': lower, 'max_price': upper, 'count': queryset.filter(price_bucket_condition(lower, upper)).count()}
+            for lower, upper in PRICE_BUCKETS
+        ],
+        'delivery_time': [
+            {'max_delivery_time': days, 'count': queryset.filter(min_delivery_time__lte=days).count()}
+            for days in DELIVERY_TIME_BUCKETS
+        ],
+        'offer_type': {
+            offer_type: queryset.with_detail(offer_type=offer_type).count()
+            for offer_type, _ in OfferDetail.OFFER_TYPES
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Checks and times the offer facets: one COUNT per bucket against a single aggregate query."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offers', type=int, default=100_000, help="Number of offers to seed.")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of runs per strategy.")
+
+    def handle(self, *args, **options):
+        """
+        Seeds a catalog inside a transaction that is rolled back afterwards.
+
+        Verifies that both strategies return the same counts for the whole catalog, a
+        filtered catalog and a search, then times them for each of these querysets.
+        """
+        querysets = {
+            'all offers': lambda: Offer.objects.all(),
+            'filtered': lambda: Offer.objects.filter(min_price__gte=100, min_delivery_time__lte=7),
+        }
+        if fts5_supported(connection):
+            querysets['search "design"'] = lambda: search_offers(Offer.objects.all(), ['design'], ranked=False)
+
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['offers']} offers ...")
+            seed_offers(options['offers'])
+
+            for label, queryset in querysets.items():
+                if naive_offer_facets(queryset()) != offer_facets(queryset()):
+                    raise CommandError(f"The facets differ for {label}.")
+            self.stdout.write(self.style.SUCCESS("Both strategies return the same counts."))
+
+            for label, queryset in querysets.items():
+                self.stdout.write(label)
+                self.stdout.write(format_stats('  one COUNT per bucket', measure(
+                    lambda: naive_offer_facets(queryset()), repeat=options['repeat'])))
+                self.stdout.write(format_stats('  single aggregate', measure(
+                    lambda: offer_facets(queryset()), repeat=options['repeat'])))
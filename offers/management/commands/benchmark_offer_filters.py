@@ -0,0 +1,56 @@
+import itertools
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from coderr.benchmark import format_stats, measure, rolled_back
+from offers.benchmarks import seed_offers
+from offers.models import Offer
+
+
+MAX_DELIVERY_TIMES = [1, 2, 3, 5, 8]
+
+
+class Command(BaseCommand):
+    help = "Checks and times the max_delivery_time filter: join, EXISTS subquery and precomputed column."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offers', type=int, default=100_000, help="Number of offers to seed.")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of runs per strategy.")
+
+    def handle(self, *args, **options):
+        """
+        Seeds a catalog inside a transaction that is rolled back afterwards.
+
+        First verifies that all strategies return the same offers without duplicates
+        for several delivery times, then times the first page plus the total count,
+        like OfferListAPIView does.
+        """
+        strategies = {
+            'join + Min annotation': lambda days: Offer.objects.annotate(
+                lowest_price=Min('details__price')
+            ).filter(details__delivery_time_in_days__lte=days),
+            'EXISTS subquery': lambda days: Offer.objects.with_detail(delivery_time_in_days__lte=days),
+            'min_delivery_time column': lambda days: Offer.objects.filter(min_delivery_time__lte=days),
+        }
+
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['offers']} offers ...")
+            seed_offers(options['offers'])
+
+            for days in MAX_DELIVERY_TIMES:
+                expected = set(Offer.objects.filter(details__delivery_time_in_days__lte=days).values_list('id', flat=True))
+                for label, strategy in strategies.items():
+                    ids = list(strategy(days).values_list('id', flat=True))
+                    if set(ids) != expected or len(ids) != len(set(ids)):
+                        raise CommandError(f"{label} returned wrong offers for max_delivery_time={days}.")
+            self.stdout.write(self.style.SUCCESS("All strategies return the same offers without duplicates."))
+
+            for label, strategy in strategies.items():
+                days = itertools.cycle(MAX_DELIVERY_TIMES)
+
+                def run():
+                    queryset = strategy(next(days)).order_by('-updated_at')
+                    queryset.count()
+                    list(queryset[:6])
+
+                self.stdout.write(format_stats(label, measure(run, repeat=options['repeat'])))
@@ -0,0 +1,53 @@
+import itertools
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from coderr.benchmark import format_stats, measure, rolled_back
+from offers.benchmarks import seed_offers
+from offers.models import Offer
+from offers.search import fts5_supported, search_offers
+
+
+SEARCH_TERMS = ['logo', 'webs', 'kaloter', 'übersetzung', 'social media', 'banrix', 'solvek django']
+
+
+class Command(BaseCommand):
+    help = "Compares offer search latency of the FTS5 index against the LIKE based SearchFilter."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offers', type=int, default=100_000, help="Number of offers to seed.")
+        parser.add_argument('--repeat', type=int, default=30, help="Number of searches per backend.")
+
+    def handle(self, *args, **options):
+        """
+        Seeds a catalog inside a transaction that is rolled back afterwards and runs
+        the same searches through both backends. Every search fetches the first page
+        and the total count, like OfferListAPIView does.
+        """
+        if not fts5_supported(connection):
+            raise CommandError("The database does not support FTS5.")
+
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['offers']} offers ...")
+            seed_offers(options['offers'])
+            base = Offer.objects.order_by('-updated_at')
+
+            def like_search(terms):
+                queryset = base
+                for term in terms:
+                    queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+                return queryset
+
+            def fts_search(terms):
+                return search_offers(base, terms)
+
+            for label, backend in [('LIKE (SearchFilter)', like_search), ('FTS5 (OfferSearchFilter)', fts_search)]:
+                terms = itertools.cycle(SEARCH_TERMS)
+
+                def run():
+                    queryset = backend(next(terms).split())
+                    queryset.count()
+                    list(queryset[:6])
+
+                self.stdout.write(format_stats(label, measure(run, repeat=options['repeat'])))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from offers.catalog import export_offers
+
+
+class Command(BaseCommand):
+    help = "Streams all offers with their details as NDJSON (one offer per line)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Path of the NDJSON file. Writes to stdout if omitted.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Offers fetched per query.")
+
+    def handle(self, *args, **options):
+        """
+        Writes the catalog line by line, so memory stays constant for any catalog size.
+        """
+        lines = export_offers(chunk_size=options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stderr.write(f"Exported {count} offers.")
@@ -0,0 +1,39 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from offers.catalog import OfferImporter
+
+
+class Command(BaseCommand):
+    help = "Imports offers with nested details from an NDJSON file (one offer per line)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the NDJSON file, or - to read from stdin.")
+        parser.add_argument('--user', help="Username owning offers whose line has no user id.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Offers written per bulk_create.")
+
+    def handle(self, *args, **options):
+        """
+        Streams the file line by line through the OfferImporter and reports invalid
+        lines with their line number on stderr.
+        """
+        default_user = None
+        if options['user']:
+            default_user = User.objects.filter(username=options['user']).first()
+            if default_user is None:
+                raise CommandError(f"User {options['user']} does not exist.")
+
+        importer = OfferImporter(default_user=default_user, batch_size=options['batch_size'])
+        if options['path'] == '-':
+            importer.run(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                importer.run(lines)
+
+        for line_number, errors in importer.errors:
+            self.stderr.write(f"line {line_number}: {json.dumps(errors, ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} offers, {len(importer.errors)} lines rejected."
+        ))
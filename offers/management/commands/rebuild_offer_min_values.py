@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from offers.models import Offer
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the denormalized min_price and min_delivery_time columns of all offers."
+
+    def handle(self, *args, **options):
+        """
+        Recomputes the minimum price and minimum delivery time of every offer
+        from its offer details with a single bulk UPDATE statement.
+        """
+        updated = Offer.objects.all().refresh_min_values()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed minimum values of {updated} offers."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:12
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def populate_min_values(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    OfferDetail = apps.get_model('offers', 'OfferDetail')
+    details = OfferDetail.objects.filter(offer=OuterRef('pk')).order_by().values('offer')
+    Offer.objects.update(
+        min_price=Subquery(details.annotate(value=Min('price')).values('value')),
+        min_delivery_time=Subquery(details.annotate(value=Min('delivery_time_in_days')).values('value')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0005_remove_offerdetail_business_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='min_delivery_time',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='min_price',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_min_values, migrations.RunPython.noop),
+    ]
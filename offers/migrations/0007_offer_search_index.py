@@ -0,0 +1,114 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:14
+
+import django.db.models.deletion
+import offers.models
+from django.db import migrations, models
+
+
+def rebuild_statement(offer_id):
+    return f"""
+        DELETE FROM offers_offer_fts WHERE rowid = {offer_id};
+        INSERT INTO offers_offer_fts (rowid, title, description, detail_titles)
+        SELECT o.id, o.title, o.description,
+               COALESCE((SELECT group_concat(d.title, ' ') FROM offers_offerdetail d WHERE d.offer_id = o.id), '')
+        FROM offers_offer o WHERE o.id = {offer_id};
+    """
+
+
+CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE offers_offer_fts USING fts5(
+        title, description, detail_titles, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    "INSERT INTO offers_offer_fts (offers_offer_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0)')",
+    f"""
+    CREATE TRIGGER offers_offer_fts_offer_insert AFTER INSERT ON offers_offer BEGIN
+        {rebuild_statement('NEW.id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER offers_offer_fts_offer_update AFTER UPDATE OF title, description ON offers_offer BEGIN
+        {rebuild_statement('NEW.id')}
+    END
+    """,
+    """
+    CREATE TRIGGER offers_offer_fts_offer_delete AFTER DELETE ON offers_offer BEGIN
+        DELETE FROM offers_offer_fts WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER offers_offer_fts_detail_insert AFTER INSERT ON offers_offerdetail BEGIN
+        {rebuild_statement('NEW.offer_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER offers_offer_fts_detail_update AFTER UPDATE OF title, offer_id ON offers_offerdetail BEGIN
+        {rebuild_statement('OLD.offer_id')}
+        {rebuild_statement('NEW.offer_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER offers_offer_fts_detail_delete AFTER DELETE ON offers_offerdetail BEGIN
+        {rebuild_statement('OLD.offer_id')}
+    END
+    """,
+    """
+    INSERT INTO offers_offer_fts (rowid, title, description, detail_titles)
+    SELECT o.id, o.title, o.description,
+           COALESCE((SELECT group_concat(d.title, ' ') FROM offers_offerdetail d WHERE d.offer_id = o.id), '')
+    FROM offers_offer o
+    """,
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS offers_offer_fts_offer_insert",
+    "DROP TRIGGER IF EXISTS offers_offer_fts_offer_update",
+    "DROP TRIGGER IF EXISTS offers_offer_fts_offer_delete",
+    "DROP TRIGGER IF EXISTS offers_offer_fts_detail_insert",
+    "DROP TRIGGER IF EXISTS offers_offer_fts_detail_update",
+    "DROP TRIGGER IF EXISTS offers_offer_fts_detail_delete",
+    "DROP TABLE IF EXISTS offers_offer_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    from offers.search import fts5_supported
+
+    if not fts5_supported(schema_editor.connection):
+        return
+    for statement in CREATE_STATEMENTS:
+        schema_editor.execute(statement, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_STATEMENTS:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0006_offer_min_price_offer_min_delivery_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferSearchIndex',
+            fields=[
+                ('offer', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='offers.offer')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('detail_titles', models.TextField()),
+                ('document', offers.models.FullTextField(db_column='offers_offer_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'offers_offer_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
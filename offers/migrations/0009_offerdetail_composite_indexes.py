@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offerdetail',
+            index=models.Index(fields=['offer', 'delivery_time_in_days'], name='offerdetail_offer_delivery_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offerdetail',
+            index=models.Index(fields=['offer', 'price'], name='offerdetail_offer_price_idx'),
+        ),
+    ]
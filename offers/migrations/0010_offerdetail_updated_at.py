@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def drop_search_triggers(apps, schema_editor):
+    from offers.search import drop_search_triggers
+
+    drop_search_triggers(schema_editor)
+
+
+def create_search_triggers(apps, schema_editor):
+    from offers.search import create_search_triggers
+
+    create_search_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0009_offerdetail_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='offerdetail',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
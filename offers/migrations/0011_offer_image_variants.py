@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+def drop_search_triggers(apps, schema_editor):
+    from offers.search import drop_search_triggers
+
+    drop_search_triggers(schema_editor)
+
+
+def create_search_triggers(apps, schema_editor):
+    from offers.search import create_search_triggers
+
+    create_search_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0010_offerdetail_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='offer',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -1,15 +1,135 @@
 from django.db import models  
+from django.db.models import Exists, Lookup, Min, OuterRef, Subquery
 from django.contrib.auth.models import User  
+from django.utils.timezone import now
+from coderr.dirty_fields import DirtyFieldsMixin
+from coderr.images import delete_variants, render_variants, schedule_variants
+from offers.cache import invalidate_offer_list_cache
+
+class FullTextField(models.TextField):
+    pass
+
+@FullTextField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+class OfferQuerySet(models.QuerySet):
+    def refresh_min_values(self, touch=False):
+        """
+        Recomputes the denormalized min_price and min_delivery_time columns.
+
+        The values are calculated from the related offer details and written back
+        with a single UPDATE statement for all offers in the queryset. Offers without
+        any details end up with NULL in both columns. Since every write to offer details
+        ends here, this also invalidates the cached offer list responses.
+
+        :param touch: Also sets `updated_at` to now in the same UPDATE, for changes that
+            move no other timestamp, e.g. a deleted offer detail.
+        :return: The number of updated offers.
+        """
+        details = OfferDetail.objects.filter(offer=OuterRef('pk')).order_by().values('offer')
+        updated = self.update(
+            min_price=Subquery(details.annotate(value=Min('price')).values('value')),
+            min_delivery_time=Subquery(details.annotate(value=Min('delivery_time_in_days')).values('value')),
+            **({'updated_at': now()} if touch else {}),
+        )
+        invalidate_offer_list_cache()
+        return updated
+
+    def with_detail(self, **lookups):
+        """
+        Keeps the offers that have at least one offer detail matching the given lookups.
+
+        The condition is expressed as an EXISTS subquery instead of a join, so offers
+        are never duplicated and annotations on the queryset are not distorted. The
+        composite indexes on offer details answer it with an index seek per offer.
+
+        :param lookups: Field lookups on OfferDetail, e.g. `price__lte=100`.
+        :return: The filtered QuerySet.
+        """
+        return self.filter(Exists(OfferDetail.objects.filter(offer=OuterRef('pk'), **lookups)))
 
 class Offer(models.Model):  
+    DENORMALIZED_FIELDS = ('min_price', 'min_delivery_time')
+    IMAGE_VARIANTS = {'card': (640, 400), 'thumbnail': (240, 150)}
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)  
     title = models.CharField(max_length=255)  
     description = models.TextField()  
     image = models.FileField(upload_to='uploads/', null=True) 
     updated_at = models.DateTimeField(auto_now=True)  
     created_at = models.DateTimeField(auto_now_add=True)  
+    min_price = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    min_delivery_time = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = OfferQuerySet.as_manager()
 
-class OfferDetail(models.Model):  
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='offer_updated_at_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='offer_created_at_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs): 
+        """
+        Saves the offer instance to the database.
+
+        The min_price and min_delivery_time columns are maintained by the offer details
+        and the image variants by the background workers, so saving an already existing
+        offer never writes them back. This prevents a stale in-memory offer from
+        overwriting values that were refreshed in the meantime. Cached offer list
+        responses are invalidated afterwards, and variants are scheduled for a new image.
+        Deletes invalidate the cache through a signal receiver (see offers/signals.py).
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DENORMALIZED_FIELDS + ('image_variants',)
+            ]
+        super().save(*args, **kwargs) 
+        invalidate_offer_list_cache()
+        if self.image and self.image_variants.get('source') != self.image.name:
+            schedule_variants(self, 'refresh_image_variants')
+
+    def refresh_min_values(self):
+        """
+        Recomputes min_price and min_delivery_time from the offer details
+        and updates both the database row and this instance.
+        """
+        Offer.objects.filter(pk=self.pk).refresh_min_values()
+        self.refresh_from_db(fields=self.DENORMALIZED_FIELDS)
+
+    def refresh_image_variants(self):
+        """
+        Renders the card and thumbnail variants of the offer image and stores their names.
+
+        The names are only written if the offer still has the same image, so a slow
+        worker never attaches variants of a replaced upload; those are deleted again.
+        Once the new names are stored, the variant files of the previous image are deleted.
+        Cached offer list responses are invalidated, since they contain the variant URLs,
+        and `updated_at` is moved, so conditional requests do not answer 304 for the
+        changed offer.
+        """
+        if not self.image:
+            return
+        variants = render_variants(self.image, self.IMAGE_VARIANTS)
+        updated_at = now()
+        if not Offer.objects.filter(pk=self.pk, image=self.image.name).update(image_variants=variants, updated_at=updated_at):
+            delete_variants(self.image.storage, variants)
+            return
+        delete_variants(self.image.storage, self.image_variants, keep=variants)
+        self.image_variants = variants
+        self.updated_at = updated_at
+        invalidate_offer_list_cache()
+
+class OfferDetail(DirtyFieldsMixin, models.Model):  
     OFFER_TYPES = [('basic', 'Basic'), ('standard', 'Standard'), ('premium', 'Premium')]  
 
     title = models.CharField(max_length=255)  
@@ -19,6 +139,13 @@ class OfferDetail(models.Model):
     features = models.JSONField()  
     offer_type = models.CharField(max_length=10, choices=OFFER_TYPES)  
     revisions = models.IntegerField(default=-1)  
+    updated_at = models.DateTimeField(auto_now=True)  
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['offer', 'delivery_time_in_days'], name='offerdetail_offer_delivery_idx'),
+            models.Index(fields=['offer', 'price'], name='offerdetail_offer_price_idx'),
+        ]
 
     def round_price(self): 
         """
@@ -33,8 +160,44 @@ class OfferDetail(models.Model):
         """
         Saves the offer detail instance to the database.
         This method is overridden to round the price of the offer detail to two decimal
-        places before saving it to the database.
+        places before saving it to the database and to refresh the minimum values of
+        the related offer afterwards.
+        An offer detail loaded from the database writes only its changed fields (see
+        DirtyFieldsMixin); the minimum values are only refreshed if the price, the delivery
+        time or the offer changed, otherwise only the cached offer lists are invalidated.
         """
         self.round_price() 
+        if self._state.adding or not self.is_tracked() or kwargs.get('update_fields') is not None:
+            super().save(*args, **kwargs)
+            Offer.objects.filter(pk=self.offer_id).refresh_min_values()
+            return
+        changed = self.get_update_fields()
+        if not changed:
+            return
+        previous_offer_id = self._saved_values.get('offer_id')
+        kwargs['update_fields'] = changed
         super().save(*args, **kwargs) 
+        if {'price', 'delivery_time_in_days', 'offer'} & set(changed):
+            Offer.objects.filter(pk__in={self.offer_id, previous_offer_id} - {None}).refresh_min_values()
+        else:
+            invalidate_offer_list_cache()
+
+class OfferSearchIndex(models.Model):
+    """
+    Read-only view on the SQLite FTS5 table that indexes offer titles, descriptions
+    and offer detail titles. The table and the triggers keeping it in sync with
+    offers and offer details are created by a migration on SQLite builds with FTS5.
+    """
+    offer = models.OneToOneField(
+        Offer, primary_key=True, db_column='rowid', related_name='search_index',
+        on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    title = models.TextField()
+    description = models.TextField()  
+    detail_titles = models.TextField()
+    document = FullTextField(db_column='offers_offer_fts')
+    rank = models.FloatField()
 
+    class Meta:
+        managed = False
+        db_table = 'offers_offer_fts'
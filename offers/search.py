@@ -0,0 +1,144 @@
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _sqlite_has_fts5():
+    """
+    Checks once per process whether the linked SQLite library ships the FTS5 extension.
+    The check runs against a throwaway in-memory database, so it never touches the
+    application database.
+    """
+    with closing(sqlite3.connect(':memory:')) as conn:
+        try:
+            conn.execute('CREATE VIRTUAL TABLE probe USING fts5(content)')
+        except sqlite3.OperationalError:
+            return False
+    return True
+
+
+def fts5_supported(connection):
+    """
+    Returns True if the given database connection can answer offer searches through
+    the FTS5 index created by the offers migrations.
+
+    :param connection: A Django database connection.
+    :return: True for SQLite connections with FTS5 support, False otherwise.
+    """
+    return connection.vendor == 'sqlite' and _sqlite_has_fts5()
+
+
+def _rebuild_statement(offer_id):
+    return f"""
+        DELETE FROM offers_offer_fts WHERE rowid = {offer_id};
+        INSERT INTO offers_offer_fts (rowid, title, description, detail_titles)
+        SELECT o.id, o.title, o.description,
+               COALESCE((SELECT group_concat(d.title, ' ') FROM offers_offerdetail d WHERE d.offer_id = o.id), '')
+        FROM offers_offer o WHERE o.id = {offer_id};
+    """
+
+
+SEARCH_TRIGGERS = {
+    'offers_offer_fts_offer_insert': f"""
+        CREATE TRIGGER offers_offer_fts_offer_insert AFTER INSERT ON offers_offer BEGIN
+            {_rebuild_statement('NEW.id')}
+        END
+    """,
+    'offers_offer_fts_offer_update': f"""
+        CREATE TRIGGER offers_offer_fts_offer_update AFTER UPDATE OF title, description ON offers_offer BEGIN
+            {_rebuild_statement('NEW.id')}
+        END
+    """,
+    'offers_offer_fts_offer_delete': """
+        CREATE TRIGGER offers_offer_fts_offer_delete AFTER DELETE ON offers_offer BEGIN
+            DELETE FROM offers_offer_fts WHERE rowid = OLD.id;
+        END
+    """,
+    'offers_offer_fts_detail_insert': f"""
+        CREATE TRIGGER offers_offer_fts_detail_insert AFTER INSERT ON offers_offerdetail BEGIN
+            {_rebuild_statement('NEW.offer_id')}
+        END
+    """,
+    'offers_offer_fts_detail_update': f"""
+        CREATE TRIGGER offers_offer_fts_detail_update AFTER UPDATE OF title, offer_id ON offers_offerdetail BEGIN
+            {_rebuild_statement('OLD.offer_id')}
+            {_rebuild_statement('NEW.offer_id')}
+        END
+    """,
+    'offers_offer_fts_detail_delete': f"""
+        CREATE TRIGGER offers_offer_fts_detail_delete AFTER DELETE ON offers_offerdetail BEGIN
+            {_rebuild_statement('OLD.offer_id')}
+        END
+    """,
+}
+
+REBUILD_INDEX = """
+    DELETE FROM offers_offer_fts;
+    INSERT INTO offers_offer_fts (rowid, title, description, detail_titles)
+    SELECT o.id, o.title, o.description,
+           COALESCE((SELECT group_concat(d.title, ' ') FROM offers_offerdetail d WHERE d.offer_id = o.id), '')
+    FROM offers_offer o
+"""
+
+
+def drop_search_triggers(schema_editor):
+    """
+    Drops the triggers that keep the offer search index in sync.
+
+    SQLite rebuilds a table for most schema changes. The triggers reference both offer
+    tables and would break that rebuild, so migrations altering `offers_offer` or
+    `offers_offerdetail` have to drop them first and call `create_search_triggers`
+    afterwards.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in SEARCH_TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}', params=None)
+
+
+def create_search_triggers(schema_editor):
+    """
+    Creates the triggers keeping the offer search index in sync and rebuilds the index,
+    so rows written while the triggers were missing are indexed as well.
+    """
+    if not fts5_supported(schema_editor.connection):
+        return
+    for statement in SEARCH_TRIGGERS.values():
+        schema_editor.execute(statement, params=None)
+    for statement in REBUILD_INDEX.strip().split(';'):
+        schema_editor.execute(statement, params=None)
+
+
+def build_match_query(search_terms):
+    """
+    Translates search terms into an FTS5 MATCH expression.
+
+    Every term is quoted, so operators typed by users are matched literally, and
+    turned into a prefix query, so results show up while a word is still being typed.
+    All terms have to match, like with the SearchFilter.
+
+    :param search_terms: A list of search terms.
+    :return: The FTS5 query string.
+    """
+    quoted_terms = ['"{}"*'.format(term.replace('"', '""')) for term in search_terms if term.strip()]
+    return ' '.join(quoted_terms)
+
+
+def search_offers(queryset, search_terms, ranked=True):
+    """
+    Filters a queryset of offers through the full-text index.
+
+    :param queryset: A QuerySet of offers.
+    :param search_terms: A list of search terms.
+    :param ranked: Whether the best matches should be ordered first. The existing
+        ordering of the queryset is kept as tie breaker.
+    :return: The filtered QuerySet.
+    """
+    match_query = build_match_query(search_terms)
+    if not match_query:
+        return queryset
+    queryset = queryset.filter(search_index__document__match=match_query)
+    if ranked:
+        queryset = queryset.order_by('search_index__rank', *queryset.query.order_by)
+    return queryset
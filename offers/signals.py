@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from offers.cache import invalidate_offer_list_cache
+from offers.models import Offer, OfferDetail
+from user_auth.models import Profile
+
+
+USER_DETAIL_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_delete, sender=Offer)
+def invalidate_after_delete(sender, instance, **kwargs):
+    """
+    Invalidates the cached offer list responses when an offer is deleted, for instance
+    and queryset deletes as well as cascades, e.g. when the owner of the offer is deleted.
+    """
+    invalidate_offer_list_cache()
+
+
+@receiver(post_delete, sender=OfferDetail)
+def refresh_min_values_after_delete(sender, instance, **kwargs):
+    """
+    Recomputes the minimum values of the offer of a deleted offer detail, which also
+    invalidates the cached offer list responses. Runs inside the deletion's transaction,
+    for instance and queryset deletes. The offer's `updated_at` is moved as well, since
+    no remaining timestamp records the deletion for conditional requests.
+    """
+    Offer.objects.filter(pk=instance.offer_id).refresh_min_values(touch=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def invalidate_after_user_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidates the cached offer list responses when the name or username of a user
+    or profile may have changed, since every cached offer contains the `user_details`
+    of its owner. Saves limited to other fields, e.g. `last_login`, are ignored.
+    """
+    if kwargs.get('created'):
+        return
+    if update_fields is None or USER_DETAIL_FIELDS & set(update_fields):
+        invalidate_offer_list_cache()
@@ -1,3 +1,362 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import F
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from coderr.testing import DirtyFieldsAssertionsMixin, QueryPlanAssertionsMixin
+from offers.benchmarks import create_business_user, seed_offers
+from offers.cache import invalidate_offer_list_cache
+from offers.catalog import OfferImporter, export_offers
+from offers.models import Offer, OfferDetail
+from user_auth.models import Profile
+
+
+def create_offer(user, title, details):
+    """
+    Creates an offer with one detail per (offer_type, price, delivery_time_in_days) tuple.
+    """
+    offer = Offer.objects.create(user=user, title=title, description=title)
+    for offer_type, price, delivery_time in details:
+        OfferDetail.objects.create(
+            offer=offer, title=offer_type, offer_type=offer_type, price=price,
+            delivery_time_in_days=delivery_time, features=[], revisions=1,
+        )
+    return offer
+
+
+class OfferDetailFilterTests(TestCase):
+    """
+    The EXISTS detail filters return the same offers as the former join filters,
+    each offer once, even if several of its details match.
+    """
+
+    def setUp(self):
+        user = create_business_user()
+        self.fast = create_offer(user, 'fast', [('basic', 50, 1), ('standard', 80, 2), ('premium', 120, 3)])
+        self.mixed = create_offer(user, 'mixed', [('basic', 30, 7), ('standard', 60, 2), ('premium', 200, 1)])
+        self.slow = create_offer(user, 'slow', [('basic', 10, 10), ('standard', 20, 14)])
+        self.empty = Offer.objects.create(user=user, title='empty', description='empty')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def assertOffers(self, queryset, expected):
+        ids = list(queryset.values_list('id', flat=True))
+        self.assertEqual(sorted(ids), sorted(offer.id for offer in expected))
+        self.assertEqual(queryset.count(), len(expected))
+
+    def test_with_detail_matches_join(self):
+        for lookups in [
+            {'delivery_time_in_days__lte': 3},
+            {'delivery_time_in_days__lte': 1},
+            {'price__lte': 100},
+            {'price__gte': 100},
+            {'price__lte': 100, 'delivery_time_in_days__lte': 2},
+            {'offer_type': 'premium', 'price__gte': 150},
+        ]:
+            with self.subTest(lookups):
+                joined = Offer.objects.filter(**{f'details__{key}': value for key, value in lookups.items()})
+                expected = list({offer.id: offer for offer in joined}.values())
+                self.assertGreater(joined.count(), 0)
+                self.assertOffers(Offer.objects.with_detail(**lookups), expected)
+
+    def test_with_detail_results_are_exact(self):
+        self.assertOffers(Offer.objects.with_detail(delivery_time_in_days__lte=2), [self.fast, self.mixed])
+        self.assertOffers(Offer.objects.with_detail(price__lte=30), [self.mixed, self.slow])
+        self.assertOffers(Offer.objects.with_detail(price__gte=1000), [])
+
+    def test_max_delivery_time_filter(self):
+        for days, expected in [(1, [self.fast, self.mixed]), (3, [self.fast, self.mixed]),
+                               (10, [self.fast, self.mixed, self.slow]), (0, [])]:
+            with self.subTest(days=days):
+                response = self.client.get('/api/offers/', {'max_delivery_time': days, 'page_size': 6})
+                self.assertEqual(response.status_code, 200)
+                ids = [offer['id'] for offer in response.data['results']]
+                self.assertEqual(sorted(ids), sorted(offer.id for offer in expected))
+                self.assertEqual(response.data['count'], len(expected))
+
+
+class OfferQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    The offer list filters and orderings are answered through the offer indexes.
+    """
+
+    def test_detail_filters_seek_per_offer(self):
+        # Every offer is checked, but each check is an index seek into its details.
+        self.assertUsesIndex(Offer.objects.with_detail(delivery_time_in_days__lte=3),
+                             'offerdetail_offer_delivery_idx', allow_scans=True)
+        self.assertUsesIndex(Offer.objects.with_detail(price__lte=100), 'offerdetail_offer_price_idx', allow_scans=True)
+
+    def test_list_orderings_walk_indexes(self):
+        newest = Offer.objects.order_by(F('updated_at').desc(nulls_last=True), F('id').desc())[:6]
+        self.assertUsesIndex(newest, 'offer_updated_at_id_idx')
+        self.assertUsesIndex(Offer.objects.order_by('-created_at', '-id')[:6], 'offer_created_at_id_idx')
+
+
+class OfferDetailSaveTests(DirtyFieldsAssertionsMixin, TestCase):
+    """
+    Saving an offer detail writes only the changed columns and refreshes the
+    minimum values of its offer only when they can change.
+    """
+
+    def setUp(self):
+        self.offer = create_offer(create_business_user(), 'Logo', [('basic', 50, 5), ('standard', 80, 3)])
+
+    def test_unchanged_detail_runs_no_query(self):
+        self.assertSaveRunsNoQuery(OfferDetail.objects.filter(offer=self.offer).first())
+
+    def test_changed_title_updates_only_that_column(self):
+        detail = OfferDetail.objects.filter(offer=self.offer).first()
+        detail.title = 'Basic+'
+        queries = self.assertSaveUpdatesOnly(detail, ['title', 'updated_at'])
+        self.assertEqual(len(queries), 1)
+
+    def test_explicit_update_fields_none(self):
+        detail = OfferDetail.objects.filter(offer=self.offer).first()
+        detail.title = 'Basic+'
+        with self.assertNumQueries(1):
+            detail.save(update_fields=None)
+        self.assertEqual(OfferDetail.objects.get(pk=detail.pk).title, 'Basic+')
+
+    def test_changed_price_refreshes_min_values(self):
+        detail = OfferDetail.objects.get(offer=self.offer, offer_type='basic')
+        detail.price = 20
+        self.assertSaveUpdatesOnly(detail, ['price', 'updated_at'])
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).min_price, 20)
+
+    def test_deletes_refresh_min_values(self):
+        OfferDetail.objects.get(offer=self.offer, offer_type='basic').delete()
+        self.assertEqual(Offer.objects.values_list('min_price', 'min_delivery_time').get(pk=self.offer.pk), (80, 3))
+        OfferDetail.objects.filter(offer=self.offer).delete()
+        self.assertEqual(Offer.objects.values_list('min_price', 'min_delivery_time').get(pk=self.offer.pk), (None, None))
+
+
+class OfferQueryBudgetTests(TestCase):
+    """
+    The budgeted offer endpoints run a fixed number of queries, however many offers
+    there are. The list cache is invalidated before every request, so the counts are
+    those of a cache miss.
+    """
+    OFFERS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = seed_offers(cls.OFFERS)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueries(self, num, path):
+        invalidate_offer_list_cache()
+        with self.assertNumQueries(num):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_offer_list(self):
+        response = self.assertQueries(3, '/api/offers/')
+        self.assertEqual(response.data['count'], self.OFFERS)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_offer_facets(self):
+        self.assertQueries(1, '/api/offers/facets/')
+
+    def test_offer_details(self):
+        offer = Offer.objects.first()
+        self.assertEqual(len(self.assertQueries(3, f'/api/offers/{offer.pk}/').data['details']), 3)
+
+
+class OfferListCacheTests(TestCase):
+    """
+    Cached offer list responses are dropped when an offer, one of its details or the
+    name of its owner changes, however the change is made.
+    """
+
+    def setUp(self):
+        self.user = create_business_user()
+        self.offer = create_offer(self.user, 'Logo', [('basic', 50, 5)])
+        create_offer(self.user, 'Website', [('basic', 500, 14)])
+        self.client = APIClient()
+
+    def get_offers(self, expected_cache, **headers):
+        response = self.client.get('/api/offers/', **headers)
+        self.assertEqual(response['X-Cache'], expected_cache)
+        return response
+
+    def test_profile_name_change(self):
+        etag = self.get_offers('MISS')['ETag']
+        self.get_offers('HIT')
+        profile = Profile.objects.get(user=self.user)
+        profile.first_name = 'Ada'
+        profile.save()
+        response = self.get_offers('MISS', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({offer['user_details']['first_name'] for offer in response.data['results']}, {'Ada'})
+
+    def test_unrelated_user_save_keeps_cache(self):
+        self.get_offers('MISS')
+        self.user.save(update_fields=['last_login'])
+        self.get_offers('HIT')
+
+    def test_queryset_and_cascade_deletes(self):
+        self.get_offers('MISS')
+        Offer.objects.filter(pk=self.offer.pk).delete()
+        self.assertEqual(self.get_offers('MISS').data['count'], 1)
+        self.user.delete()
+        self.assertEqual(self.get_offers('MISS').data['count'], 0)
+
+
+class OfferCatalogTests(TestCase):
+    """
+    Exported offers can be imported again, including their image and details.
+    """
+
+    def setUp(self):
+        self.user = create_business_user()
+        self.logo = create_offer(self.user, 'Logo', [('basic', 50, 5), ('premium', 150.5, 2)])
+        Offer.objects.filter(pk=self.logo.pk).update(image='uploads/logo.png')
+        create_offer(self.user, 'Website', [('basic', 500, 14)])
+        OfferDetail.objects.update(features=['Entwurf'])
+
+    def test_round_trip(self):
+        lines = list(export_offers(chunk_size=1))
+        Offer.objects.all().delete()
+        importer = OfferImporter()
+        self.assertEqual(importer.run(lines), 2)
+        self.assertEqual(importer.errors, [])
+
+        logo = Offer.objects.get(title='Logo')
+        self.assertEqual(logo.image.name, 'uploads/logo.png')
+        self.assertEqual(logo.user, self.user)
+        self.assertEqual((logo.min_price, logo.min_delivery_time), (50, 2))
+        self.assertEqual(
+            sorted(logo.details.values_list('offer_type', 'price', 'delivery_time_in_days')),
+            [('basic', 50, 5), ('premium', 150.5, 2)],
+        )
+        self.assertFalse(Offer.objects.get(title='Website').image)
+
+    def test_invalid_image(self):
+        line = list(export_offers())[0].replace('"uploads/logo.png"', '{"name": "logo.png"}')
+        importer = OfferImporter()
+        self.assertEqual(importer.run([line]), 0)
+        self.assertEqual(list(importer.errors[0][1]), ['image'])
+
+
+class OfferConditionalGetTests(TestCase):
+    """
+    Changes that leave the details' timestamps alone still move the offer's last
+    modification time, so `If-Modified-Since` does not hide them.
+    """
+
+    def setUp(self):
+        user = create_business_user()
+        self.offer = create_offer(user, 'Logo', [('basic', 50, 5), ('premium', 150, 2)])
+        an_hour_ago = now() - timedelta(hours=1)
+        Offer.objects.filter(pk=self.offer.pk).update(updated_at=an_hour_ago, image='uploads/logo.png')
+        OfferDetail.objects.update(updated_at=an_hour_ago)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = f'/api/offers/{self.offer.pk}/'
+        self.last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=self.last_modified).status_code, 304)
+
+    def test_deleted_detail(self):
+        OfferDetail.objects.filter(offer=self.offer, offer_type='premium').delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=self.last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['details']), 1)
+
+    def test_new_image_variants(self):
+        variants = {'source': 'uploads/logo.png', 'card': 'uploads/logo_card.webp'}
+        with mock.patch('offers.models.render_variants', return_value=variants):
+            Offer.objects.get(pk=self.offer.pk).refresh_image_variants()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=self.last_modified).status_code, 200)
+
+
+class OfferBatchUpdateTests(TestCase):
+    """
+    A batch update rejects invalid and repeated ids before writing anything.
+    """
+
+    def setUp(self):
+        self.user = create_business_user()
+        self.logo = create_offer(self.user, 'Logo', [('basic', 50, 5)])
+        self.website = create_offer(self.user, 'Website', [('basic', 500, 14)])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch(self, items):
+        return self.client.patch('/api/offers/batch/', items, format='json')
+
+    def assertTitles(self, *titles):
+        self.assertEqual(list(Offer.objects.order_by('id').values_list('title', flat=True)), list(titles))
+
+    def test_updates_offers(self):
+        response = self.patch([{'id': self.logo.pk, 'title': 'Logo 2'}, {'id': self.website.pk, 'title': 'Website 2'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertTitles('Logo 2', 'Website 2')
+
+    def test_invalid_ids(self):
+        for bad_id in [[self.logo.pk], {'id': self.logo.pk}, 'eins', None, 1.5, 0]:
+            response = self.patch([{'id': self.logo.pk, 'title': 'Logo 2'}, {'id': bad_id, 'title': 'x'}])
+            self.assertEqual(response.status_code, 400, bad_id)
+            self.assertEqual(response.data['detail'][0], {})
+            self.assertEqual(list(response.data['detail'][1]), ['id'])
+        response = self.patch([{'id': self.logo.pk, 'title': 'Logo 2'}, 'Website'])
+        self.assertEqual(response.status_code, 400)
+        self.assertTitles('Logo', 'Website')
+
+    def test_duplicate_ids(self):
+        response = self.patch([
+            {'id': self.logo.pk, 'title': 'Logo 2'}, {'id': self.website.pk, 'title': 'Website 2'},
+            {'id': self.logo.pk, 'title': 'Logo 3'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([bool(errors) for errors in response.data['detail']], [True, False, True])
+        self.assertTitles('Logo', 'Website')
+
+
+class OfferImageVariantTests(TestCase):
+    """
+    The variant files of a replaced offer image are deleted once the new variants are stored.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.offer = create_offer(create_business_user(), 'Logo', [('basic', 50, 5)])
+        self.old = self.store_variants('uploads/old.png')
+        self.new = self.store_variants('uploads/new.png')
+        Offer.objects.filter(pk=self.offer.pk).update(image='uploads/new.png', image_variants=self.old)
+
+    def store_variants(self, name):
+        variants = {'source': default_storage.save(name, ContentFile(b'image'))}
+        for variant in Offer.IMAGE_VARIANTS:
+            variants[variant] = default_storage.save(name.replace('.png', f'.{variant}.png'), ContentFile(b'image'))
+        return variants
+
+    def stored(self, variants):
+        return [default_storage.exists(name) for name in variants.values()]
+
+    def test_replaced_image(self):
+        with mock.patch('offers.models.render_variants', return_value=self.new):
+            Offer.objects.get(pk=self.offer.pk).refresh_image_variants()
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).image_variants, self.new)
+        self.assertEqual(self.stored(self.old), [True, False, False])
+        self.assertEqual(self.stored(self.new), [True, True, True])
+
+    def test_outdated_worker(self):
+        offer = Offer.objects.get(pk=self.offer.pk)
+        Offer.objects.filter(pk=self.offer.pk).update(image='uploads/newest.png')
+        with mock.patch('offers.models.render_variants', return_value=self.new):
+            offer.refresh_image_variants()
+        self.assertEqual(Offer.objects.get(pk=self.offer.pk).image_variants, self.old)
+        self.assertEqual(self.stored(self.old), [True, True, True])
+        self.assertEqual(self.stored(self.new), [True, False, False])
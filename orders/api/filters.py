@@ -0,0 +1,47 @@
+import django_filters
+from orders.models import Order
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filters the orders of the current user.
+
+    - `status`: one of the order states.
+    - `role`: `buyer` for orders the user placed, `seller` for orders the user received.
+    - `created_after` / `created_before`: ISO dates or datetimes, the lower bound is
+      inclusive and the upper bound exclusive, e.g. `created_after=2025-01-01&created_before=2025-02-01`.
+    """
+    ROLES = [('buyer', 'buyer'), ('seller', 'seller')]
+
+    status = django_filters.ChoiceFilter(
+        choices=Order.order_status,
+        error_messages={'invalid_choice': "Ungültiger Status. Erlaubte Werte: 'in_progress', 'completed', 'cancelled'."},
+    )
+    role = django_filters.ChoiceFilter(
+        choices=ROLES,
+        method='filter_role',
+        error_messages={'invalid_choice': "Ungültige Rolle. Erlaubte Werte: 'buyer', 'seller'."},
+    )
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name='created_at',
+        lookup_expr='gte',
+        error_messages={'invalid': "Ungültiges Datum. Erwartet wird ein ISO-8601-Datum, z. B. 2025-01-31."},
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name='created_at',
+        lookup_expr='lt',
+        error_messages={'invalid': "Ungültiges Datum. Erwartet wird ein ISO-8601-Datum, z. B. 2025-01-31."},
+    )
+
+    class Meta:
+        model = Order
+        fields = ['status', 'role', 'created_after', 'created_before']
+
+    def filter_role(self, queryset, name, value):
+        """
+        Keeps the orders in which the requesting user has the given role.
+        """
+        user = self.request.user
+        if value == 'buyer':
+            return queryset.filter(customer_user=user)
+        return queryset.filter(business_user=user)
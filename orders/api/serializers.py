@@ -15,11 +15,20 @@ class OrderListSerializer(serializers.ModelSerializer):
         fields = [
             "id", "customer_user", "business_user", "offer_detail_id", "title", "revisions",  
             "delivery_time_in_days", "price", "features", "offer_type",
-            "status", "created_at", "updated_at"
+            "status", "version", "created_at", "updated_at"
         ]
 
     def get_features(self, obj):
-        return obj.offer_detail_id.features if hasattr(obj.offer_detail_id, 'features') else []
+        """
+        Returns the features the order was placed with.
+
+        Orders keep a snapshot of the offer detail's features, so they are read from the
+        order itself instead of loading the offer detail for every order.
+
+        :param obj: The order instance being serialized.
+        :return: The list of features, or an empty list if none were stored.
+        """
+        return obj.features if obj.features is not None else []
     
 
 class OrderPostSerializer(serializers.ModelSerializer):
@@ -63,15 +72,14 @@ class OrderPostSerializer(serializers.ModelSerializer):
         """
         Retrieves the features associated with the offer detail of the order.
 
-        This method checks if the `offer_detail_id` of the provided order object
-        has a `features` attribute. If it does, it returns the features. If not,
-        it returns an empty list.
+        The features are copied from the offer detail when the order is saved, so they
+        are read from the order's own snapshot.
 
         :param obj: The order instance being serialized.
         :return: A list of features associated with the offer detail, or an empty list if none exist.
         """
 
-        return obj.offer_detail_id.features if hasattr(obj.offer_detail_id, 'features') else []
+        return obj.features if obj.features is not None else []
 
 
 
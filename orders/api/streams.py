@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from orders.events import get_broker, order_count_payload, user_channel
+from orders.models import BusinessOrderCounter
+
+
+async def authenticate(request):
+    """
+    Returns the user of the token sent in the `Authorization: Token <key>` header or,
+    since browsers cannot set headers on an EventSource, in the `token` query parameter.
+    """
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    token = await Token.objects.select_related('user').filter(key=key, user__is_active=True).afirst()
+    return token.user if token else None
+
+
+def format_event(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+async def order_event_stream(user):
+    """
+    Yields the Server-Sent Events of one client until it disconnects.
+
+    The client is subscribed before the current order counts are read, so no change
+    between both steps is lost. The stream starts with these counts and then forwards
+    every event of the subscription. A comment line is sent when no event arrived for
+    a while, so proxies keep the connection open. If the client fell behind and events
+    were dropped, a `resync` event asks it to reload its orders and counts.
+
+    The stream ends after `ORDER_EVENTS_MAX_LIFETIME` seconds and the client reconnects
+    after the announced retry delay, so no connection holds a worker indefinitely.
+    """
+    heartbeat = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'ORDER_EVENTS_MAX_LIFETIME', 300)
+    subscription = get_broker().subscribe([user_channel(user.pk)])
+    try:
+        counts = await BusinessOrderCounter.objects.filter(pk=user.pk).values(*BusinessOrderCounter.STATUSES).afirst()
+        yield 'retry: 5000\n\n'
+        yield format_event('counts', {'business_user': user.pk, **order_count_payload(counts)})
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield format_event('resync', {})
+            yield format_event(event['type'], event)
+    finally:
+        subscription.close()
+
+
+async def order_events(request):
+    """
+    Streams order events of the authenticated user as Server-Sent Events.
+
+    Business and customer users receive `order_created`, `order_status_changed` and
+    `order_deleted` events for their orders together with the business user's updated
+    order counts, so clients no longer need to poll the order list and count endpoints.
+
+    The view is asynchronous and requires an ASGI server (`coderr.asgi.application`),
+    where an open stream only costs a queue in the worker's event loop instead of a
+    thread. A WSGI server cannot stream it: Django would collect the whole stream before
+    sending anything, so the response would only arrive after the maximum lifetime.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"detail": ["Methode nicht erlaubt."]}, status=405)
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({"detail": ["Ungültiger oder fehlender Token."]}, status=401)
+
+    response = StreamingHttpResponse(order_event_stream(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,11 +1,15 @@
 from django.urls import path
 
-from . import views
+from . import streams, views
 
 
 urlpatterns = [
     path('orders/', views.OrderListAPIView.as_view(), name='orders'),
+    path('orders/status/', views.OrderBulkStatusAPIView.as_view(), name='order-bulk-status'),
+    path('orders/export/', views.OrderExportAPIView.as_view(), name='order-export'),
+    path('orders/events/', streams.order_events, name='order-events'),
     path('orders/<int:pk>/', views.OrderSingleAPIView.as_view(), name='order'),
     path('order-count/<int:pk>/', views.BusinessNotCompletedOrderAPIView.as_view(), name='not-completed'),
     path('completed-order-count/<int:pk>/', views.BusinessCompletedOrderAPIView.as_view(), name='completed'),
+    path('order-counts/<int:pk>/', views.BusinessOrderCountsAPIView.as_view(), name='order-counts'),
 ]
@@ -3,21 +3,53 @@ from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnl
 from rest_framework.response import Response
 from rest_framework import status
 from orders.api.serializers import OrderListSerializer, OrderPostSerializer, OrderPatchSerializer
-from orders.models import Order
+from orders.models import BusinessOrderCounter, Order
+from orders.events import order_count_payload
 from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
+from rest_framework.generics import ListAPIView
+from django_filters.rest_framework import DjangoFilterBackend
+from orders.api.filters import OrderFilter
+from coderr.pagination import KeysetPagination, KeysetPaginationMixin, OptInPageNumberPagination
+from coderr.csv_export import iterate_in_thread, stream_csv
+from coderr.query_budget import QueryBudgetMixin
+from coderr.identity_map import get_profile
 
-class OrderListAPIView(APIView):
+
+class OrderKeysetPagination(KeysetPagination):
+    ordering_fields = ('created_at', 'updated_at')
+    default_ordering = '-created_at'
+
+
+class OrderListAPIView(QueryBudgetMixin, KeysetPaginationMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = OrderListSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+    pagination_class = OptInPageNumberPagination
+    keyset_pagination_class = OrderKeysetPagination
+    query_budget = {'GET': 3}
 
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         """
         Returns a list of all orders for the currently authenticated user, 
         which are either created by the user or assigned to the user.
+
+        The orders can be filtered by `status`, `role` (`buyer` or `seller`) and the
+        creation date range `created_after` / `created_before`. With `page` or `page_size`
+        the orders are returned in numbered pages, with `pagination=cursor` (or a `cursor`
+        parameter) in pages with `next` and `previous` cursor links, otherwise as a deprecated
+        plain list of at most `UNPAGINATED_LIST_LIMIT` orders, newest first (see
+        OptInPageNumberPagination). Every order is serialized from its own columns, so a page costs the same
+        number of queries no matter how many orders it contains.
         """
-        orders = self.get_user_orders(request.user)
-        return Response(OrderListSerializer(orders, many=True).data, status=status.HTTP_200_OK)
+        return self.list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return self.get_user_orders(self.request.user)
     
     def get_user_orders(self, user):
         """
@@ -64,9 +96,54 @@ class OrderListAPIView(APIView):
         :param user: The user to check.
         :return: True if the user is a customer, False otherwise.
         """
-        return user.is_authenticated and getattr(user.profile, 'type', None) == 'customer'
+        return user.is_authenticated and getattr(get_profile(user), 'type', None) == 'customer'
     
 
+class OrderExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    chunk_size = 2000
+    columns = [
+        ('id', 'id'), ('created_at', 'created_at'), ('updated_at', 'updated_at'), ('status', 'status'),
+        ('title', 'title'), ('offer_type', 'offer_type'), ('price', 'price'),
+        ('delivery_time_in_days', 'delivery_time_in_days'), ('revisions', 'revisions'),
+        ('customer_user', 'customer_user_id'), ('business_user', 'business_user_id'),
+        ('offer_detail_id', 'offer_detail_id_id'),
+    ]
+
+    def perform_content_negotiation(self, request, force=False):
+        """
+        Accepts any `Accept` header, e.g. `text/csv`. Error responses are rendered as JSON.
+        """
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        """
+        Exports the orders of the authenticated user as a CSV file, oldest first.
+
+        Accepts the filters of the order list, e.g. `role=seller&status=completed&created_after=2025-01-01&created_before=2025-02-01`
+        for the completed sales of January. The rows are read with one query in chunks of
+        `chunk_size` and written to the response while it is sent, so neither the server nor
+        the client holds the whole export in memory, no matter how many orders it contains.
+        Under ASGI the chunks are handed over as an async iterator (see `iterate_in_thread`),
+        since Django would otherwise read all of them before sending the first byte.
+
+        :param request: The incoming request.
+        :return: A streamed CSV file with a 200 status code, or a 400 status code if a filter is invalid.
+        """
+        filterset = OrderFilter(request.GET, queryset=OrderListAPIView().get_user_orders(request.user), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        header = [column for column, _ in self.columns]
+        rows = filterset.qs.order_by('created_at', 'id').values_list(*[field for _, field in self.columns])
+        content = stream_csv(header, rows.iterator(chunk_size=self.chunk_size))
+        if isinstance(request._request, ASGIRequest):
+            content = iterate_in_thread(content)
+        response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+        return response
+
+
 class OrderSingleAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -77,21 +154,49 @@ class OrderSingleAPIView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def patch(self, request, pk):
+        """
+        Changes the status of an order. Only the business user of the order may change it,
+        and only along `Order.TRANSITIONS`, e.g. a cancelled order can no longer be completed.
+
+        The change is written with a conditional UPDATE of the status column alone. Clients
+        may send the `version` they last read; if the order was changed since then, or is
+        changed by a concurrent request before the UPDATE, nothing is written and 409 is
+        returned, so the client can reload the order instead of overwriting the other change.
+
+        :param request: The incoming request with `status` and optionally `version`.
+        :param pk: The ID of the order.
+        :return: The order with a 200 status code; 400 for an invalid status or transition,
+                 403 for other users, 404 for unknown orders and 409 for concurrent changes.
+        """
         order = get_object_or_404(Order, pk=pk)
 
-        if order.business_user != request.user:
+        if order.business_user_id != request.user.id:
             return Response({"detail": ["Nur der Business-Nutzer kann den Status einer Bestellung ändern."]}, status=status.HTTP_403_FORBIDDEN)
 
         status_value = request.data.get('status')
-        if status_value not in ['in_progress', 'completed', 'cancelled']:
+        if status_value not in Order.TRANSITIONS:
             return Response({"detail": ["Ungültiger Status. Erlaubte Werte: 'in_progress', 'completed', 'cancelled'."]}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.status = status_value
-        order.save()
+        version = request.data.get('version')
+        if version is not None:
+            try:
+                version = int(version)
+            except (TypeError, ValueError):
+                return Response({"detail": ["Ungültige Version."]}, status=status.HTTP_400_BAD_REQUEST)
+            if version != order.version:
+                return self.conflict()
+
+        if status_value != order.status:
+            if not Order.can_transition(order.status, status_value):
+                return Response({"detail": [f"Der Status '{order.status}' kann nicht zu '{status_value}' geändert werden."]}, status=status.HTTP_400_BAD_REQUEST)
+            if not order.transition(status_value):
+                return self.conflict()
 
         full_serializer = OrderListSerializer(order)
         return Response(full_serializer.data, status=status.HTTP_200_OK)
 
+    def conflict(self):
+        return Response({"detail": ["Die Bestellung wurde zwischenzeitlich geändert. Bitte lade sie neu und versuche es erneut."]}, status=status.HTTP_409_CONFLICT)
 
     def delete(self, request, pk):
         order = get_object_or_404(Order, pk=pk)
@@ -103,9 +208,67 @@ class OrderSingleAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class OrderBulkStatusAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_orders = 500
+
+    def patch(self, request):
+        """
+        Changes the status of many orders of the authenticated business user at once,
+        e.g. `{"ids": [1, 2, 3], "status": "completed"}`.
+
+        The orders are changed with one conditional UPDATE per current status, following
+        the same transitions as a single order. Orders that cannot be changed do not fail
+        the request but are listed in the response by reason.
+
+        :param request: The incoming request with `ids` and `status`.
+        :return: A JSON object with the target `status` and the order IDs grouped into `updated`,
+                 `unchanged`, `invalid_transition`, `conflict` and `not_found` with a 200 status code,
+                 or a 400 status code if the data is invalid.
+        """
+        status_value = request.data.get('status')
+        if status_value not in Order.TRANSITIONS:
+            return Response({"detail": ["Ungültiger Status. Erlaubte Werte: 'in_progress', 'completed', 'cancelled'."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            return Response({"detail": ["'ids' muss eine nicht leere Liste von Bestell-IDs sein."]}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_orders:
+            return Response({"detail": [f"Es können höchstens {self.max_orders} Bestellungen auf einmal geändert werden."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = Order.bulk_transition(request.user.id, ids, status_value)
+        return Response({'status': status_value, **result}, status=status.HTTP_200_OK)
+
 
-class BusinessNotCompletedOrderAPIView(APIView):
+class BusinessOrderCountAPIView(QueryBudgetMixin, APIView):
+    """
+    Base class of the order count endpoints. The counts are read from the business
+    user's BusinessOrderCounter row with a single primary key lookup.
+    """
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 3}
+
+    def get_counts(self, pk):
+        """
+        Returns the order counts of the business user with the given ID.
+
+        Users without a counter row never received an order, so their counts are zero.
+
+        :param pk: The ID of the business user.
+        :return: A dictionary with the number of orders per status, or None if the user does not exist.
+        """
+        counts = BusinessOrderCounter.get_counts(pk)
+        if counts is None:
+            if not User.objects.filter(pk=pk).exists():
+                return None
+            counts = dict.fromkeys(BusinessOrderCounter.STATUSES, 0)
+        return counts
+
+    def user_not_found(self):
+        return Response({"detail": ["Der angegebene Nutzer existiert nicht."]}, status=status.HTTP_404_NOT_FOUND)
+
+
+class BusinessNotCompletedOrderAPIView(BusinessOrderCountAPIView):
     def get(self, request, pk):
         """
         Returns the number of non-completed orders for the business user with the given ID.
@@ -120,16 +283,13 @@ class BusinessNotCompletedOrderAPIView(APIView):
         :param pk: The ID of the business user.
         :return: A JSON object with the number of non-completed orders with a 200 status code, or a 404 status code if the user does not exist.
         """
-        try:
-            business_user = User.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Response({"detail": ["Der angegebene Nutzer existiert nicht."]}, status=status.HTTP_404_NOT_FOUND)
-        orders = Order.objects.filter(business_user=business_user, status='in_progress')
-        return Response({'order_count': orders.count()})
+        counts = self.get_counts(pk)
+        if counts is None:
+            return self.user_not_found()
+        return Response({'order_count': counts['in_progress']})
     
 
-class BusinessCompletedOrderAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+class BusinessCompletedOrderAPIView(BusinessOrderCountAPIView):
     def get(self, request, pk):
         """
         Returns the number of completed orders for the business user with the given ID.
@@ -144,9 +304,24 @@ class BusinessCompletedOrderAPIView(APIView):
         :param pk: The ID of the business user.
         :return: A JSON object with the number of completed orders with a 200 status code, or a 404 status code if the user does not exist.
         """
-        try:
-            business_user = User.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Response({"detail": ["Der angegebene Nutzer existiert nicht."]}, status=status.HTTP_404_NOT_FOUND)
-        orders = Order.objects.filter(business_user=business_user, status='completed')
-        return Response({'completed_order_count': orders.count()}, status=status.HTTP_200_OK)
\ No newline at end of file
+        counts = self.get_counts(pk)
+        if counts is None:
+            return self.user_not_found()
+        return Response({'completed_order_count': counts['completed']}, status=status.HTTP_200_OK)
+
+
+class BusinessOrderCountsAPIView(BusinessOrderCountAPIView):
+    def get(self, request, pk):
+        """
+        Returns all order counts of the business user with the given ID in one response,
+        so a dashboard needs a single request instead of one per status.
+
+        :param request: The incoming request.
+        :param pk: The ID of the business user.
+        :return: A JSON object with `order_count` (in progress), `completed_order_count` and
+                 `cancelled_order_count` with a 200 status code, or a 404 status code if the user does not exist.
+        """
+        counts = self.get_counts(pk)
+        if counts is None:
+            return self.user_not_found()
+        return Response(order_count_payload(counts), status=status.HTTP_200_OK)
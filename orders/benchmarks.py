@@ -0,0 +1,85 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+from offers.models import Offer, OfferDetail
+from orders.models import BusinessOrderCounter, Order
+from user_auth.models import Profile
+
+
+STATUS_WEIGHTS = [('in_progress', 3), ('completed', 6), ('cancelled', 1)]
+
+
+def create_users(prefix, count, user_type, batch_size=2000):
+    """
+    Bulk creates users with a profile of the given type. All users share one
+    precomputed password hash, so seeding does not spend its time hashing.
+    """
+    template = User()
+    template.set_password('benchmark')
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}_{index}', email=f'{prefix}_{index}@example.com', password=template.password)
+        for index in range(count)
+    ], batch_size=batch_size)
+    Profile.objects.bulk_create([
+        Profile(user=user, username=user.username, email=user.email, type=user_type) for user in users
+    ], batch_size=batch_size)
+    return users
+
+
+def seed_orders(count, businesses=50, customers=1000, days=365, batch_size=5000, seed=0):
+    """
+    Bulk creates `count` orders between random business and customer users.
+
+    Every business user gets one offer with a basic detail that all its orders refer to.
+    Creation dates are spread over the last `days` days in the order of the ids, like
+    in a real shop. Statuses are mostly completed, some in progress and a few cancelled.
+    The business order counters, which bulk_create bypasses, are reconciled at the end.
+
+    :param count: The number of orders to create.
+    :param businesses: The number of business users receiving orders.
+    :param customers: The number of customer users placing orders.
+    :param days: The number of days the creation dates are spread over.
+    :param batch_size: The number of orders written per bulk_create call.
+    :param seed: Seed for the random generator, so runs are reproducible.
+    :return: A tuple of the business users and the customer users.
+    """
+    rng = random.Random(seed)
+    business_users = create_users('benchmark_business', businesses, 'business')
+    customer_users = create_users('benchmark_customer', customers, 'customer')
+    offers = Offer.objects.bulk_create([
+        Offer(user=user, title=f'Angebot {user.username}', description='Benchmark') for user in business_users
+    ])
+    details = OfferDetail.objects.bulk_create([
+        OfferDetail(
+            offer=offer, title='Basic', price=rng.randint(20, 500), delivery_time_in_days=rng.randint(1, 14),
+            features=['Logo'], offer_type='basic', revisions=1,
+        )
+        for offer in offers
+    ])
+    Offer.objects.filter(pk__in=[offer.pk for offer in offers]).refresh_min_values()
+
+    statuses = [status for status, weight in STATUS_WEIGHTS for _ in range(weight)]
+    order_ids = []
+    for start in range(0, count, batch_size):
+        orders = []
+        for _ in range(min(batch_size, count - start)):
+            index = rng.randrange(businesses)
+            detail = details[index]
+            orders.append(Order(
+                offer_detail_id=detail, business_user=business_users[index], customer_user=rng.choice(customer_users),
+                title=detail.title, offer_type=detail.offer_type, price=detail.price, features=detail.features,
+                delivery_time_in_days=detail.delivery_time_in_days, revisions=detail.revisions,
+                status=rng.choice(statuses),
+            ))
+        order_ids.extend(order.pk for order in Order.objects.bulk_create(orders))
+
+    per_day = max(1, len(order_ids) // days)
+    today = now()
+    for day, start in enumerate(range(0, len(order_ids), per_day)):
+        Order.objects.filter(pk__in=order_ids[start:start + per_day]).update(
+            created_at=today - timedelta(days=days - day)
+        )
+    BusinessOrderCounter.reconcile()
+    return business_users, customer_users
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    The event queue of one connected client. Events are put by the broker from any
+    thread and consumed by the client's stream in its event loop.
+
+    If the client falls behind by more than `max_queue_size` events, further events
+    are dropped and `overflowed` is set, so the stream can tell the client to reload.
+    """
+
+    def __init__(self, broker, channels, max_queue_size):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """
+        Puts an event into the queue. Safe to call from any thread.
+
+        If the event loop of the stream is already closed, e.g. because the worker
+        stopped without ending the stream, the subscription is dropped instead.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Publishes events to the subscribers connected to the current process.
+
+    Events only reach clients of the same worker process. Deployments with several
+    workers replace it through the `ORDER_EVENTS_BROKER` setting with a broker that
+    forwards events between processes and implements the same `publish`, `subscribe`
+    and `unsubscribe` methods.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels):
+        """
+        Registers a subscription for the given channels. Must be called inside the
+        event loop that consumes the subscription.
+
+        :param channels: The channel names, e.g. `user:42`.
+        :return: The Subscription.
+        """
+        subscription = Subscription(self, tuple(channels), self.max_queue_size)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def publish(self, channels, event):
+        """
+        Delivers an event to every subscription of the given channels, once per
+        subscription even if it listens on several of them.
+
+        :return: The number of subscriptions the event was delivered to.
+        """
+        with self.lock:
+            recipients = set()
+            for channel in channels:
+                recipients.update(self.subscriptions.get(channel, ()))
+        for subscription in recipients:
+            subscription.deliver(event)
+        return len(recipients)
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(set().union(*self.subscriptions.values())) if self.subscriptions else 0
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    Returns the broker configured in `ORDER_EVENTS_BROKER`, created once per process.
+    """
+    return import_string(getattr(settings, 'ORDER_EVENTS_BROKER', 'orders.events.InProcessBroker'))()
+
+
+def order_count_payload(counts):
+    """
+    Returns order counts with the keys of the order count endpoints.
+
+    :param counts: A dictionary with the number of orders per status, or None.
+    """
+    counts = counts or {}
+    return {
+        'order_count': counts.get('in_progress', 0),
+        'completed_order_count': counts.get('completed', 0),
+        'cancelled_order_count': counts.get('cancelled', 0),
+    }
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_order_event(event_type, order, counts=None):
+    """
+    Publishes an order event to the business and the customer user of the order once
+    the current transaction is committed, so clients never see rolled back changes.
+
+    :param event_type: `order_created`, `order_status_changed` or `order_deleted`.
+    :param order: The order the event is about.
+    :param counts: A callable returning the business user's order counts at publish time.
+    """
+    payload = {
+        'id': order.pk,
+        'status': order.status,
+        'business_user': order.business_user_id,
+        'customer_user': order.customer_user_id,
+    }
+    channels = [user_channel(order.business_user_id), user_channel(order.customer_user_id)]
+
+    def publish():
+        event = {'type': event_type, 'order': payload}
+        if counts is not None:
+            event['counts'] = {'business_user': order.business_user_id, **order_count_payload(counts())}
+        get_broker().publish(channels, event)
+
+    transaction.on_commit(publish)
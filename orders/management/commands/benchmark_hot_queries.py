@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from coderr.benchmark import format_stats, measure, rolled_back
+from coderr.query_plans import explain_query_plan, full_table_scans, hot_queries
+from orders.benchmarks import seed_orders
+from orders.models import Order
+from reviews.benchmarks import seed_reviews
+from reviews.models import Review
+
+
+COMPOSITE_INDEXES = [
+    'order_business_status_idx', 'order_business_created_idx', 'order_customer_created_idx',
+    'review_business_updated_idx', 'review_business_rating_idx', 'review_reviewer_updated_idx',
+]
+
+
+class Command(BaseCommand):
+    help = "Times the hot order and review queries with and without the composite indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200_000, help="Number of orders to seed.")
+        parser.add_argument('--reviews', type=int, default=50_000, help="Number of reviews to seed.")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of runs per query.")
+
+    def handle(self, *args, **options):
+        """
+        Seeds orders and reviews inside a transaction that is rolled back afterwards.
+
+        Every hot query is timed with the composite indexes first. Then the indexes are
+        dropped inside the same transaction, so only the foreign key indexes remain,
+        and the queries are timed again. The busiest business user and customer are used.
+        """
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['orders']} orders and {options['reviews']} reviews ...")
+            business_users, customer_users = seed_orders(options['orders'])
+            seed_reviews(options['reviews'], business_users, customer_users)
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            business_user = business_users[0]
+            customer_user = customer_users[0]
+            queries = hot_queries(business_user, customer_user)
+            self.stdout.write(
+                f"Business user with {Order.objects.filter(business_user=business_user).count()} orders and "
+                f"{Review.objects.filter(business_user=business_user).count()} reviews."
+            )
+
+            results = {}
+            for phase in ('with composite indexes', 'foreign key indexes only'):
+                if phase == 'foreign key indexes only':
+                    with connection.cursor() as cursor:
+                        for name in COMPOSITE_INDEXES:
+                            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                for label, queryset in queries.items():
+                    stats = measure(lambda: list(queryset.all()), repeat=options['repeat'])
+                    scans = full_table_scans(explain_query_plan(queryset)) if connection.vendor == 'sqlite' else []
+                    results.setdefault(label, []).append((phase, stats, scans))
+
+            for label, phases in results.items():
+                self.stdout.write(label)
+                for phase, stats, scans in phases:
+                    suffix = '   FULL SCAN' if scans else ''
+                    self.stdout.write(format_stats(f'  {phase}', stats) + suffix)
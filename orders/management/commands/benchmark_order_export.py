@@ -0,0 +1,106 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from coderr.asgi import application
+from coderr.benchmark import asgi_request, connections_kept_open, rolled_back
+from orders.benchmarks import seed_orders
+from orders.models import Order
+
+
+def stream_export(token, query):
+    """
+    Requests the CSV export through the ASGI application and consumes it like a client
+    writing it to disk.
+
+    :return: A tuple of the seconds until the first chunk, the total seconds and the number of bytes.
+    """
+    start = time.perf_counter()
+    received = {'first_byte': None, 'size': 0}
+
+    def on_body(chunk):
+        if received['first_byte'] is None:
+            received['first_byte'] = time.perf_counter() - start
+        received['size'] += len(chunk)
+
+    async_to_sync(asgi_request)(
+        application, 'GET', f'/api/orders/export/?{query}', headers=[('Authorization', f'Token {token}')], on_body=on_body,
+    )
+    return received['first_byte'], time.perf_counter() - start, received['size']
+
+
+def load_json_list(token, query):
+    """
+    Requests the unpaginated JSON order list through the ASGI application, the way the
+    export was done before. `UNPAGINATED_LIST_LIMIT` is lifted so that all rows are loaded.
+    """
+    start = time.perf_counter()
+    with override_settings(UNPAGINATED_LIST_LIMIT=None):
+        _, body = async_to_sync(asgi_request)(
+            application, 'GET', f'/api/orders/?{query}', headers=[('Authorization', f'Token {token}')],
+        )
+    duration = time.perf_counter() - start
+    return duration, duration, len(body)
+
+
+def traced_peak(func):
+    """
+    Calls the function with tracemalloc enabled and returns the peak of the memory
+    allocated by Python during the call in megabytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = "Measures first-byte latency, duration and peak memory of the streamed CSV order export."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000, help="Number of orders to seed for one seller.")
+        parser.add_argument('--json-max-rows', type=int, default=100_000,
+                            help="Largest export that is also loaded through the JSON order list for comparison.")
+
+    def handle(self, *args, **options):
+        """
+        Seeds orders of a single business user inside a transaction that is rolled back
+        afterwards and exports date ranges of growing size. The requests run through
+        `coderr.asgi.application` in memory, like on the deployed ASGI server.
+
+        Each export is run once for the timings and once under tracemalloc for the peak
+        memory, which should stay flat while the number of rows grows. Ranges up to
+        `--json-max-rows` rows are also loaded through the JSON order list for comparison.
+        """
+        with rolled_back(), connections_kept_open():
+            self.stdout.write(f"Seeding {options['orders']} orders ...")
+            business_users, _ = seed_orders(options['orders'], businesses=1)
+            token = Token.objects.create(user=business_users[0]).key
+
+            for days in (1, 30, 365, None):
+                query = 'role=seller'
+                orders = Order.objects.filter(business_user=business_users[0])
+                if days is not None:
+                    since = (now() - timedelta(days=days)).isoformat()
+                    query += f'&created_after={since.replace("+", "%2B")}'
+                    orders = orders.filter(created_at__gte=since)
+                rows = orders.count()
+                self.stdout.write(f"{'all' if days is None else f'last {days} days'}: {rows} orders")
+
+                strategies = [('CSV export', stream_export)]
+                if rows <= options['json_max_rows']:
+                    strategies.append(('JSON order list', load_json_list))
+                for label, strategy in strategies:
+                    first_byte, total, size = strategy(token, query)
+                    peak = traced_peak(lambda: strategy(token, query))
+                    self.stdout.write(
+                        f"  {label:<16} first byte {first_byte * 1000:9.1f} ms   total {total:7.2f} s   "
+                        f"{size / 1024 / 1024:8.1f} MB sent   peak memory {peak:8.1f} MB"
+                    )
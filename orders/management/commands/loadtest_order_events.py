@@ -0,0 +1,124 @@
+import asyncio
+import json
+import resource
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from coderr.asgi import application
+from orders.events import get_broker, user_channel
+
+
+class Client:
+    """
+    An SSE client talking to the ASGI application in memory, without sockets.
+    Records when the stream was opened and the delivery latency of every event.
+    """
+
+    def __init__(self, token, index):
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/orders/events/', 'raw_path': b'/api/orders/events/',
+            'query_string': f'token={token}'.encode(), 'root_path': '', 'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 10000 + index),
+        }
+        self.request_sent = False
+        self.disconnected = asyncio.Event()
+        self.connected = asyncio.Event()
+        self.status = None
+        self.latencies = []
+
+    async def receive(self):
+        if not self.request_sent:
+            self.request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.connected.set()
+            return
+        received_at = time.perf_counter()
+        for block in message.get('body', b'').decode().split('\n\n'):
+            if block.startswith('event: counts'):
+                self.connected.set()
+            elif block.startswith('event: loadtest'):
+                data = json.loads(block.split('data: ', 1)[1])
+                self.latencies.append(received_at - data['sent_at'])
+
+    def run(self):
+        return asyncio.ensure_future(application(self.scope, self.receive, self.send))
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Measures how many concurrent order event streams one ASGI worker holds and how fast events fan out."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, nargs='+', default=[100, 1000, 5000],
+                            help="Numbers of concurrent subscribers to test, one round each.")
+        parser.add_argument('--events', type=int, default=20, help="Events published per round.")
+        parser.add_argument('--interval', type=float, default=0.05, help="Seconds between events.")
+
+    def handle(self, *args, **options):
+        """
+        Runs one round per subscriber count against `coderr.asgi.application`.
+
+        All clients authenticate with the token of a temporary user and open the stream
+        through the full middleware stack. Events are then published from a separate
+        thread, like from a request thread saving an order, and every client records
+        the delay until the event reached it. Reported per round: connect time, peak
+        RSS of the process, and latency until one and until all clients got an event.
+        """
+        user = User.objects.create_user(username='loadtest_order_events', password=None)
+        token = Token.objects.create(user=user)
+        try:
+            for subscribers in options['subscribers']:
+                asyncio.run(self.run_round(user, token.key, subscribers, options['events'], options['interval']))
+        finally:
+            user.delete()
+
+    async def run_round(self, user, token, subscribers, events, interval):
+        broker = get_broker()
+        clients = [Client(token, index) for index in range(subscribers)]
+        started = time.perf_counter()
+        tasks = [client.run() for client in clients]
+        await asyncio.gather(*(client.connected.wait() for client in clients))
+        connect_time = time.perf_counter() - started
+        if any(client.status != 200 for client in clients):
+            raise CommandError("Some streams could not be opened.")
+
+        def publish():
+            for index in range(events):
+                broker.publish([user_channel(user.pk)], {'type': 'loadtest', 'index': index, 'sent_at': time.perf_counter()})
+                time.sleep(interval)
+
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        deadline = time.perf_counter() + events * interval + 30
+        while any(len(client.latencies) < events for client in clients) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        publisher.join()
+
+        for client in clients:
+            client.disconnected.set()
+        await asyncio.gather(*tasks)
+
+        first = [min(client.latencies[index] for client in clients) for index in range(events)]
+        last = [max(client.latencies[index] for client in clients) for index in range(events)]
+        lost = sum(events - len(client.latencies) for client in clients)
+        self.stdout.write(
+            f"{subscribers:>6} subscribers  connect {connect_time:7.2f} s  peak RSS {max_rss_mb():7.1f} MB  "
+            f"first delivery {statistics.median(first) * 1000:8.2f} ms  "
+            f"all delivered {statistics.median(last) * 1000:8.2f} ms (max {max(last) * 1000:8.2f} ms)  "
+            f"lost {lost}  open after disconnect {broker.subscriber_count()}"
+        )
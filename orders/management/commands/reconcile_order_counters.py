@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orders.models import BusinessOrderCounter
+
+
+class Command(BaseCommand):
+    help = "Detects and repairs drift between the business order counters and the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted counters.")
+
+    def handle(self, *args, **options):
+        """
+        Recounts the orders per business user and status with one grouped query and
+        compares the result with the stored counters. Drifted counters are listed and,
+        unless `--dry-run` is given, overwritten with the actual counts.
+        """
+        drift = BusinessOrderCounter.reconcile(repair=not options['dry_run'])
+        for business_user_id, stored, actual in drift:
+            self.stdout.write(f"Business user {business_user_id}: stored {stored}, actual {actual}")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All order counters are correct."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} order counters drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} order counters."))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0011_offer_image_variants'),
+        ('orders', '0002_alter_order_business_user_alter_order_customer_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['business_user', 'status', 'created_at'], name='order_business_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['business_user', 'created_at', 'id'], name='order_business_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_user', 'created_at', 'id'], name='order_customer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    BusinessOrderCounter = apps.get_model('orders', 'BusinessOrderCounter')
+    counters = {}
+    rows = Order.objects.order_by().values('business_user_id', 'status').annotate(count=Count('id'))
+    for row in rows:
+        counter = counters.setdefault(row['business_user_id'], BusinessOrderCounter(business_user_id=row['business_user_id']))
+        if row['status'] in ('in_progress', 'completed', 'cancelled'):
+            setattr(counter, row['status'], row['count'])
+    BusinessOrderCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('orders', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessOrderCounter',
+            fields=[
+                ('business_user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
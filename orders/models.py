@@ -1,14 +1,26 @@
-from django.db import models
+from functools import cache
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Value, When
 
 from django.contrib.auth.models import User
 from django.utils.timezone import now
+from coderr.dirty_fields import DirtyFieldsMixin
+from orders.events import publish_order_event
 
-class Order(models.Model):
+class Order(DirtyFieldsMixin, models.Model):
     order_status = [
         ('in_progress', 'In Bearbeitung'),
         ('completed', 'Abgeschlossen'),
         ('cancelled', 'Abgebrochen')
     ]
+    # Allowed status changes: the target statuses reachable from each status.
+    # Cancelled orders are final, completed orders can be reopened for revisions.
+    TRANSITIONS = {
+        'in_progress': ('completed', 'cancelled'),
+        'completed': ('in_progress',),
+        'cancelled': (),
+    }
     status = models.CharField(max_length=20, choices=order_status, default='in_progress')
     created_at = models.DateTimeField(auto_now_add=True)
     title = models.CharField(max_length=255)
@@ -21,6 +33,24 @@ class Order(models.Model):
     revisions = models.IntegerField(null=True, blank=True)
     customer_user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=('Customer User'))
     business_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders_as_business", verbose_name=('Business User'))
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['business_user', 'status', 'created_at'], name='order_business_status_idx'),
+            models.Index(fields=['business_user', 'created_at', 'id'], name='order_business_created_idx'),
+            models.Index(fields=['customer_user', 'created_at', 'id'], name='order_customer_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the business user and status the order was loaded with,
+        so saving or deleting it updates the business user's order counters.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._counted_as = (instance.__dict__.get('business_user_id'), instance.__dict__.get('status'))
+        return instance
 
     def save(self, *args, **kwargs):
         """
@@ -28,18 +58,160 @@ class Order(models.Model):
 
         If the business user is not set when saving the order, it is set to the user of the offer detail.
         If the offer detail is set when saving the order, the title, revisions, delivery time in days, price, and features are set to the values of the offer detail if they are not set.
+        An order loaded from the database writes only its changed fields (see DirtyFieldsMixin),
+        and saving it without changes runs no query.
+        The version is increased on every update, so pending conditional status changes
+        based on an older version fail instead of overwriting this save.
+        The business user's order counters are updated in the same transaction.
         """
-        if not self.business_user_id and self.offer_detail_id:
+        if not self._state.adding:
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = self.get_update_fields()
+            if kwargs['update_fields'] is not None:
+                if not kwargs['update_fields']:
+                    return
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+            self.version += 1
+        if not self.business_user_id and self.offer_detail_id_id:
             self.business_user = self.offer_detail_id.offer.user
 
-        if self.offer_detail_id:
+        if self.offer_detail_id_id:
             self.title = self.title or self.offer_detail_id.title
             self.revisions = self.revisions if self.revisions is not None else self.offer_detail_id.revisions
             self.delivery_time_in_days = self.delivery_time_in_days if self.delivery_time_in_days is not None else self.offer_detail_id.delivery_time_in_days
             self.price = self.price if self.price is not None else self.offer_detail_id.price
             self.features = self.features if self.features is not None else self.offer_detail_id.features
             self.offer_type = self.offer_type or self.offer_detail_id.offer_type
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.update_counters()
+
+    def update_counters(self):
+        """
+        Moves the order between the counters of its business user after a save,
+        e.g. from `in_progress` to `completed`. New orders are only counted once.
+        Subscribed clients of both users are notified after the commit.
+        """
+        previous = getattr(self, '_counted_as', (None, None))
+        current = (self.business_user_id, self.status)
+        if previous == current:
+            return
+        if previous[0] and previous[1]:
+            BusinessOrderCounter.adjust(previous[0], previous[1], -1)
+        BusinessOrderCounter.adjust(current[0], current[1], 1)
+        self._counted_as = current
+        event_type = 'order_status_changed' if previous[0] else 'order_created'
+        publish_order_event(event_type, self, counts=lambda: BusinessOrderCounter.get_counts(self.business_user_id))
+
+    @classmethod
+    def can_transition(cls, current, target):
+        return target in cls.TRANSITIONS.get(current, ())
+
+    @classmethod
+    def predecessors(cls, target):
+        """
+        Returns the statuses an order may have to be moved to the given status.
+        """
+        return [status for status, targets in cls.TRANSITIONS.items() if target in targets]
+
+    def transition(self, target):
+        """
+        Changes the status with a single conditional UPDATE that only matches if the order
+        still belongs to its business user, still has the loaded version and its status is
+        an allowed predecessor of the target. Unlike save(), no other column is written,
+        so a concurrent change is never overwritten.
+
+        On success the instance, the order counters and subscribed clients are updated.
+
+        :param target: The new status. The caller checks it with `can_transition` first.
+        :return: True if the status was changed, False if the order was changed or
+                 deleted in the meantime and the caller lost the race.
+        """
+        previous = self.status
+        updated_at = now()
+        with transaction.atomic():
+            updated = Order.objects.filter(
+                pk=self.pk,
+                business_user_id=self.business_user_id,
+                status__in=self.predecessors(target),
+                version=self.version,
+            ).update(status=target, version=F('version') + 1, updated_at=updated_at)
+            if not updated:
+                return False
+            BusinessOrderCounter.adjust(self.business_user_id, previous, -1)
+            BusinessOrderCounter.adjust(self.business_user_id, target, 1)
+        self.status, self.version, self.updated_at = target, self.version + 1, updated_at
+        if self.is_tracked():
+            self.snapshot_fields(['status', 'version', 'updated_at'])
+        self._counted_as = (self.business_user_id, target)
+        publish_order_event('order_status_changed', self, counts=lambda: BusinessOrderCounter.get_counts(self.business_user_id))
+        return True
+
+    @classmethod
+    def bulk_transition(cls, business_user_id, ids, target):
+        """
+        Changes the status of many orders of a business user with one conditional UPDATE
+        per predecessor status, e.g. to complete all finished orders in one request.
+
+        The orders are read once to group them by their current status. Like in `transition`,
+        the UPDATE only matches orders that still have the read version: it compares each
+        order's version with the one read for it, so an order changed between this read and
+        the UPDATE is never overwritten and reported as a conflict. Only then are the orders
+        of the group read a second time; the update time written by this call tells its own
+        changes from concurrent ones. The order counters are adjusted once per status.
+
+        :param business_user_id: The business user the orders must belong to.
+        :param ids: The IDs of the orders to change.
+        :param target: The new status.
+        :return: A dictionary mapping `updated`, `unchanged` (already in the target status),
+                 `invalid_transition`, `conflict` and `not_found` to lists of order IDs.
+        """
+        result = {'updated': [], 'unchanged': [], 'invalid_transition': [], 'conflict': [], 'not_found': []}
+        rows = {
+            row[0]: row for row in
+            cls.objects.filter(pk__in=ids, business_user_id=business_user_id).values_list('pk', 'status', 'version', 'customer_user_id')
+        }
+        groups = {}
+        for pk in dict.fromkeys(ids):
+            row = rows.get(pk)
+            if row is None:
+                result['not_found'].append(pk)
+            elif row[1] == target:
+                result['unchanged'].append(pk)
+            elif not cls.can_transition(row[1], target):
+                result['invalid_transition'].append(pk)
+            else:
+                groups.setdefault(row[1], []).append(pk)
+
+        updated_at = now()
+        with transaction.atomic():
+            for previous, pks in groups.items():
+                read_version = Case(
+                    *[When(pk=pk, then=Value(rows[pk][2])) for pk in pks], output_field=models.IntegerField()
+                )
+                updated = cls.objects.filter(
+                    pk__in=pks, business_user_id=business_user_id, status=previous, version=read_version,
+                ).update(status=target, version=F('version') + 1, updated_at=updated_at)
+                if updated:
+                    BusinessOrderCounter.adjust(business_user_id, previous, -updated)
+                    BusinessOrderCounter.adjust(business_user_id, target, updated)
+                if updated == len(pks):
+                    result['updated'].extend(pks)
+                    continue
+                versions = dict(cls.objects.filter(
+                    pk__in=pks, status=target, updated_at=updated_at,
+                ).values_list('pk', 'version'))
+                for pk in pks:
+                    result['updated' if versions.get(pk) == rows[pk][2] + 1 else 'conflict'].append(pk)
+
+        @cache
+        def counts():
+            return BusinessOrderCounter.get_counts(business_user_id)
+
+        for pk in result['updated']:
+            order = cls(pk=pk, status=target, business_user_id=business_user_id, customer_user_id=rows[pk][3])
+            publish_order_event('order_status_changed', order, counts=counts)
+        return result
 
     def update(self, *args, **kwargs):
         """
@@ -49,4 +221,71 @@ class Order(models.Model):
         :param kwargs: Additional keyword arguments.
         """
         self.updated_at = now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.save(*args, **kwargs)
+
+
+class BusinessOrderCounter(models.Model):
+    """
+    Number of orders per status of a business user, maintained in the same transaction
+    as the order by Order.save and by a post_delete receiver, which also sees orders
+    deleted through a cascade. QuerySet.update() and bulk_create() bypass it;
+    `manage.py reconcile_order_counters` repairs such drift.
+    """
+    STATUSES = [status for status, _ in Order.order_status]
+
+    business_user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='order_counter')
+    in_progress = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+
+    @classmethod
+    def adjust(cls, business_user_id, status, delta):
+        """
+        Atomically adds `delta` to one counter of a business user with a single UPDATE.
+        The counter row is created on the first increment; decrements of a missing
+        row are ignored, e.g. while the business user is being deleted.
+        """
+        if status not in cls.STATUSES:
+            return
+        updated = cls.objects.filter(pk=business_user_id).update(**{status: F(status) + delta})
+        if not updated and delta > 0:
+            cls.objects.get_or_create(business_user_id=business_user_id)
+            cls.objects.filter(pk=business_user_id).update(**{status: F(status) + delta})
+
+    @classmethod
+    def get_counts(cls, business_user_id):
+        """
+        Returns the order counts of a business user with one primary key lookup.
+
+        :return: A dictionary with the number of orders per status, or None if the user
+                 has no counter row, i.e. never received an order or does not exist.
+        """
+        return cls.objects.filter(pk=business_user_id).values(*cls.STATUSES).first()
+
+    @classmethod
+    def reconcile(cls, repair=True):
+        """
+        Compares all counters with the actual number of orders per business user and status.
+
+        :param repair: Whether drifted counters are overwritten with the actual counts.
+        :return: A list of (business user id, stored counts, actual counts) tuples
+                 for every counter that differs.
+        """
+        actual = {}
+        rows = Order.objects.order_by().values('business_user_id', 'status').annotate(count=Count('id'))
+        for row in rows:
+            counts = actual.setdefault(row['business_user_id'], dict.fromkeys(cls.STATUSES, 0))
+            if row['status'] in counts:
+                counts[row['status']] = row['count']
+
+        zero = dict.fromkeys(cls.STATUSES, 0)
+        drift = []
+        with transaction.atomic():
+            stored = {row.pop('business_user_id'): row for row in cls.objects.select_for_update().values('business_user_id', *cls.STATUSES)}
+            for business_user_id in stored.keys() | actual.keys():
+                counts = actual.get(business_user_id, zero)
+                if stored.get(business_user_id, zero) != counts:
+                    drift.append((business_user_id, stored.get(business_user_id), counts))
+                    if repair:
+                        cls.objects.update_or_create(business_user_id=business_user_id, defaults=counts)
+        return drift
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from orders.events import publish_order_event
+from orders.models import BusinessOrderCounter, Order
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_counter(sender, instance, **kwargs):
+    """
+    Removes a deleted order from its business user's order counters. Runs inside the
+    deletion's transaction, for direct deletes as well as cascades, e.g. when the offer
+    detail of the order is deleted. Subscribed clients are notified after the commit.
+    """
+    business_user_id, status = getattr(instance, '_counted_as', (instance.business_user_id, instance.status))
+    if business_user_id and status:
+        BusinessOrderCounter.adjust(business_user_id, status, -1)
+    publish_order_event('order_deleted', instance, counts=lambda: BusinessOrderCounter.get_counts(business_user_id))
@@ -1,3 +1,246 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import warnings
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from coderr.asgi import application
+from coderr.benchmark import asgi_request, connections_kept_open
+from coderr.query_budget import QueryBudgetExceeded
+from coderr.query_plans import hot_queries
+from coderr.testing import DirtyFieldsAssertionsMixin, QueryPlanAssertionsMixin
+from offers.models import Offer, OfferDetail
+from orders.api.streams import order_event_stream
+from orders.api.views import OrderListAPIView
+from orders.benchmarks import create_users, seed_orders
+from orders.events import InProcessBroker
+from orders.models import BusinessOrderCounter, Order
+
+
+class OrderQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    The hot order queries are answered through the composite indexes on orders.
+    """
+    EXPECTED_INDEXES = {
+        'order list as seller': 'order_business_created_idx',
+        'order list as buyer': 'order_customer_created_idx',
+        'order list as seller by status': 'order_business_status_idx',
+        'open order count': 'order_business_status_idx',
+        'completed order count': 'order_business_status_idx',
+    }
+
+    def test_hot_queries_use_composite_indexes(self):
+        queries = hot_queries(User(pk=1), User(pk=2))
+        for label, index in self.EXPECTED_INDEXES.items():
+            with self.subTest(label):
+                self.assertUsesIndex(queries[label], index)
+
+    def test_order_list_reads_both_user_indexes(self):
+        queries = hot_queries(User(pk=1), User(pk=2))
+        for label in ('order list', 'order list, cursor'):
+            with self.subTest(label):
+                self.assertUsesIndex(queries[label], 'orders_order_business_user_id_d2203c31')
+                self.assertUsesIndex(queries[label], 'orders_order_customer_user_id_c6c00d2e')
+
+
+class OrderSaveTests(DirtyFieldsAssertionsMixin, TestCase):
+    """
+    Saving an order writes only the changed columns, plus the version.
+    """
+
+    def setUp(self):
+        business_user, = create_users('business', 1, 'business')
+        customer_user, = create_users('customer', 1, 'customer')
+        offer = Offer.objects.create(user=business_user, title='Logo', description='Logo')
+        detail = OfferDetail.objects.create(
+            offer=offer, title='Basic', offer_type='basic', price=100, delivery_time_in_days=3, features=[], revisions=1
+        )
+        self.order = Order.objects.create(offer_detail_id=detail, customer_user=customer_user)
+
+    def test_unchanged_order_runs_no_query(self):
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertSaveRunsNoQuery(order)
+        self.assertEqual(order.version, 1)
+
+    def test_changed_field_updates_only_that_column(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.title = 'Logo v2'
+        # The version is part of every update, so pending conditional status changes fail.
+        self.assertSaveUpdatesOnly(order, ['title', 'updated_at', 'version'])
+        self.assertEqual(Order.objects.values_list('title', 'version').get(pk=order.pk), ('Logo v2', 2))
+        self.assertSaveRunsNoQuery(order)
+
+
+class OrderQueryBudgetTests(TestCase):
+    """
+    The budgeted order endpoints run a fixed number of queries, however many orders
+    there are. The client is force authenticated, so the counts leave out the token lookup.
+    """
+    ORDERS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.business_user,), customer_users = seed_orders(cls.ORDERS, businesses=1, customers=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.business_user)
+
+    def assertQueries(self, num, path):
+        with self.assertNumQueries(num):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_order_list(self):
+        self.assertEqual(len(self.assertQueries(1, '/api/orders/').data), self.ORDERS)
+
+    @override_settings(UNPAGINATED_LIST_LIMIT=5)
+    def test_unpaginated_order_list_is_limited(self):
+        response = self.assertQueries(1, '/api/orders/')
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertEqual(response['X-Result-Truncated'], 'true')
+        newest = [order.pk for order in Order.objects.order_by('-created_at', '-pk')[:5]]
+        self.assertEqual([order['id'] for order in response.data], newest)
+
+    def test_order_list_pages(self):
+        self.assertEqual(self.assertQueries(2, '/api/orders/?page_size=10').data['count'], self.ORDERS)
+        self.assertEqual(len(self.assertQueries(1, '/api/orders/?pagination=cursor&page_size=10').data['results']), 10)
+
+    def test_order_counts(self):
+        pk = self.business_user.pk
+        self.assertQueries(1, f'/api/order-count/{pk}/')
+        self.assertQueries(1, f'/api/completed-order-count/{pk}/')
+        counts = self.assertQueries(1, f'/api/order-counts/{pk}/').data
+        self.assertEqual(sum(counts.values()), self.ORDERS)
+
+    def test_exceeded_budget_raises_when_enforced(self):
+        with mock.patch.object(OrderListAPIView, 'query_budget', {'GET': 0}):
+            with override_settings(QUERY_BUDGET_ENFORCE=True), self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/orders/')
+            with override_settings(QUERY_BUDGET_ENFORCE=False), self.assertLogs('coderr.query_budget', 'WARNING'):
+                self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+
+
+class OrderExportTests(TestCase):
+    """
+    The CSV export keeps titles that look like spreadsheet formulas as text.
+    """
+
+    def test_formula_titles_are_escaped(self):
+        (business_user,), _ = seed_orders(4, businesses=1, customers=1)
+        titles = ['=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)']
+        for order, title in zip(Order.objects.order_by('created_at', 'id'), titles):
+            Order.objects.filter(pk=order.pk).update(title=title)
+        client = APIClient()
+        client.force_authenticate(business_user)
+        response = client.get('/api/orders/export/')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['title'] for row in rows], [f"'{title}" for title in titles])
+        self.assertFalse(any(row['price'].startswith("'") for row in rows))
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_streams_under_asgi(self):
+        (business_user,), _ = seed_orders(1200, businesses=1, customers=1)
+        token = Token.objects.create(user=business_user).key
+        chunks = []
+        # Django warns when it has to read a synchronous iterator completely before sending it.
+        with connections_kept_open(), warnings.catch_warnings():
+            warnings.simplefilter('error')
+            status, _ = async_to_sync(asgi_request)(
+                application, 'GET', '/api/orders/export/', headers=[('Authorization', f'Token {token}')],
+                on_body=chunks.append,
+            )
+        self.assertEqual(status, 200)
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(len(rows), 1200)
+        self.assertGreaterEqual(len([chunk for chunk in chunks if chunk]), 3)
+
+
+class OrderEventTests(TestCase):
+    """
+    Order event subscriptions never outlive their stream.
+    """
+
+    def test_closed_loop_drops_subscription(self):
+        broker = InProcessBroker()
+
+        async def subscribe():
+            return broker.subscribe(['user:1'])
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(subscribe())
+        loop.close()
+        self.assertEqual(broker.publish(['user:1'], {'type': 'order_created'}), 1)
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    @override_settings(ORDER_EVENTS_MAX_LIFETIME=0.2, ORDER_EVENTS_HEARTBEAT=0.05)
+    def test_stream_ends_after_max_lifetime(self):
+        user, = create_users('stream', 1, 'business')
+
+        async def read_stream():
+            return [chunk async for chunk in order_event_stream(user)]
+
+        chunks = async_to_sync(read_stream)()
+        self.assertTrue(chunks[1].startswith('event: counts'))
+        self.assertIn(': keep-alive\n\n', chunks)
+
+
+class OrderBulkTransitionTests(TestCase):
+    """
+    A bulk status change neither overwrites nor claims concurrent changes of an order.
+    """
+
+    def setUp(self):
+        business_user, = create_users('business', 1, 'business')
+        customer_user, = create_users('customer', 1, 'customer')
+        offer = Offer.objects.create(user=business_user, title='Logo', description='Logo')
+        detail = OfferDetail.objects.create(
+            offer=offer, title='Basic', offer_type='basic', price=100, delivery_time_in_days=3, features=[], revisions=1
+        )
+        self.business_user_id = business_user.pk
+        self.orders = [Order.objects.create(offer_detail_id=detail, customer_user=customer_user) for _ in range(3)]
+        self.ids = [order.pk for order in self.orders]
+
+    def complete_concurrently(self, **changes):
+        """
+        Completes the orders while the second one is changed between the read and the UPDATE.
+        """
+        def concurrent_change():
+            Order.objects.filter(pk=self.ids[1]).update(version=F('version') + 1, updated_at=timezone.now(), **changes)
+            return timezone.now()
+
+        with mock.patch('orders.models.now', side_effect=concurrent_change):
+            return Order.bulk_transition(self.business_user_id, self.ids, 'completed')
+
+    def test_updates_orders(self):
+        # Orders edited a different number of times still share one UPDATE.
+        Order.objects.filter(pk=self.ids[0]).update(version=F('version') + 2)
+        with CaptureQueriesContext(connection) as queries:
+            result = Order.bulk_transition(self.business_user_id, self.ids, 'completed')
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len([sql for sql in updates if sql.startswith('UPDATE "orders_order"')]), 1)
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(result['updated'], self.ids)
+        self.assertEqual(sorted(Order.objects.values_list('status', 'version')), [('completed', 2)] * 2 + [('completed', 4)])
+        self.assertEqual(BusinessOrderCounter.get_counts(self.business_user_id)['completed'], 3)
+
+    def test_concurrent_edit_is_not_overwritten(self):
+        result = self.complete_concurrently(title='Logo v2')
+        self.assertEqual((result['updated'], result['conflict']), ([self.ids[0], self.ids[2]], [self.ids[1]]))
+        self.assertEqual(Order.objects.values_list('status', 'version').get(pk=self.ids[1]), ('in_progress', 2))
+
+    def test_concurrent_transition_is_not_claimed(self):
+        result = self.complete_concurrently(status='completed')
+        self.assertEqual((result['updated'], result['conflict']), ([self.ids[0], self.ids[2]], [self.ids[1]]))
+        self.assertEqual(BusinessOrderCounter.get_counts(self.business_user_id)['completed'], 2)
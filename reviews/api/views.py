@@ -6,10 +6,19 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from coderr.pagination import KeysetPagination, KeysetPaginationMixin
+from coderr.identity_map import get_profile
 
-class ReviewListAPIView(generics.ListCreateAPIView):
+
+class ReviewKeysetPagination(KeysetPagination):
+    ordering_fields = ('updated_at', 'rating')
+    default_ordering = '-updated_at'
+
+
+class ReviewListAPIView(KeysetPaginationMixin, generics.ListCreateAPIView):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    keyset_pagination_class = ReviewKeysetPagination
     ordering_fields = ['updated_at', 'rating']
     filterset_fields = ['business_user_id', 'reviewer_id']
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
@@ -41,7 +50,7 @@ class ReviewListAPIView(generics.ListCreateAPIView):
         :param serializer: The serializer instance containing the review data.
         :raises PermissionDenied: If the user does not have a customer profile.
         """
-        if not self.request.user.profile.type == 'customer':
+        if getattr(get_profile(self.request.user), 'type', None) != 'customer':
             raise PermissionDenied("Nur Kunden haben Zugriff auf diese Funktion.")
         serializer.save(reviewer=self.request.user)
 
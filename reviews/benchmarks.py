@@ -0,0 +1,28 @@
+import random
+
+from reviews.models import BusinessRating, Review
+
+
+def seed_reviews(count, business_users, customer_users, batch_size=5000, seed=0):
+    """
+    Bulk creates `count` reviews of random business users by random customers
+    with ratings between 1 and 5, skewed towards good ratings. The rating aggregates,
+    which bulk_create bypasses, are reconciled at the end.
+
+    :param count: The number of reviews to create.
+    :param business_users: The users being reviewed.
+    :param customer_users: The users writing the reviews.
+    :param batch_size: The number of reviews written per bulk_create call.
+    :param seed: Seed for the random generator, so runs are reproducible.
+    """
+    rng = random.Random(seed)
+    ratings = [1, 2, 3, 3, 4, 4, 4, 5, 5, 5]
+    for start in range(0, count, batch_size):
+        Review.objects.bulk_create([
+            Review(
+                business_user=rng.choice(business_users), reviewer=rng.choice(customer_users),
+                rating=rng.choice(ratings), description='Benchmark',
+            )
+            for _ in range(min(batch_size, count - start))
+        ])
+    BusinessRating.reconcile()
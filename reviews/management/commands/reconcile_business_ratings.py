@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from reviews.models import BusinessRating
+
+
+class Command(BaseCommand):
+    help = "Detects and repairs drift between the business rating aggregates and the reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted aggregates.")
+
+    def handle(self, *args, **options):
+        """
+        Recomputes the rating aggregates per business user with one grouped query and
+        compares the result with the stored rows. Drifted aggregates are listed and,
+        unless `--dry-run` is given, overwritten with the actual values.
+        """
+        drift = BusinessRating.reconcile(repair=not options['dry_run'])
+        for business_user_id, stored, actual in drift:
+            self.stdout.write(f"Business user {business_user_id}: stored {stored}, actual {actual}")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All rating aggregates are correct."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} rating aggregates drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} rating aggregates."))
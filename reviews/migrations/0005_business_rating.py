@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def populate_ratings(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    BusinessRating = apps.get_model('reviews', 'BusinessRating')
+    histogram = {f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)}
+    rows = Review.objects.order_by().values('business_user_id').annotate(
+        count=Count('id'), total=Sum('rating'), last_review_at=Max('updated_at'), **histogram,
+    )
+    BusinessRating.objects.bulk_create([BusinessRating(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('reviews', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessRating',
+            fields=[
+                ('business_user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('rating_1', models.IntegerField(default=0)),
+                ('rating_2', models.IntegerField(default=0)),
+                ('rating_3', models.IntegerField(default=0)),
+                ('rating_4', models.IntegerField(default=0)),
+                ('rating_5', models.IntegerField(default=0)),
+                ('last_review_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
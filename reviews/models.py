@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum
 from offers.models import Offer
 from django.contrib.auth.models import User
 from django.utils.timezone import now
@@ -12,6 +13,52 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='review_updated_at_id_idx'),
+            models.Index(fields=['rating', 'id'], name='review_rating_id_idx'),
+            models.Index(fields=['business_user', 'updated_at', 'id'], name='review_business_updated_idx'),
+            models.Index(fields=['business_user', 'rating', 'id'], name='review_business_rating_idx'),
+            models.Index(fields=['reviewer', 'updated_at', 'id'], name='review_reviewer_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the business user and rating the review was loaded with,
+        so saving or deleting it updates the business user's rating aggregate.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._counted_as = (instance.__dict__.get('business_user_id'), instance.__dict__.get('rating'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the review and updates the rating aggregate of its business user in the same transaction.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.update_rating()
+
+    def update_rating(self):
+        """
+        Moves the review between the rating aggregates after a save. A changed rating
+        is subtracted from the old and added to the new histogram bucket; every save
+        updates `last_review_at`.
+        """
+        previous = getattr(self, '_counted_as', (None, None))
+        current = (self.business_user_id, self.rating)
+        if previous[0] and previous != current:
+            BusinessRating.adjust(previous[0], previous[1], -1)
+            BusinessRating.adjust(current[0], current[1], 1, reviewed_at=self.updated_at)
+            if previous[0] != current[0]:
+                BusinessRating.refresh_last_review_at(previous[0])
+        elif previous[0]:
+            BusinessRating.adjust(current[0], current[1], 0, reviewed_at=self.updated_at)
+        else:
+            BusinessRating.adjust(current[0], current[1], 1, reviewed_at=self.updated_at)
+        self._counted_as = current
+
     def __str__(self):
         """
         Return a string representation of the Review, in the format
@@ -32,4 +79,122 @@ class Review(models.Model):
         """
 
         self.updated_at = now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.save(*args, **kwargs)
+
+
+class BusinessRating(models.Model):
+    """
+    Rating aggregate of a business user: the number and sum of the ratings, how often
+    each rating from 1 to 5 was given and when a review was last written or changed.
+
+    Maintained in the same transaction as the review by Review.save and by a post_delete
+    receiver. QuerySet.update() and bulk_create() bypass it;
+    `manage.py reconcile_business_ratings` repairs such drift.
+    """
+    RATINGS = range(1, 6)
+
+    business_user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    count = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    last_review_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 1) if self.count else 0
+
+    def summary(self):
+        """
+        Returns the aggregate as it is exposed on the business profile endpoints.
+        """
+        return {
+            'count': self.count,
+            'average': self.average,
+            'histogram': {str(rating): getattr(self, f'rating_{rating}') for rating in self.RATINGS},
+            'last_review_at': self.last_review_at,
+        }
+
+    @classmethod
+    def summary_of(cls, user):
+        """
+        Returns the rating summary of a user, which is empty if the user was never reviewed.
+        Loads the aggregate unless it was fetched with `select_related('rating_summary')`.
+        """
+        try:
+            return user.rating_summary.summary()
+        except cls.DoesNotExist:
+            return cls().summary()
+
+    @classmethod
+    def adjust(cls, business_user_id, rating, delta, reviewed_at=None):
+        """
+        Atomically adds `delta` reviews with the given rating to the aggregate of a business
+        user with a single UPDATE. The row is created on the first review; removals from a
+        missing row are ignored, e.g. while the business user is being deleted.
+
+        :param reviewed_at: If given, stored as `last_review_at`.
+        """
+        changes = {}
+        if delta:
+            changes.update(count=F('count') + delta, total=F('total') + delta * rating)
+            if rating in cls.RATINGS:
+                changes[f'rating_{rating}'] = F(f'rating_{rating}') + delta
+        if reviewed_at is not None:
+            changes['last_review_at'] = reviewed_at
+        if not changes:
+            return
+        updated = cls.objects.filter(pk=business_user_id).update(**changes)
+        if not updated and delta > 0:
+            cls.objects.get_or_create(business_user_id=business_user_id)
+            cls.objects.filter(pk=business_user_id).update(**changes)
+
+    @classmethod
+    def refresh_last_review_at(cls, business_user_id):
+        """
+        Sets `last_review_at` to the newest remaining review of a business user, e.g. after
+        the newest one was deleted. The subquery reads one entry of the business user's
+        `updated_at` index.
+        """
+        newest = Review.objects.filter(business_user_id=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        cls.objects.filter(pk=business_user_id).update(last_review_at=Subquery(newest))
+
+    @classmethod
+    def aggregate_fields(cls):
+        """
+        Returns the aggregate expressions that compute all fields of the rating aggregates
+        from a queryset of reviews grouped by business user.
+        """
+        fields = {'count': Count('id'), 'total': Sum('rating'), 'last_review_at': Max('updated_at')}
+        for rating in cls.RATINGS:
+            fields[f'rating_{rating}'] = Count('id', filter=models.Q(rating=rating))
+        return fields
+
+    @classmethod
+    def reconcile(cls, repair=True):
+        """
+        Compares all aggregates with the actual reviews per business user.
+
+        :param repair: Whether drifted aggregates are overwritten with the actual values.
+        :return: A list of (business user id, stored values, actual values) tuples
+                 for every aggregate that differs.
+        """
+        fields = list(cls.aggregate_fields())
+        actual = {
+            row.pop('business_user_id'): row
+            for row in Review.objects.order_by().values('business_user_id').annotate(**cls.aggregate_fields())
+        }
+        empty = {field: None if field == 'last_review_at' else 0 for field in fields}
+        drift = []
+        with transaction.atomic():
+            stored = {row.pop('business_user_id'): row for row in cls.objects.select_for_update().values('business_user_id', *fields)}
+            for business_user_id in stored.keys() | actual.keys():
+                values = actual.get(business_user_id, empty)
+                if stored.get(business_user_id, empty) != values:
+                    drift.append((business_user_id, stored.get(business_user_id), values))
+                    if repair:
+                        cls.objects.update_or_create(business_user_id=business_user_id, defaults=values)
+        return drift
\ No newline at end of file
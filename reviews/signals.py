@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from reviews.models import BusinessRating, Review
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_rating(sender, instance, **kwargs):
+    """
+    Removes a deleted review from its business user's rating aggregate. Runs inside the
+    deletion's transaction, for direct deletes as well as cascades, e.g. when the reviewer
+    is deleted. `last_review_at` is recomputed from the remaining reviews.
+    """
+    business_user_id, rating = getattr(instance, '_counted_as', (instance.business_user_id, instance.rating))
+    if business_user_id:
+        BusinessRating.adjust(business_user_id, rating, -1)
+        BusinessRating.refresh_last_review_at(business_user_id)
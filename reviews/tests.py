@@ -1,3 +1,22 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from coderr.query_plans import hot_queries
+from coderr.testing import QueryPlanAssertionsMixin
 
-# Create your tests here.
+
+class ReviewQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    The hot review queries are answered through the composite indexes on reviews.
+    """
+    EXPECTED_INDEXES = {
+        'reviews of business': 'review_business_updated_idx',
+        'reviews of business, cursor': 'review_business_updated_idx',
+        'reviews of business by rating': 'review_business_rating_idx',
+        'reviews of reviewer': 'review_reviewer_updated_idx',
+    }
+
+    def test_hot_queries_use_composite_indexes(self):
+        queries = hot_queries(User(pk=1), User(pk=2))
+        for label, index in self.EXPECTED_INDEXES.items():
+            with self.subTest(label):
+                self.assertUsesIndex(queries[label], index)
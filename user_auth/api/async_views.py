@@ -0,0 +1,117 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from user_auth.hashers import HashingPoolFull, hash_password, verify_password
+from .serializers import LoginSerializer, RegistrationSerializer
+
+
+def parse_data(request):
+    """
+    Parses the request body with the parsers of the API views, so the async views
+    accept the same JSON, form and multipart bodies.
+
+    :raises APIException: If the body is malformed or has an unsupported media type.
+    """
+    return Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]).data
+
+
+def busy_response():
+    """
+    Returns the response for a request rejected because the password hashing pool is full.
+    """
+    response = JsonResponse(
+        {"detail": ["Der Server ist gerade ausgelastet. Bitte versuche es in Kürze erneut."]}, status=503
+    )
+    response['Retry-After'] = str(getattr(settings, 'PASSWORD_HASHING_RETRY_AFTER', 1))
+    return response
+
+
+def method_not_allowed():
+    return JsonResponse({"detail": ["Methode nicht erlaubt."]}, status=405)
+
+
+@csrf_exempt
+async def registration(request):
+    """
+    Handles POST requests to register a new user.
+
+    If the request is valid, the user is created and a JSON response containing the
+    user's email, username, user_id and an authentication token is returned with a
+    201 Created status code. If the request is invalid, a JSON response containing
+    the validation errors is returned with a 400 Bad Request status code.
+
+    The view is asynchronous: the password is hashed in the password hashing pool
+    (see user_auth/hashers.py) while the worker keeps serving other requests. It is
+    only hashed once the form is valid and the username and email are free. If the
+    pool is full, a 503 response with a `Retry-After` header is returned. The user,
+    profile and token are created in one transaction; a concurrent registration of
+    the same username or email is answered like a duplicate found by the validation.
+    """
+    if request.method != 'POST':
+        return method_not_allowed()
+    try:
+        serializer = RegistrationSerializer(data=parse_data(request))
+    except APIException as exc:
+        return JsonResponse({"detail": [str(exc.detail)]}, status=exc.status_code)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        password_hash = await hash_password(serializer.validated_data['password'])
+    except HashingPoolFull:
+        return busy_response()
+    try:
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    return JsonResponse({
+        "email": user.email,
+        "username": user.username,
+        "user_id": user.id,
+        "token": user.auth_token.key
+    }, status=201)
+
+
+@csrf_exempt
+async def login(request):
+    """
+    Handles POST requests to log in a user.
+
+    If the username and password are valid, a JSON response containing the user's
+    id, token, username and email is returned with a 201 status code. Otherwise a
+    JSON response containing the validation errors is returned with a 400 status code.
+
+    The view is asynchronous: the password is checked in the password hashing pool
+    (see user_auth/hashers.py) while the worker keeps serving other requests. If the
+    pool is full, a 503 response with a `Retry-After` header is returned.
+    """
+    if request.method != 'POST':
+        return method_not_allowed()
+    try:
+        serializer = LoginSerializer(data=parse_data(request))
+    except APIException as exc:
+        return JsonResponse({"detail": [str(exc.detail)]}, status=exc.status_code)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    user = await User.objects.filter(username=serializer.validated_data['username']).afirst()
+    try:
+        valid = user is not None and await verify_password(user, serializer.validated_data['password'])
+    except HashingPoolFull:
+        return busy_response()
+    if not valid:
+        return JsonResponse({"detail": ["Falscher Benutzername oder falsches Passwort."]}, status=400)
+
+    token, _ = await Token.objects.aget_or_create(user=user)
+    return JsonResponse({
+        "user_id": user.id,
+        "token": token.key,
+        "username": user.username,
+        "email": user.email
+    }, status=201)
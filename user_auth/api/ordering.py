@@ -0,0 +1,46 @@
+from django.db.models import F, FloatField, QuerySet
+from django.db.models.functions import Cast, NullIf
+
+
+class OrderingHelperProfiles:
+    # Every ordering ends with the id, so profiles with equal values keep their order
+    # across pages. The composite indexes on (type, last_name, first_name) and
+    # (type, location) answer the name and location orderings without sorting.
+    PROFILE_ORDERINGS = {
+        "name": ("last_name", "first_name", "id"),
+        "-name": ("-last_name", "-first_name", "-id"),
+        "location": ("location", "id"),
+        "-location": ("-location", "-id"),
+    }
+    BUSINESS_ORDERINGS = {
+        **PROFILE_ORDERINGS,
+        "rating": (F("rating_average").asc(nulls_first=True), "user__rating_summary__count", "id"),
+        "-rating": (F("rating_average").desc(nulls_last=True), "-user__rating_summary__count", "-id"),
+        "completed_orders": (F("user__order_counter__completed").asc(nulls_first=True), "id"),
+        "-completed_orders": (F("user__order_counter__completed").desc(nulls_last=True), "-id"),
+    }
+
+    @classmethod
+    def apply_ordering(cls, queryset: QuerySet, ordering: str, business: bool = False) -> QuerySet:
+        """
+        Applies ordering to a queryset of profiles.
+
+        :param queryset: A QuerySet of profiles.
+        :param ordering: A string indicating how to order the queryset.
+            Supported values are:
+            - name / -name: Orders by last name and first name.
+            - location / -location: Orders by location.
+            Business profiles additionally support:
+            - rating / -rating: Orders by the average rating, then by the number of reviews.
+              Businesses without reviews come first in ascending and last in descending order.
+            - completed_orders / -completed_orders: Orders by the number of completed orders.
+            If not specified or not supported, defaults to the id.
+        :param business: Whether the queryset contains business profiles.
+        :return: A QuerySet ordered according to the specified ordering.
+        """
+        orderings = cls.BUSINESS_ORDERINGS if business else cls.PROFILE_ORDERINGS
+        if ordering in ("rating", "-rating") and business:
+            queryset = queryset.alias(rating_average=Cast("user__rating_summary__total", FloatField()) / NullIf(
+                "user__rating_summary__count", 0
+            ))
+        return queryset.order_by(*orderings.get(ordering, ("id",)))
@@ -1,9 +1,14 @@
 from wsgiref import validate
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from ..models import Profile
 from rest_framework.authtoken.models import Token
 from rest_framework import serializers
-from django.shortcuts import get_object_or_404
+from coderr.images import ImageVariantsField
+from coderr.identity_map import get_user
+from reviews.models import BusinessRating
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,39 +18,13 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class LoginSerializer(serializers.Serializer):
+    """
+    Validates the login form. The credentials are checked by the login view, which
+    verifies the password in the password hashing pool (see user_auth/hashers.py).
+    """
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
-        """
-        Validates the provided username and password.
-
-        This method checks if a user with the given username exists and if the 
-        password is correct. If the credentials are invalid, it raises a 
-        serializers.ValidationError with a detail message "Falscher Benutzername 
-        oder falsches Passwort.". If the credentials are valid, it creates or 
-        retrieves an authentication token for the user and adds the user's ID, 
-        token, and email to the validated data.
-
-        :param data: The data containing the username and password.
-        :return: The validated data updated with the user's ID, token, and email.
-        """
-        username = data.get("username")
-        password = data.get("password")
-        user = User.objects.filter(username=username).first()
-
-        if not user or not user.check_password(password):
-            raise serializers.ValidationError({"detail": ["Falscher Benutzername oder falsches Passwort."]})
-
-        token, _ = Token.objects.get_or_create(user=user)
-
-        data.update({
-            "user_id": user.id,
-            "token": token.key,
-            "email": user.email
-        })
-        return data
-
 
 class RegistrationSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
@@ -75,14 +54,17 @@ class RegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'password', 'repeated_password', 'email', 'type']
+
+    DUPLICATE_ERROR = {"detail": ["Benutzername oder E-Mail existiert bereits."]}
  
     def validate(self, data):
         """
         Validates the given data and raises a serializers.ValidationError
         if the data is invalid.
 
-        This method checks if the given username and email are unique and if
-        the given passwords match. If the username or email already exist,
+        This method checks if the given username and email are unique, with a single
+        query answered by the indexes on both columns, and if the given passwords
+        match. If the username or email already exist,
         it raises a serializers.ValidationError with a detail message
         "Benutzername oder E-Mail existiert bereits.". If the passwords do not
         match, it raises a serializers.ValidationError with a detail message
@@ -92,10 +74,10 @@ class RegistrationSerializer(serializers.ModelSerializer):
         :return: The validated data.
         :raises serializers.ValidationError: If the data is invalid.
         """
-        if User.objects.filter(username=data['username']).exists() or User.objects.filter(email=data['email']).exists():
-            raise serializers.ValidationError(
-                {"detail": ["Benutzername oder E-Mail existiert bereits."]}
-            )
+        username = User.normalize_username(data['username'])
+        email = User.objects.normalize_email(data['email'])
+        if User.objects.filter(Q(username=username) | Q(email=email)).exists():
+            raise serializers.ValidationError(self.DUPLICATE_ERROR)
         if data['password'] != data['repeated_password']:
             raise serializers.ValidationError(
                 {"detail": ["Passwörter stimmt nicht überein."]}
@@ -104,28 +86,42 @@ class RegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """
-        Creates a new user and associated profile with the given validated data.
+        Creates a new user, its profile and its authentication token with the given validated data.
 
         This method uses the provided validated data to create a new user in the 
         database and then creates an associated profile for the user with the 
-        specified type. The user is created using the `create_user` method of the 
-        `User` model. A `Profile` instance is created and linked to the user.
+        specified type and a token, all in one transaction with one INSERT each.
+        The username and email are normalized like `create_user` does.
+        The password hash can be passed as `password_hash` to `save()`, e.g. computed in
+        the password hashing pool; otherwise the password is hashed here.
+
+        The unique indexes on the username and email of users and on the email of
+        profiles decide registrations racing past `validate`: the loser's transaction
+        is rolled back and the same error as in `validate` is raised.
 
         :param validated_data: The validated data containing the username, email, 
                             password, and user type.
-        :return: The created `User` instance.
+        :return: The created `User` instance, with the token as `user.auth_token`.
+        :raises serializers.ValidationError: If the username or email already exist.
         """
-        username = validated_data['username']
-        email = validated_data['email']
-        password = validated_data['password']
+        username = User.normalize_username(validated_data['username'])
+        email = User.objects.normalize_email(validated_data['email'])
+        password_hash = validated_data.get('password_hash') or make_password(validated_data['password'])
         user_type = validated_data['type']
 
-        user = User.objects.create_user(username=username, email=email, password=password)
-        Profile.objects.create(user=user, email=email, type=user_type)
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username=username, email=email, password=password_hash)
+                Profile.objects.create(user=user, email=email, type=user_type)
+                Token.objects.create(user=user)
+        except IntegrityError:
+            raise serializers.ValidationError(self.DUPLICATE_ERROR)
         return user
        
 
 class ProfileSerializer(serializers.ModelSerializer):
+    file_variants = ImageVariantsField('file', Profile.FILE_VARIANTS)
+
     class Meta:
         model = Profile
         fields = '__all__'
@@ -179,8 +175,9 @@ class ProfileSerializer(serializers.ModelSerializer):
 
         This method loops through the validated data and updates the corresponding
         fields of the profile instance. Additionally, it updates the first_name and
-        last_name fields of the related User instance. The method returns the updated
-        profile instance.
+        last_name fields of the related User instance, which is looked up once through
+        the request's identity map and written only if one of them changed. The profile
+        itself writes only its changed fields. The method returns the updated profile instance.
 
         :param instance: The profile instance to update.
         :param validated_data: The validated data to update the profile with.
@@ -188,19 +185,23 @@ class ProfileSerializer(serializers.ModelSerializer):
         """
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-            user = instance.user
-            user = get_object_or_404(User, pk=user.id)
-            user.first_name = instance.first_name
-            user.last_name = instance.last_name
-            user.location = instance.location
-
-            user.save()
+        if validated_data:
+            user = get_user(instance.user_id)
+            changed = [field for field in ('first_name', 'last_name') if getattr(user, field) != getattr(instance, field)]
+            for field in changed:
+                setattr(user, field, getattr(instance, field))
+            if changed:
+                user.save(update_fields=changed)
+            instance.user = user
         instance.save()
 
         return instance
 
 
 class BusinessProfilesListSerializer(serializers.ModelSerializer):
+    file_variants = ImageVariantsField('file', Profile.FILE_VARIANTS)
+    rating = serializers.SerializerMethodField()
+
     class Meta:
         model = Profile
         fields = [
@@ -212,17 +213,29 @@ class BusinessProfilesListSerializer(serializers.ModelSerializer):
             'location',
             'type', 
             'file', 
+            'file_variants',
             'description', 
             'working_hours', 
+            'rating',
         ]
+
+    def get_rating(self, obj):
+        """
+        Returns the rating aggregate of the business user. The list view loads it together
+        with the profiles, so it costs no query per profile.
+        """
+        return BusinessRating.summary_of(obj.user)
  
     
 
 class CustomerProfilesListSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    file = serializers.SerializerMethodField()
+    file_variants = ImageVariantsField('file', Profile.FILE_VARIANTS)
 
     class Meta:
         model = Profile
-        fields = ['user', 'type', 'file', 'uploaded_at']
- 
+        fields = ['user', 'username', 'first_name', 'last_name', 'file', 'file_variants', 'uploaded_at', 'type']
 
- 
\ No newline at end of file
+    def get_file(self, obj):
+        return obj.file.url if obj.file else None
@@ -1,10 +1,10 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 
 urlpatterns = [
-    path('login/', views.LoginView.as_view()),
-    path('registration/', views.RegistrationAPIView.as_view()),
+    path('login/', async_views.login),
+    path('registration/', async_views.registration),
     path('profile/<int:id>/', views.ProfileDetailsAPIView.as_view()),
     path('profiles/business/', views.ProfileListBusiness.as_view()),
     path('profiles/customer/', views.ProfileListCustomers.as_view()),
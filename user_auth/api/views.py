@@ -1,88 +1,65 @@
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import IsAuthenticated
 from user_auth.models import Profile
 from rest_framework import status
-from .serializers import RegistrationSerializer, LoginSerializer
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from user_auth.api.serializers import ProfileSerializer, BusinessProfilesListSerializer, CustomerProfilesListSerializer
+from coderr.conditional import conditional_get
+from coderr.pagination import OptInPageNumberPagination
+from coderr.query_budget import QueryBudgetMixin
+from user_auth.api.ordering import OrderingHelperProfiles
+from reviews.models import BusinessRating
  
 
-class RegistrationAPIView(APIView):
-    permission_classes = [AllowAny]
-    def post(self, request):
-        """
-        Handles POST requests to register a new user.
-
-        If the request is valid, the user is created and a JSON response
-        containing the user's email, username, user_id and an authentication
-        token is returned with a 201 Created status code. If the request is
-        invalid, a JSON response containing the validation errors is returned
-        with a 400 Bad Request status code.
-
-        :param request: The request object.
-        :return: A JSON response containing the user's email, username, user_id and an authentication token or a JSON response containing the validation errors.
-        """
-        serializer = RegistrationSerializer(data=request.data)
-
-        if serializer.is_valid():
-            user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
-            return Response({
-                "email": user.email,
-                "username": user.username,
-                "user_id": user.id,
-                "token": token.key
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
+def profile_version(request, id, *args, **kwargs):
+    """
+    Returns the version of a profile for conditional requests.
 
-class LoginView(APIView):
-    permission_classes = [AllowAny]
-    def post(self, request):
-        """
-        Handles POST requests to log in a user.
+    Every profile save touches `uploaded_at`, so together with the profile's id and the
+    file variants, which the background workers add later, it identifies the version
+    of the response. Business profiles also show their rating aggregate, which changes
+    with every review and is part of the version as well.
 
-        This method attempts to authenticate a user with the provided credentials.
-        If the credentials are valid, it returns a JSON response containing the
-        user's id, token, username, and email with a 200 OK status code. If the
-        credentials are invalid, it returns a JSON response containing the validation
-        errors with a 400 Bad Request status code.
+    :return: A tuple of the version values and the last modification time, or None
+             if the profile does not exist.
+    """
+    version = Profile.objects.filter(user__id=id).values_list(
+        'pk', 'uploaded_at', 'file_variants',
+        'user__rating_summary__count', 'user__rating_summary__total', 'user__rating_summary__last_review_at',
+    ).first()
+    if version is None:
+        return None
+    return version, max(filter(None, (version[1], version[5])))
 
-        :param request: The HTTP request object containing user credentials.
-        :return: A JSON response with user details and token or validation errors.
-        """
-        serializer = LoginSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            data = {key: serializer.validated_data[key] for key in ["user_id", "token", "username", "email"]}
-            return Response(data, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
- 
 
-class ProfileDetailsAPIView(APIView):
+class ProfileDetailsAPIView(QueryBudgetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    # Authentication, the profile, the email uniqueness check and one UPDATE each
+    # for the changed columns of the profile and of its user.
+    query_budget = {'PATCH': 5}
  
+    @conditional_get(profile_version)
     def get(self, request, id):  
         """
         Retrieves the profile details for a user with the given ID.
 
         Fetches the profile associated with the user ID and returns it as a JSON response.
-        The 'uploaded_at' field is omitted from the response data.
+        The 'uploaded_at' field is omitted from the response data. Business profiles
+        include their `rating` aggregate, read in the same query as the profile.
 
         :param request: The incoming request.
         :param id: The ID of the user whose profile is to be retrieved.
         :return: A JSON response containing the profile details with a 200 status code.
         :raises Http404: If the profile does not exist.
         """
-        profile = get_object_or_404(Profile, user__id=id)
+        profile = get_object_or_404(Profile.objects.select_related('user__rating_summary'), user__id=id)
         serializer = ProfileSerializer(profile)
         data = serializer.data
         data.pop('uploaded_at', None)
+        if profile.type == 'business':
+            data['rating'] = BusinessRating.summary_of(profile.user)
 
         return Response(data, status=status.HTTP_200_OK)
  
@@ -102,7 +79,7 @@ class ProfileDetailsAPIView(APIView):
         :raises PermissionDenied: If the authenticated user does not own the profile.
         """
         profile = get_object_or_404(Profile, user__id=id)
-        if profile.user != request.user:
+        if profile.user_id != request.user.id:
             raise PermissionDenied("Dir fehlt die Berechtigung, dieses Profil zu bearbeiten.")
         
         allowed_fields = {'username', 'first_name', 'last_name', 'email', 'location', 'description', 'working_hours', 'tel', 'file'}
@@ -119,63 +96,71 @@ class ProfileDetailsAPIView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
  
 
-class ProfileListBusiness(APIView):
-    permission_classes = [IsAuthenticated]
-    pagination_class = None
-
-    def get(self, request):
-        """
-        Returns a list of all business profiles.
-
-        This method returns a JSON response containing a list of business profiles.
-        Each profile is represented by a dictionary with the following keys:
-        - `id`: The ID of the profile.
-        - `user`: A dictionary with the user details.
-        - `type`: The type of the profile (business or customer).
-        - `file`: The path to the profile picture.
-        - `uploaded_at`: The time when the profile picture was uploaded.
-        - `description`: The description of the business.
-        - `working_hours`: The working hours of the business.
-        - `tel`: The phone number of the business.
-        - `location`: The location of the business.
-
-        :return: A JSON response containing the list of business profiles with a 200 status code.
-        """
-        profiles = Profile.objects.filter(type='business')
-        serializer = BusinessProfilesListSerializer(profiles, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
+class ProfileDirectoryAPIView(QueryBudgetMixin, APIView):
+    """
+    Base view of the profile directories, listing the profiles of `profile_type`.
 
-class ProfileListCustomers(APIView):
+    With `page` or `page_size` the profiles are returned in numbered pages, otherwise
+    as a deprecated plain list of at most `UNPAGINATED_LIST_LIMIT` profiles (see
+    OptInPageNumberPagination). `ordering` sorts them (see OrderingHelperProfiles). Every profile
+    is serialized from the columns loaded with the page, so a page costs the same
+    number of queries no matter how many profiles it contains.
+    """
     permission_classes = [IsAuthenticated]
-    pagination_class = None
+    pagination_class = OptInPageNumberPagination
+    query_budget = {'GET': 3}
+    profile_type = None
+    serializer_class = None
 
-    def get(self, request):
-        """
-        Retrieves a list of all customer profiles.
-
-        This method queries the database for profiles with a type of 'customer' and returns
-        them as a JSON response. Each profile includes user details, first and last name,
-        profile picture URL (if available), upload timestamp, and profile type.
+    def get_queryset(self):
+        return Profile.objects.filter(type=self.profile_type)
 
-        :param request: The incoming HTTP request.
-        :return: A JSON response containing a list of customer profiles with a 200 status code.
-                Returns a 500 status code with an error message if an exception occurs.
-        """
-        try:
-            profiles = Profile.objects.filter(type='customer')
-            data = [
-                {
-                    "user": profile.user.id,
-                    "username": profile.user.username,
-                    "first_name": profile.first_name,
-                    "last_name": profile.last_name,
-                    "file": profile.file.url if profile.file else None,
-                    "uploaded_at": profile.uploaded_at,
-                    "type": profile.type,
-                }
-                for profile in profiles
-            ]
-            return Response(data, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+    def get(self, request):
+        profiles = OrderingHelperProfiles.apply_ordering(
+            self.get_queryset(), request.query_params.get('ordering'), business=self.profile_type == 'business'
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(profiles, request, view=self)
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ProfileListBusiness(ProfileDirectoryAPIView):
+    """
+    Returns the business profiles.
+
+    Each profile is represented by a dictionary with the following keys:
+    - `user`: The ID of the user.
+    - `username`, `first_name`, `last_name`: The names of the business.
+    - `type`: The type of the profile (business or customer).
+    - `file`: The path to the profile picture and `file_variants` the URLs of its variants.
+    - `description`: The description of the business.
+    - `working_hours`: The working hours of the business.
+    - `tel`: The phone number of the business.
+    - `location`: The location of the business.
+    - `rating`: The number of reviews, average rating, 1-5 histogram and time of the last review.
+
+    Besides `name` and `location`, the profiles can be sorted by `rating` and `completed_orders`.
+    The rating aggregate is loaded with the profiles.
+    """
+    profile_type = 'business'
+    serializer_class = BusinessProfilesListSerializer
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('user__rating_summary')
+
+
+class ProfileListCustomers(ProfileDirectoryAPIView):
+    """
+    Returns the customer profiles.
+
+    Each profile includes the user's id and username, first and last name, profile
+    picture URL (if available), the URLs of its avatar and thumbnail variants, upload
+    timestamp, and profile type. The users are loaded with the profiles. The profiles
+    can be sorted by `name` and `location`.
+    """
+    profile_type = 'customer'
+    serializer_class = CustomerProfilesListSerializer
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('user')
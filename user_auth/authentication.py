@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from coderr.identity_map import remember
+from user_auth.models import Profile
+
+
+TOKEN_FIELDS = ('key', 'user_id', 'created')
+# The password hash is not kept in the cache; it is loaded on first access.
+USER_FIELDS = tuple(field.attname for field in User._meta.concrete_fields if field.attname != 'password')
+PROFILE_FIELDS = ('id', 'user_id', 'type')
+
+CachedToken = namedtuple('CachedToken', ['token', 'user', 'profile', 'expires_at'])
+
+
+class TokenCache:
+    """
+    A bounded LRU cache of authenticated tokens with a time to live, shared by the
+    threads of one process.
+
+    An entry holds the column values of the token, its user (without the password hash)
+    and the id and type of the user's profile, never model instances, so every request builds its own
+    instances and cannot leak changes into other requests. Every invalidation bumps
+    a generation counter; entries read from the database before an invalidation are
+    not stored, so a concurrent delete can never be overwritten by a stale entry.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.keys_by_user = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, token, user, profile, generation):
+        """
+        Stores an entry unless an invalidation happened since `generation` was read.
+        The least recently used entry is evicted once `max_size` is exceeded.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            self._remove(key)
+            self.entries[key] = CachedToken(token, user, profile, time.monotonic() + self.ttl)
+            self.keys_by_user.setdefault(token[1], set()).add(key)
+            while len(self.entries) > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, key):
+        with self.lock:
+            self.generation += 1
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        """
+        Drops the entries of all tokens of a user, and of all tokens whose cached profile
+        belonged to the user, e.g. before the profile was moved to another user.
+        """
+        with self.lock:
+            self.generation += 1
+            keys = set(self.keys_by_user.get(user_id, ()))
+            keys.update(key for key, entry in self.entries.items() if entry.profile and entry.profile[1] == user_id)
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            keys = self.keys_by_user.get(entry.token[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_user[entry.token[1]]
+
+
+@lru_cache(maxsize=None)
+def get_token_cache():
+    return TokenCache(
+        max_size=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000),
+        ttl=getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60),
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers authenticated tokens in a TokenCache, so
+    repeated requests with the same token run no query to authenticate.
+
+    A cache miss loads the token, the user and the profile with one joined query. The
+    user gets a profile instance with only its id and type loaded, so role checks like
+    `user.profile.type == 'business'` need no query either; other profile fields are
+    loaded on first access. Entries are invalidated in this process when the token is
+    deleted or the user or profile changes (see user_auth/signals.py); other processes
+    notice such changes after at most `TOKEN_AUTH_CACHE_TTL` seconds.
+
+    The user is registered in the request's identity map, so later lookups of the
+    user or its profile during the request reuse these instances.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        entry = cache.get(key)
+        if entry is None:
+            generation = cache.generation
+            token = Token.objects.select_related('user__profile').filter(key=key).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            profile = getattr(token.user, 'profile', None)
+            cache.set(
+                key,
+                tuple(getattr(token, field) for field in TOKEN_FIELDS),
+                tuple(getattr(token.user, field) for field in USER_FIELDS),
+                tuple(getattr(profile, field) for field in PROFILE_FIELDS) if profile else None,
+                generation,
+            )
+            remember(token.user)
+            return token.user, token
+        user, token = self.build(entry)
+        remember(user)
+        return user, token
+
+    def build(self, entry):
+        """
+        Builds fresh token, user and profile instances from a cache entry, as if they
+        were loaded from the database.
+        """
+        db = router.db_for_read(User)
+        user = User.from_db(db, USER_FIELDS, entry.user)
+        token = Token.from_db(db, TOKEN_FIELDS, entry.token)
+        token.user = user
+        if entry.profile is not None:
+            profile = Profile.from_db(db, PROFILE_FIELDS, entry.profile)
+            profile.user = user
+            user.profile = profile
+        else:
+            User.profile.related.set_cached_value(user, None)
+        return user, token
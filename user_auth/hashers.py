@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    The PBKDF2 hasher with the number of iterations taken from `PASSWORD_HASH_ITERATIONS`,
+    so every deployment can choose its hash cost. Stored hashes with another number of
+    iterations stay valid and are rehashed with the configured cost on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class PasswordHashingPool:
+    """
+    A bounded thread pool for password hashing, shared by the requests of one process.
+
+    Hashing a password is deliberately slow. Running it in a few dedicated threads keeps
+    the event loop and the threads of other requests free while a burst of logins is
+    hashed; hashlib releases the GIL while hashing, so the threads run in parallel.
+    At most `workers` hashes run at once and at most `queue_size` more wait for a thread.
+    Further jobs are rejected with HashingPoolFull instead of piling up, so a burst of
+    logins cannot build an ever-growing backlog.
+    """
+
+    def __init__(self, workers, queue_size):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    async def run(self, func, *args):
+        """
+        Runs the function in the pool and waits for its result without blocking the event loop.
+
+        :raises HashingPoolFull: If all threads are busy and the queue is full.
+        """
+        with self.lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise HashingPoolFull()
+            self.pending += 1
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self.lock:
+            self.pending -= 1
+
+
+@lru_cache(maxsize=None)
+def get_hashing_pool():
+    return PasswordHashingPool(
+        workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 1),
+        queue_size=getattr(settings, 'PASSWORD_HASHING_QUEUE', 16),
+    )
+
+
+async def hash_password(password):
+    """
+    Hashes a password with the preferred hasher in the hashing pool.
+
+    :raises HashingPoolFull: If the hashing pool is full.
+    """
+    return await get_hashing_pool().run(make_password, password)
+
+
+async def verify_password(user, password):
+    """
+    Checks a password against the hash of the user in the hashing pool, like
+    `user.check_password`. A hash created with other settings is replaced by one with
+    the current hash cost, unless the pool is full by then.
+
+    :raises HashingPoolFull: If the hashing pool is full.
+    """
+    outdated = []
+    if not await get_hashing_pool().run(check_password, password, user.password, outdated.append):
+        return False
+    if outdated:
+        try:
+            user.password = await hash_password(password)
+        except HashingPoolFull:
+            return True
+        await type(user).objects.filter(pk=user.pk).aupdate(password=user.password)
+    return True
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from coderr.asgi import application
+from coderr.benchmark import asgi_request
+from orders.benchmarks import create_users
+from user_auth.hashers import get_hashing_pool
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+class Round:
+    """
+    The results of one round: the latencies of the reads and logins, and the number of
+    logins that were turned away with 503 and retried after `Retry-After`.
+    """
+
+    def __init__(self):
+        self.elapsed = 0
+        self.reads = []
+        self.logins = []
+        self.rejected = 0
+        self.errors = 0
+
+
+async def read_client(path, until, results):
+    while time.perf_counter() < until:
+        start = time.perf_counter()
+        status, _ = await asgi_request(application, 'GET', path)
+        if status == 200:
+            results.reads.append(time.perf_counter() - start)
+        else:
+            results.errors += 1
+
+
+async def login_client(username, until, results):
+    body = json.dumps({'username': username, 'password': 'benchmark'}).encode()
+    headers = [('Content-Type', 'application/json')]
+    while time.perf_counter() < until:
+        start = time.perf_counter()
+        status, _ = await asgi_request(application, 'POST', '/api/login/', body, headers)
+        if status == 201:
+            results.logins.append(time.perf_counter() - start)
+        elif status == 503:
+            results.rejected += 1
+            await asyncio.sleep(1)
+        else:
+            results.errors += 1
+
+
+class Command(BaseCommand):
+    help = "Measures sustained login throughput and the latency of concurrent reads on one ASGI worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per round.")
+        parser.add_argument('--login-clients', type=int, default=64, help="Clients logging in over and over.")
+        parser.add_argument('--read-clients', type=int, default=8, help="Clients reading over and over.")
+        parser.add_argument('--read-path', default='/api/base-info/', help="Endpoint requested by the read clients.")
+        parser.add_argument('--hashing-workers', type=int, nargs='+', default=[1, 2, 4],
+                            help="Sizes of the password hashing pool to test, one round each.")
+
+    def handle(self, *args, **options):
+        """
+        Runs the requests through `coderr.asgi.application` in memory, like one ASGI worker.
+
+        The first round only reads, as a baseline for the read latency. Every further
+        round adds login clients, each with its own temporary user, for one size of
+        the password hashing pool with the configured hash cost. Reported per round:
+        reads and logins per second, their median and p95 latency, and how many logins
+        were turned away because the pool was full. Requests still running at the end of
+        a round are awaited and the rates refer to the whole time including them.
+        """
+        users = create_users('benchmark_login', options['login_clients'], 'customer')
+        try:
+            self.stdout.write(f"{options['read_clients']} read clients on {options['read_path']}, "
+                              f"{options['login_clients']} login clients, {options['duration']:.0f} s per round")
+            self.report('reads only', asyncio.run(self.run_round(options, [])))
+            for workers in options['hashing_workers']:
+                with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                    get_hashing_pool.cache_clear()
+                    results = asyncio.run(self.run_round(options, users))
+                self.report(f'{workers} hashing threads', results)
+        finally:
+            get_hashing_pool.cache_clear()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    async def run_round(self, options, users):
+        results = Round()
+        start = time.perf_counter()
+        until = start + options['duration']
+        await asyncio.gather(
+            *(read_client(options['read_path'], until, results) for _ in range(options['read_clients'])),
+            *(login_client(user.username, until, results) for user in users),
+        )
+        results.elapsed = time.perf_counter() - start
+        return results
+
+    def report(self, label, results):
+        duration = results.elapsed
+        line = (
+            f"{label:<20} reads {len(results.reads) / duration:8.1f}/s  "
+            f"median {statistics.median(results.reads or [0]) * 1000:7.1f} ms  "
+            f"p95 {percentile(results.reads, 0.95) * 1000:7.1f} ms"
+        )
+        if results.logins or results.rejected:
+            line += (
+                f"   logins {len(results.logins) / duration:6.1f}/s  "
+                f"median {statistics.median(results.logins or [0]) * 1000:7.1f} ms  "
+                f"p95 {percentile(results.logins, 0.95) * 1000:7.1f} ms  503s {results.rejected}"
+            )
+        self.stdout.write(line + (f"  errors {results.errors}" if results.errors else ""))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from coderr.benchmark import format_stats, measure, rolled_back
+from orders.benchmarks import create_users
+from user_auth.authentication import CachedTokenAuthentication, get_token_cache
+
+
+def authenticate_all(authentication, keys):
+    """
+    Authenticates every token and checks the role of its user, like a request
+    to a view that is restricted to customers or business users.
+    """
+    for key in keys:
+        user, _ = authentication.authenticate_credentials(key)
+        user.profile.type == 'business'
+
+
+def count_queries(func):
+    """
+    Calls the function and returns the number of queries it ran.
+    """
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        func()
+    return len(queries)
+
+
+class Command(BaseCommand):
+    help = "Times token authentication with a role check with and without the token cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Number of users with a token.")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of runs per strategy.")
+
+    def handle(self, *args, **options):
+        """
+        Creates users with profiles and tokens inside a transaction that is rolled back
+        afterwards. Each run authenticates every token once, so a run stands for as
+        many requests as there are users. Reports the time per run and the queries per
+        request of DRF's TokenAuthentication and of CachedTokenAuthentication, once with
+        a cold and then with a warm cache.
+        """
+        with rolled_back():
+            users = create_users('benchmark_auth', options['users'], 'customer')
+            keys = [token.key for token in Token.objects.bulk_create([
+                Token(key=Token.generate_key(), user=user) for user in users
+            ])]
+            cache = get_token_cache()
+            strategies = [
+                ('TokenAuthentication', TokenAuthentication(), None),
+                ('cached, cold', CachedTokenAuthentication(), cache.clear),
+                ('cached, warm', CachedTokenAuthentication(), None),
+            ]
+            self.stdout.write(f"{len(keys)} requests per run, token cache size {cache.max_size}")
+            for label, authentication, before in strategies:
+                run = (lambda: (before(), authenticate_all(authentication, keys))) if before else (
+                    lambda: authenticate_all(authentication, keys))
+                queries = count_queries(run)
+                self.stdout.write(
+                    format_stats(label, measure(run, repeat=options['repeat']))
+                    + f"   {queries / len(keys):.1f} queries per request"
+                )
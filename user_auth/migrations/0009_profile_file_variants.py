@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0008_alter_profile_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='file_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stops the migration with a readable error if users share an email address,
+    which have to be merged or changed before the unique index can be created.
+    """
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias).exclude(email='')
+        .values('email').annotate(users=Count('id')).filter(users__gt=1).values_list('email', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(f"Several users share these email addresses: {', '.join(duplicates)}")
+
+
+class Migration(migrations.Migration):
+    """
+    Makes the email of users unique, ignoring blank emails, e.g. of superusers created
+    without one. The built-in User model cannot declare the constraint, so the indexes
+    are created here: the partial unique index enforces it, the plain index serves
+    lookups by email, which the partial index cannot answer for a bound parameter.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user_auth', '0010_profile_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql=[
+                'CREATE UNIQUE INDEX "auth_user_email_uniq" ON "auth_user" ("email") WHERE "email" <> \'\'',
+                'CREATE INDEX "auth_user_email_idx" ON "auth_user" ("email")',
+            ],
+            reverse_sql=[
+                'DROP INDEX "auth_user_email_idx"',
+                'DROP INDEX "auth_user_email_uniq"',
+            ],
+        ),
+    ]
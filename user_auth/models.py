@@ -1,8 +1,14 @@
 from django.db import models
 from django.utils.timezone import now
 from django.contrib.auth.models import User
+from coderr.images import delete_variants, render_variants, schedule_variants
+from coderr.dirty_fields import DirtyFieldsMixin
+from coderr.identity_map import get_user
+
+class Profile(DirtyFieldsMixin, models.Model):
+    FILE_VARIANTS = {'avatar': (160, 160), 'thumbnail': (48, 48)}
+    save_excluded_fields = ('file_variants',)
 
-class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     email = models.EmailField(unique=True, error_messages={'unique': "Email existiert bereits."})
     username = models.CharField(max_length=150, default='Nutzername')
@@ -13,30 +19,71 @@ class Profile(models.Model):
     location = models.CharField(max_length=100, default = 'location')
     description = models.TextField(max_length=1000, default = '')
     file = models.FileField(blank=True, null=True, upload_to='uploads/')
+    file_variants = models.JSONField(default=dict, blank=True, editable=False)
     working_hours = models.CharField(max_length=100, default = '09:00 - 18:00')
     uploaded_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['type', 'last_name', 'first_name'], name='profile_type_name_idx'),
+            models.Index(fields=['type', 'location'], name='profile_type_location_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         """
         Saves the Profile instance.
 
-        This method updates the username field with the user's username before saving.
+        This method updates the username field with the user's username before saving,
+        looked up through the request's identity map unless the user is already loaded.
+        A profile loaded from the database whose user is not loaded keeps its username,
+        so saving it without changes runs no query.
         If the profile already exists (i.e., has a primary key), it checks if the file field
         has been changed. If the file has changed, the uploaded_at field is updated to the
         current time. Finally, it calls the superclass's save method to save the instance.
+        A profile loaded from the database is compared with the values it was loaded with
+        and writes only the changed fields (see DirtyFieldsMixin); other instances are
+        compared with the stored row. The file variants are written by the background
+        workers only, so an existing profile never writes them back, and new variants are
+        scheduled for a new file.
 
         :param args: Additional positional arguments.
         :param kwargs: Additional keyword arguments.
         """
 
-        self.username = self.user.username
+        if not self.is_tracked() or Profile.user.is_cached(self):
+            self.username = (self.user if Profile.user.is_cached(self) else get_user(self.user_id)).username
         
-        if self.pk:  
+        if self.pk and self.is_tracked():
+            if 'file' in self.get_dirty_fields():
+                self.uploaded_at = now()
+        elif self.pk:  
             original = Profile.objects.get(pk=self.pk)
             if original.file != self.file:  
                 self.uploaded_at = now()
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'file_variants'
+                ]
         super().save(*args, **kwargs)
+        if self.file and self.file_variants.get('source') != self.file.name:
+            schedule_variants(self, 'refresh_file_variants')
+
+    def refresh_file_variants(self):
+        """
+        Renders the avatar and thumbnail variants of the profile file and stores their
+        names, unless the file was replaced in the meantime; then they are deleted again.
+        Once the new names are stored, the variant files of the previous file are deleted.
+        """
+        if not self.file:
+            return
+        variants = render_variants(self.file, self.FILE_VARIANTS)
+        if not Profile.objects.filter(pk=self.pk, file=self.file.name).update(file_variants=variants):
+            delete_variants(self.file.storage, variants)
+            return
+        delete_variants(self.file.storage, self.file_variants, keep=variants)
+        self.file_variants = variants
  
     def __str__(self):
         """
@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from user_auth.authentication import get_token_cache
+from user_auth.models import Profile
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """
+    Drops a deleted or rotated token from the token authentication cache.
+    """
+    get_token_cache().invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drops the cached tokens of a user whose account or profile changed, e.g. when the
+    user is deactivated or the profile type or user is changed.
+    """
+    get_token_cache().invalidate_user(instance.pk if sender is User else instance.user_id)
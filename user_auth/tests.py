@@ -1,3 +1,286 @@
-from django.test import TestCase
+import re
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from coderr.query_plans import hot_queries
+from coderr.testing import DirtyFieldsAssertionsMixin, QueryPlanAssertionsMixin
+from orders.benchmarks import create_users
+from user_auth.api.serializers import RegistrationSerializer
+from user_auth.hashers import PasswordHashingPool
+from user_auth.models import Profile
+
+
+def create_user(username, user_type='customer'):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='test')
+    Profile.objects.create(user=user, email=user.email, type=user_type)
+    return user
+
+
+class ProfileQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    The profile directories and the registration check are answered through indexes.
+    """
+    EXPECTED_INDEXES = {
+        'business directory by name': 'profile_type_name_idx',
+        'business directory by location': 'profile_type_location_idx',
+        'customer directory by name': 'profile_type_name_idx',
+        'registration uniqueness check': 'auth_user_email_idx',
+    }
+
+    def test_hot_queries_use_indexes(self):
+        queries = hot_queries(User(pk=1), User(pk=2))
+        for label, index in self.EXPECTED_INDEXES.items():
+            with self.subTest(label):
+                self.assertUsesIndex(queries[label], index)
+
+
+class ProfileSaveTests(DirtyFieldsAssertionsMixin, TestCase):
+    """
+    Saving a profile writes only the changed columns.
+    """
+
+    def setUp(self):
+        self.user = create_user('profile_user')
+
+    def test_unchanged_profile_runs_no_query(self):
+        self.assertSaveRunsNoQuery(Profile.objects.get(user=self.user))
+
+    def test_changed_field_updates_only_that_column(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.location = 'Berlin'
+        self.assertSaveUpdatesOnly(profile, ['location', 'uploaded_at'])
+        self.assertEqual(Profile.objects.get(pk=profile.pk).location, 'Berlin')
+        self.assertSaveRunsNoQuery(profile)
+
+    def test_file_change_touches_uploaded_at_without_reading_the_row(self):
+        profile = Profile.objects.get(user=self.user)
+        uploaded_at = profile.uploaded_at
+        profile.file = 'uploads/avatar.png'
+        queries = self.assertSaveUpdatesOnly(profile, ['file', 'uploaded_at'])
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])
+        self.assertGreater(profile.uploaded_at, uploaded_at)
+
+    def test_patch_runs_one_update_per_table(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(f'/api/profile/{self.user.pk}/', {'first_name': 'Ada', 'tel': '123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2, updates)
+        self.assertEqual(set(re.findall(r'"(\w+)" = ', updates[0].split(' WHERE ')[0])), {'first_name', 'last_name'})
+        self.assertEqual(set(re.findall(r'"(\w+)" = ', updates[1].split(' WHERE ')[0])), {'first_name', 'tel', 'uploaded_at'})
+        self.assertTrue(updates[0].startswith('UPDATE "auth_user"'))
+        self.assertTrue(updates[1].startswith('UPDATE "user_auth_profile"'))
+
+
+class ProfileQueryBudgetTests(TestCase):
+    """
+    The budgeted profile endpoints run a fixed number of queries, however many
+    profiles there are. The client is force authenticated, so the counts leave out
+    the token lookup.
+    """
+    PROFILES = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.business_users = create_users('business', cls.PROFILES, 'business')
+        create_users('customer', cls.PROFILES, 'customer')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.business_users[0])
+
+    def test_directories(self):
+        for path in ('/api/profiles/business/', '/api/profiles/customer/'):
+            with self.assertNumQueries(1):
+                response = self.client.get(path)
+            self.assertEqual(len(response.data), self.PROFILES)
+            with self.assertNumQueries(2):
+                response = self.client.get(f'{path}?page_size=5&ordering=name')
+            self.assertEqual(response.data['count'], self.PROFILES)
+
+    @override_settings(UNPAGINATED_LIST_LIMIT=5)
+    def test_unpaginated_directory_is_limited(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/profiles/business/')
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertEqual(response['X-Result-Truncated'], 'true')
+        self.assertIn('page=1', response['Link'])
+
+    def test_unpaginated_directory_is_deprecated(self):
+        response = self.client.get('/api/profiles/customer/')
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertNotIn('X-Result-Truncated', response)
+        response = self.client.get('/api/profiles/customer/?page=1')
+        self.assertNotIn('Deprecation', response)
+
+    def test_business_directory_by_rating(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/profiles/business/?page_size=5&ordering=-rating')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_profile_patch(self):
+        with self.assertNumQueries(4):
+            response = self.client.patch(
+                f'/api/profile/{self.business_users[0].pk}/', {'first_name': 'Ada', 'location': 'Berlin'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfileFileVariantTests(TestCase):
+    """
+    The variant files of a replaced profile file are deleted once the new variants are stored.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = create_user('variant_user', 'business')
+        self.old = {'source': 'uploads/old.png', 'avatar': default_storage.save('uploads/old.avatar.png', ContentFile(b'x'))}
+        self.new = {'source': 'uploads/new.png', 'avatar': default_storage.save('uploads/new.avatar.png', ContentFile(b'x'))}
+        Profile.objects.filter(user=self.user).update(file='uploads/new.png', file_variants=self.old)
+
+    def test_replaced_file(self):
+        with mock.patch('user_auth.models.render_variants', return_value=self.new):
+            Profile.objects.get(user=self.user).refresh_file_variants()
+        self.assertEqual(Profile.objects.get(user=self.user).file_variants, self.new)
+        self.assertFalse(default_storage.exists(self.old['avatar']))
+        self.assertTrue(default_storage.exists(self.new['avatar']))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class AuthenticationTests(TestCase):
+    """
+    Registration and login answer like before they hashed in the password hashing pool.
+    The hash cost is lowered to keep the tests fast.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user('login_user')
+
+    def register(self, **data):
+        data = {'username': 'new_user', 'email': 'new_user@example.com', 'password': 'secret',
+                'repeated_password': 'secret', 'type': 'business', **data}
+        return self.client.post('/api/registration/', data, format='json')
+
+    def login(self, username='login_user', password='test'):
+        return self.client.post('/api/login/', {'username': username, 'password': password}, format='json')
+
+    def full_pool(self):
+        pool = PasswordHashingPool(workers=1, queue_size=0)
+        pool.capacity = 0
+        return mock.patch('user_auth.hashers.get_hashing_pool', return_value=pool)
+
+    def test_registration(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username='new_user')
+        self.assertEqual(response.json(), {
+            'email': 'new_user@example.com', 'username': 'new_user', 'user_id': user.pk, 'token': user.auth_token.key,
+        })
+        self.assertTrue(user.check_password('secret'))
+        self.assertEqual(Profile.objects.get(user=user).type, 'business')
+
+    def test_registration_errors(self):
+        self.assertEqual(self.register(repeated_password='other').json(), {'detail': ['Passwörter stimmt nicht überein.']})
+        self.assertEqual(self.register(username='login_user').json(), {'detail': ['Benutzername oder E-Mail existiert bereits.']})
+        response = self.register(email='login_user@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'detail': ['Benutzername oder E-Mail existiert bereits.']})
+        self.assertFalse(User.objects.filter(username='new_user').exists())
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {
+            'user_id': self.user.pk, 'token': Token.objects.get(user=self.user).key,
+            'username': 'login_user', 'email': 'login_user@example.com',
+        })
+
+    def test_login_errors(self):
+        for username, password in (('login_user', 'wrong'), ('unknown', 'test')):
+            with self.subTest(username=username):
+                response = self.login(username, password)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'detail': ['Falscher Benutzername oder falsches Passwort.']})
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    @override_settings(PASSWORD_HASHING_RETRY_AFTER=7)
+    def test_full_pool(self):
+        with self.full_pool():
+            responses = [self.login(), self.register()]
+        for response in responses:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '7')
+            self.assertEqual(response.json(), {'detail': ['Der Server ist gerade ausgelastet. Bitte versuche es in Kürze erneut.']})
+        self.assertFalse(User.objects.filter(username='new_user').exists())
+
+    def test_login_rehashes_other_iteration_count(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 201)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password('test'))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class RegistrationRaceTests(TestCase):
+    """
+    A registration that passed the validation loses against a concurrent one that
+    stored the same username or email first: it fails like a duplicate found by the
+    validation and leaves no rows behind.
+    """
+    DATA = {'username': 'racer', 'email': 'racer@example.com', 'password': 'secret',
+            'repeated_password': 'secret', 'type': 'customer'}
+
+    def assertNoOrphans(self, counts):
+        self.assertEqual((User.objects.count(), Profile.objects.count(), Token.objects.count()), counts)
+
+    def assertLosesRace(self, create_conflict):
+        serializer = RegistrationSerializer(data=self.DATA)
+        self.assertTrue(serializer.is_valid())
+        create_conflict()
+        counts = (User.objects.count(), Profile.objects.count(), Token.objects.count())
+        with self.assertRaises(ValidationError) as caught:
+            serializer.save()
+        self.assertEqual(caught.exception.status_code, 400)
+        self.assertEqual(caught.exception.detail, {'detail': ['Benutzername oder E-Mail existiert bereits.']})
+        self.assertNoOrphans(counts)
+
+    def test_conflicting_user(self):
+        self.assertLosesRace(lambda: User.objects.create_user(username='racer', email='other@example.com'))
+
+    def test_conflicting_profile_email(self):
+        def create_conflict():
+            user = User.objects.create_user(username='other', email='other@example.com')
+            Profile.objects.create(user=user, email='racer@example.com', type='business')
+        self.assertLosesRace(create_conflict)
+
+    def test_registration_view(self):
+        is_valid = RegistrationSerializer.is_valid
+
+        def is_valid_then_conflict(serializer, *args, **kwargs):
+            valid = is_valid(serializer, *args, **kwargs)
+            create_user('racer')
+            return valid
+
+        with mock.patch.object(RegistrationSerializer, 'is_valid', is_valid_then_conflict):
+            response = APIClient().post('/api/registration/', self.DATA, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'detail': ['Benutzername oder E-Mail existiert bereits.']})
+        self.assertNoOrphans((1, 1, 0))